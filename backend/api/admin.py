@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar, Calificacion, SensorData, Alert
+from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar, Calificacion, SensorData, Alert, IngestSession, ScoreHistory, DashboardStat, ReportJob
 
 admin.site.register(Raza)
 admin.site.register(CategoriaPuntuacion)
@@ -8,3 +8,7 @@ admin.site.register(Ejemplar)
 admin.site.register(Calificacion)
 admin.site.register(SensorData)
 admin.site.register(Alert)
+admin.site.register(IngestSession)
+admin.site.register(ScoreHistory)
+admin.site.register(DashboardStat)
+admin.site.register(ReportJob)
@@ -0,0 +1,222 @@
+"""
+Motor de reglas que convierte lecturas de SensorData en filas de Alert.
+
+La ingesta solo encola las lecturas recién confirmadas (``enqueue_readings``);
+la evaluación corre en la cola ``alerts`` de ``api.tasks``, que usa un único
+hilo para que el estado por ejemplar se actualice en orden. Así la latencia de
+ingesta no depende de cuántas reglas haya configuradas.
+
+Cada ejemplar tiene un ``AnimalState`` con una línea base incremental de la
+actividad (media móvil exponencial), de modo que evaluar una lectura es O(1) y
+nunca vuelve a consultar el historial. Esa línea base vive en memoria del
+proceso: cada worker lleva la suya y un reinicio la pierde, así que las
+reglas de actividad no evalúan un ejemplar hasta volver a acumular
+``ALERT_BASELINE_MIN_SAMPLES`` lecturas en ese proceso.
+
+Las alertas del mismo tipo para el mismo ejemplar se deduplican dentro de
+``ALERT_DEDUP_WINDOW``. El estado del motor solo evita trabajo; quien manda es
+``save_alerts``, que vuelve a leer las alertas guardadas con las filas de los
+ejemplares bloqueadas, de modo que varios procesos no duplican alertas.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils.module_loading import import_string
+
+from .analytics import deduplicate
+from .models import Alert, Ejemplar
+from . import dashboard, push, tasks
+
+DEFAULT_RULES = (
+    'api.alerts.FiebreRule',
+    'api.alerts.CeloRule',
+    'api.alerts.InactividadRule',
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Reading:
+    """ Lectura mínima que viaja por la cola (sin instancias del ORM). """
+    __slots__ = ('ejemplar_id', 'timestamp', 'temperatura', 'actividad')
+
+    def __init__(self, ejemplar_id, timestamp, temperatura, actividad):
+        self.ejemplar_id = ejemplar_id
+        self.timestamp = timestamp
+        self.temperatura = temperatura
+        self.actividad = actividad
+
+    @classmethod
+    def from_sensor_data(cls, data):
+        return cls(data.ejemplar_id, data.timestamp, data.temperatura, data.actividad)
+
+
+class AnimalState:
+    """ Línea base incremental de actividad y estado de reglas de un ejemplar. """
+    __slots__ = ('samples', 'activity_mean', 'low_activity_since', 'last_alerts')
+
+    def __init__(self):
+        self.samples = 0
+        self.activity_mean = 0.0
+        self.low_activity_since = None
+        self.last_alerts = {}
+
+    def update(self, reading, alpha):
+        if reading.actividad is None:
+            return
+        if self.samples == 0:
+            self.activity_mean = reading.actividad
+        else:
+            self.activity_mean += alpha * (reading.actividad - self.activity_mean)
+        self.samples += 1
+
+
+class Rule:
+    """ Regla base: ``evaluate`` devuelve el mensaje de la alerta o None. """
+    alert_type = None
+
+    def evaluate(self, state, reading):
+        raise NotImplementedError
+
+
+class FiebreRule(Rule):
+    alert_type = Alert.AlertType.FIEBRE
+
+    def evaluate(self, state, reading):
+        threshold = _setting('ALERT_FEVER_TEMPERATURE', 39.5)
+        if reading.temperatura is not None and reading.temperatura >= threshold:
+            return f'Temperatura de {reading.temperatura:.1f} °C (umbral {threshold:.1f} °C).'
+        return None
+
+
+class CeloRule(Rule):
+    alert_type = Alert.AlertType.CELO
+
+    def evaluate(self, state, reading):
+        if reading.actividad is None or state.samples < _setting('ALERT_BASELINE_MIN_SAMPLES', 12):
+            return None
+        ratio = _setting('ALERT_HEAT_ACTIVITY_RATIO', 1.8)
+        if state.activity_mean > 0 and reading.actividad >= state.activity_mean * ratio:
+            return (f'Actividad de {reading.actividad:.0f}, {reading.actividad / state.activity_mean:.1f} veces '
+                    f'su media reciente ({state.activity_mean:.0f}).')
+        return None
+
+
+class InactividadRule(Rule):
+    alert_type = Alert.AlertType.INACTIVIDAD
+
+    def evaluate(self, state, reading):
+        if reading.actividad is None or state.samples < _setting('ALERT_BASELINE_MIN_SAMPLES', 12):
+            return None
+        if reading.actividad > state.activity_mean * _setting('ALERT_INACTIVITY_RATIO', 0.5):
+            state.low_activity_since = None
+            return None
+        if state.low_activity_since is None:
+            state.low_activity_since = reading.timestamp
+        duration = reading.timestamp - state.low_activity_since
+        if duration >= _setting('ALERT_INACTIVITY_DURATION', timedelta(hours=4)):
+            hours = duration.total_seconds() / 3600
+            return (f'Actividad por debajo del {_setting("ALERT_INACTIVITY_RATIO", 0.5):.0%} de su media reciente '
+                    f'({state.activity_mean:.0f}) durante {hours:.1f} h.')
+        return None
+
+
+class AlertEngine:
+    """ Evalúa lecturas contra las reglas manteniendo el estado por ejemplar. """
+
+    def __init__(self, rules=None):
+        if rules is None:
+            rules = [import_string(path)() for path in _setting('ALERT_RULES', DEFAULT_RULES)]
+        self.rules = rules
+        self.states = {}
+
+    def _load_states(self, ejemplar_ids):
+        """
+        Crea el estado de ejemplares nuevos recuperando sus últimas alertas para deduplicar.
+
+        Las alertas de otros procesos posteriores a esta carga no se ven aquí;
+        ``save_alerts`` las descarta al guardar.
+        """
+        new_ids = [ejemplar_id for ejemplar_id in ejemplar_ids if ejemplar_id not in self.states]
+        if not new_ids:
+            return
+        for ejemplar_id in new_ids:
+            self.states[ejemplar_id] = AnimalState()
+        last_alerts = (
+            Alert.objects.filter(ejemplar_id__in=new_ids)
+            .values('ejemplar_id', 'alert_type')
+            .annotate(last=Max('timestamp'))
+            .order_by()
+        )
+        for row in last_alerts:
+            self.states[row['ejemplar_id']].last_alerts[row['alert_type']] = row['last']
+
+    def evaluate(self, readings):
+        """ Devuelve las alertas (sin guardar) que disparan ``readings``. """
+        readings = sorted(readings, key=lambda reading: reading.timestamp)
+        self._load_states({reading.ejemplar_id for reading in readings})
+        alpha = 2 / (_setting('ALERT_BASELINE_SPAN', 288) + 1)
+        dedup_window = _setting('ALERT_DEDUP_WINDOW', timedelta(hours=12))
+
+        alerts = []
+        for reading in readings:
+            state = self.states[reading.ejemplar_id]
+            for rule in self.rules:
+                message = rule.evaluate(state, reading)
+                if message is None:
+                    continue
+                last = state.last_alerts.get(rule.alert_type)
+                if last is not None and reading.timestamp - last < dedup_window:
+                    continue
+                state.last_alerts[rule.alert_type] = reading.timestamp
+                alerts.append(Alert(ejemplar_id=reading.ejemplar_id, alert_type=rule.alert_type,
+                                    message=message, timestamp=reading.timestamp))
+            state.update(reading, alpha)
+        return alerts
+
+
+def save_alerts(alerts):
+    """
+    Guarda las alertas generadas por el motor o por análisis por lotes.
+
+    Descarta las que caen dentro de ``ALERT_DEDUP_WINDOW`` de otra del mismo
+    tipo y ejemplar ya guardada, aunque la haya creado otro proceso.
+    """
+    with transaction.atomic():
+        # Orden por id: dos procesos bloquean los mismos ejemplares en el mismo orden
+        list(Ejemplar.objects.select_for_update().filter(pk__in={alert.ejemplar_id for alert in alerts})
+             .order_by('pk').values_list('pk', flat=True))
+        created = Alert.objects.bulk_create(deduplicate(alerts))
+        dashboard.apply_deltas(dashboard.alert_deltas(created))
+        push.publish_alerts_on_commit(created)
+    return created
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine()
+        return _engine
+
+
+def process_readings(readings):
+    """ Tarea de la cola ``alerts``: evalúa y guarda las alertas de un lote. """
+    alerts = get_engine().evaluate(readings)
+    return len(save_alerts(alerts)) if alerts else 0
+
+
+def enqueue_readings(readings):
+    """ Encola la evaluación de un lote de SensorData ya confirmado. """
+    if not readings:
+        return None
+    return tasks.submit(process_readings, [Reading.from_sensor_data(r) for r in readings], queue='alerts')
@@ -0,0 +1,175 @@
+"""
+Detección de anomalías por lotes sobre el historial de sensores del hato.
+
+Las lecturas se cargan con ``values_list`` en arreglos de NumPy ordenados por
+(ejemplar_id, timestamp) y las estadísticas de ventana móvil se calculan de
+forma vectorizada con sumas acumuladas: para cada lectura, la media y la
+desviación de las lecturas previas del mismo ejemplar dentro de la ventana.
+Con eso se obtienen z-scores y se generan candidatos a ``Alert`` sin recorrer
+las filas una a una a través del ORM.
+"""
+import bisect
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+
+from .models import Alert, SensorData
+
+AlertCandidate = namedtuple('AlertCandidate', ('ejemplar_id', 'alert_type', 'timestamp', 'message', 'score'))
+
+
+class Readings:
+    """ Lecturas de un conjunto de ejemplares como columnas de NumPy. """
+
+    def __init__(self, ejemplar_ids, timestamps, temperatura, actividad):
+        self.ejemplar_ids = ejemplar_ids
+        self.timestamps = timestamps
+        self.temperatura = temperatura
+        self.actividad = actividad
+
+    def __len__(self):
+        return len(self.ejemplar_ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """ Construye las columnas a partir de tuplas (ejemplar_id, timestamp, temperatura, actividad). """
+        count = len(rows)
+        ejemplar_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        timestamps = np.fromiter((row[1].timestamp() for row in rows), dtype=np.float64, count=count)
+        temperatura = np.fromiter((np.nan if row[2] is None else row[2] for row in rows), dtype=np.float64, count=count)
+        actividad = np.fromiter((np.nan if row[3] is None else row[3] for row in rows), dtype=np.float64, count=count)
+        return cls(ejemplar_ids, timestamps, temperatura, actividad).sorted()
+
+    def sorted(self):
+        order = np.lexsort((self.timestamps, self.ejemplar_ids))
+        return Readings(self.ejemplar_ids[order], self.timestamps[order], self.temperatura[order], self.actividad[order])
+
+
+def load_readings(start, end, ejemplar_ids=None):
+    """ Carga las lecturas en [start, end) de los ejemplares indicados (o de todo el hato). """
+    queryset = SensorData.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if ejemplar_ids is not None:
+        queryset = queryset.filter(ejemplar_id__in=ejemplar_ids)
+    rows = list(queryset.order_by().values_list('ejemplar_id', 'timestamp', 'temperatura', 'actividad'))
+    return Readings.from_rows(rows)
+
+
+def rolling_stats(ejemplar_ids, timestamps, values, window_seconds):
+    """
+    Media, desviación estándar y número de muestras de las lecturas previas.
+
+    Los arreglos deben estar ordenados por (ejemplar_id, timestamp). Para cada
+    posición ``i`` se consideran las lecturas del mismo ejemplar con
+    ``timestamps[i] - window_seconds <= t < timestamps[i]`` (la lectura actual
+    queda fuera de su propia línea base). Los valores NaN se ignoran.
+    """
+    valid = ~np.isnan(values)
+    # Clave monótona que separa los ejemplares por más que la ventana, de modo
+    # que la búsqueda del inicio de la ventana nunca cruza al ejemplar anterior.
+    _, group = np.unique(ejemplar_ids, return_inverse=True)
+    origin = timestamps.min() if len(timestamps) else 0.0
+    span = (timestamps.max() - origin if len(timestamps) else 0.0) + window_seconds + 1
+    key = group * span + (timestamps - origin)
+    start = np.searchsorted(key, key - window_seconds, side='left')
+    end = np.arange(len(values))
+
+    clean = np.where(valid, values, 0.0)
+    cum_sum = np.concatenate(([0.0], np.cumsum(clean)))
+    cum_sq = np.concatenate(([0.0], np.cumsum(clean * clean)))
+    cum_count = np.concatenate(([0], np.cumsum(valid)))
+
+    count = cum_count[end] - cum_count[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (cum_sum[end] - cum_sum[start]) / count
+        variance = (cum_sq[end] - cum_sq[start]) / count - mean * mean
+    std = np.sqrt(np.clip(variance, 0.0, None))
+    return mean, std, count
+
+
+def _zscores(readings, values, window_seconds, min_samples):
+    mean, std, count = rolling_stats(readings.ejemplar_ids, readings.timestamps, values, window_seconds)
+    std = np.maximum(std, getattr(settings, 'ANALYTICS_MIN_STD', 1.0))
+    with np.errstate(invalid='ignore'):
+        z = (values - mean) / std
+    z[(count < min_samples) | np.isnan(values)] = np.nan
+    return z, mean
+
+
+def detect_anomalies(readings, window=None, min_samples=None):
+    """ Devuelve los candidatos a alerta (sin deduplicar) de ``readings``. """
+    window = window or getattr(settings, 'ANALYTICS_WINDOW', timedelta(days=3))
+    min_samples = min_samples or getattr(settings, 'ALERT_BASELINE_MIN_SAMPLES', 12)
+    heat_z = getattr(settings, 'ANALYTICS_HEAT_ZSCORE', 3.0)
+    inactivity_z = getattr(settings, 'ANALYTICS_INACTIVITY_ZSCORE', -2.5)
+    fever = getattr(settings, 'ALERT_FEVER_TEMPERATURE', 39.5)
+    if not len(readings):
+        return []
+
+    z, mean = _zscores(readings, readings.actividad, window.total_seconds(), min_samples)
+    with np.errstate(invalid='ignore'):
+        flags = (
+            (Alert.AlertType.CELO, z >= heat_z),
+            (Alert.AlertType.INACTIVIDAD, z <= inactivity_z),
+            (Alert.AlertType.FIEBRE, readings.temperatura >= fever),
+        )
+
+    candidates = []
+    for alert_type, mask in flags:
+        for i in np.flatnonzero(mask):
+            timestamp = datetime.fromtimestamp(readings.timestamps[i], tz=dt_timezone.utc)
+            if alert_type == Alert.AlertType.FIEBRE:
+                score = float(readings.temperatura[i])
+                message = f'Temperatura de {score:.1f} °C (umbral {fever:.1f} °C).'
+            else:
+                score = float(z[i])
+                message = (f'Actividad de {readings.actividad[i]:.0f} frente a una media de {mean[i]:.0f} '
+                           f'(z = {score:.1f}).')
+            candidates.append(AlertCandidate(int(readings.ejemplar_ids[i]), alert_type, timestamp, message, score))
+    candidates.sort(key=lambda candidate: (candidate.ejemplar_id, candidate.alert_type, candidate.timestamp))
+    return candidates
+
+
+def deduplicate(candidates, dedup_window=None):
+    """
+    Descarta candidatos (``AlertCandidate`` o ``Alert``) cercanos a otro del
+    mismo tipo o a una alerta existente.
+
+    Dentro de ``dedup_window`` solo se conserva el primer candidato por
+    (ejemplar, tipo), y se omiten los que caen cerca de una Alert ya guardada.
+    """
+    if not candidates:
+        return []
+    dedup_window = dedup_window or getattr(settings, 'ALERT_DEDUP_WINDOW', timedelta(hours=12))
+    start = min(candidate.timestamp for candidate in candidates) - dedup_window
+    end = max(candidate.timestamp for candidate in candidates) + dedup_window
+    existing = {}
+    rows = Alert.objects.filter(
+        ejemplar_id__in={candidate.ejemplar_id for candidate in candidates},
+        timestamp__gte=start, timestamp__lte=end,
+    ).order_by('timestamp').values_list('ejemplar_id', 'alert_type', 'timestamp')
+    for ejemplar_id, alert_type, timestamp in rows:
+        existing.setdefault((ejemplar_id, alert_type), []).append(timestamp)
+
+    kept = []
+    last = {}
+    for candidate in sorted(candidates, key=lambda c: (c.ejemplar_id, c.alert_type, c.timestamp)):
+        key = (candidate.ejemplar_id, candidate.alert_type)
+        previous = last.get(key)
+        if previous is not None and candidate.timestamp - previous < dedup_window:
+            continue
+        stored = existing.get(key, [])
+        i = bisect.bisect_left(stored, candidate.timestamp - dedup_window)
+        if i < len(stored) and stored[i] - candidate.timestamp < dedup_window:
+            continue
+        last[key] = candidate.timestamp
+        kept.append(candidate)
+    return kept
+
+
+def to_alerts(candidates):
+    return [
+        Alert(ejemplar_id=c.ejemplar_id, alert_type=c.alert_type, message=c.message, timestamp=c.timestamp)
+        for c in candidates
+    ]
@@ -0,0 +1,261 @@
+"""
+Alta masiva de ejemplares desde un CSV o un Excel (XLSX).
+
+El archivo se lee fila a fila (CSV con ``csv.reader`` sobre el flujo,
+XLSX con openpyxl en modo ``read_only``) y se procesa en lotes de
+``ANIMAL_IMPORT_BATCH_SIZE`` filas. Por lote se hace una sola consulta
+``IN`` para saber qué RFID (``identificador``) ya existen y un único
+``bulk_create(update_conflicts=True)``: los ejemplares nuevos se crean y los
+existentes se actualizan con las columnas presentes en el archivo. Las razas
+se resuelven por nombre con un diccionario que se lee una vez por importación.
+
+Como en la ingesta de lecturas, las filas inválidas no detienen la
+importación: se devuelven como rechazos con su número de fila en el archivo
+(la cabecera es la fila 1). Con ``dry_run`` solo se valida y se informa qué
+se crearía o actualizaría, sin escribir.
+"""
+import codecs
+import csv
+import tempfile
+from datetime import date, datetime
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from .ingest import IngestResult
+from .models import Ejemplar, Raza
+from . import dashboard, tasks
+
+REQUIRED_COLUMNS = ('identificador', 'raza', 'fecha_nacimiento')
+OPTIONAL_COLUMNS = ('nombre', 'peso_actual', 'talla_actual')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class AnimalImportError(Exception):
+    """ El archivo no se puede importar; ``status`` es el código HTTP sugerido. """
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+class ImportResult(IngestResult):
+    """ ``IngestResult`` que distingue los ejemplares creados de los actualizados. """
+
+    def __init__(self, max_rejects=None, dry_run=False):
+        super().__init__(max_rejects)
+        self.created = 0
+        self.updated = 0
+        self.dry_run = dry_run
+
+    def as_dict(self):
+        return dict(super().as_dict(), created=self.created, updated=self.updated, dry_run=self.dry_run)
+
+
+def _header(names):
+    columns = [str(name).strip().lower() if name is not None else '' for name in names]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise AnimalImportError(f'Faltan columnas requeridas: {", ".join(missing)}.')
+    return columns
+
+
+def iter_csv(stream, encoding='utf-8-sig'):
+    """ Genera ``(fila, registro)`` de un CSV binario con cabecera, sin cargarlo entero. """
+    # utf-8-sig: Excel antepone un BOM al guardar como CSV UTF-8
+    reader = csv.reader(codecs.iterdecode(stream, encoding))
+    try:
+        columns = _header(next(reader, []))
+        for row in reader:
+            if any(value.strip() for value in row):
+                yield reader.line_num, dict(zip(columns, row))
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise AnimalImportError(f'CSV inválido: {exc}')
+
+
+def iter_xlsx(fileobj):
+    """ Genera ``(fila, registro)`` de la primera hoja de un XLSX (requiere openpyxl). """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise AnimalImportError('La importación de Excel requiere openpyxl (pip install openpyxl).', status=501)
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as exc:
+        raise AnimalImportError(f'XLSX inválido: {exc}')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = _header(next(rows, ()))
+        for number, row in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in row):
+                yield number, dict(zip(columns, row))
+    finally:
+        workbook.close()
+
+
+def iter_upload(fileobj, filename='', content_type=''):
+    """ Registros de un archivo subido: XLSX por tipo de contenido o extensión, CSV en otro caso. """
+    if content_type == XLSX_CONTENT_TYPE or filename.lower().endswith('.xlsx'):
+        if not getattr(fileobj, 'seekable', lambda: False)():
+            # El XLSX es un ZIP y se lee desde el final: el cuerpo se copia a un temporal
+            spooled = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+            for chunk in iter(lambda: fileobj.read(64 * 1024), b''):
+                spooled.write(chunk)
+            spooled.seek(0)
+            fileobj = spooled
+        return iter_xlsx(fileobj)
+    return iter_csv(fileobj)
+
+
+def breed_ids():
+    """ {nombre de raza en minúsculas: id}, en una consulta. """
+    return {nombre.strip().casefold(): pk for pk, nombre in Raza.objects.values_list('pk', 'nombre')}
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel guarda los RFID numéricos como float
+        value = int(value)
+    return str(value).strip()
+
+
+def _number(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, str):
+        value = value.strip().replace(',', '.')
+    return float(value)
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = _text(value)
+    parsed = parse_date(value)
+    if parsed is None:
+        parsed = datetime.strptime(value, '%d/%m/%Y').date()
+    return parsed
+
+
+def build_animals(records, columns, breeds, seen, result):
+    """
+    Valida ``records`` (``(fila, registro)``) y devuelve ``(fila, Ejemplar)`` sin guardar.
+
+    ``seen`` acumula los identificadores ya leídos en el archivo: una fila
+    repetida se rechaza en lugar de pisar a la anterior.
+    """
+    max_lengths = {field: Ejemplar._meta.get_field(field).max_length for field in ('identificador', 'nombre')}
+    animals = []
+    for row, record in records:
+        errors = {}
+        identificador = _text(record.get('identificador'))
+        if not identificador:
+            errors['identificador'] = ['Este campo es requerido.']
+        elif len(identificador) > max_lengths['identificador']:
+            errors['identificador'] = [f'Máximo {max_lengths["identificador"]} caracteres.']
+        elif identificador in seen:
+            errors['identificador'] = [f'Repetido en la fila {seen[identificador]}.']
+
+        raza = _text(record.get('raza'))
+        raza_id = breeds.get(raza.casefold())
+        if not raza:
+            errors['raza'] = ['Este campo es requerido.']
+        elif raza_id is None:
+            errors['raza'] = [f'No existe la raza "{raza}".']
+
+        try:
+            fecha_nacimiento = _date(record.get('fecha_nacimiento'))
+        except (TypeError, ValueError):
+            errors['fecha_nacimiento'] = ['Fecha inválida, use AAAA-MM-DD o DD/MM/AAAA.']
+
+        values = {}
+        if 'nombre' in columns:
+            values['nombre'] = _text(record.get('nombre'))
+            if len(values['nombre']) > max_lengths['nombre']:
+                errors['nombre'] = [f'Máximo {max_lengths["nombre"]} caracteres.']
+        for field in ('peso_actual', 'talla_actual'):
+            if field in columns:
+                try:
+                    values[field] = _number(record.get(field))
+                except (TypeError, ValueError):
+                    errors[field] = ['Se esperaba un número.']
+
+        if errors:
+            result.reject(row, errors, identificador or None)
+            continue
+        seen[identificador] = row
+        animals.append((row, Ejemplar(identificador=identificador, raza_id=raza_id, fecha_nacimiento=fecha_nacimiento, **values)))
+    return animals
+
+
+def _write_batch(rows, update_fields, update_existing, result):
+    """ Consulta los RFID existentes del lote y crea o actualiza con un solo INSERT ... ON CONFLICT. """
+    existing = {
+        identificador: (raza_id, score_total)
+        for identificador, raza_id, score_total in Ejemplar.objects.filter(identificador__in=[animal.identificador for _, animal in rows])
+        .values_list('identificador', 'raza_id', 'score_total')
+    }
+    animals = []
+    for row, animal in rows:
+        if animal.identificador in existing and not update_existing:
+            result.reject(row, {'identificador': ['Ya existe un ejemplar con este identificador.']}, animal.identificador)
+        else:
+            animals.append(animal)
+    updated = sum(1 for animal in animals if animal.identificador in existing)
+    result.updated += updated
+    result.created += len(animals) - updated
+    result.accepted += len(animals)
+    if result.dry_run or not animals:
+        return
+
+    with transaction.atomic():
+        if update_existing and existing:
+            Ejemplar.objects.bulk_create(animals, update_conflicts=True, unique_fields=['identificador'], update_fields=update_fields)
+        else:
+            Ejemplar.objects.bulk_create(animals)
+        # bulk_create no emite post_save: el cambio de raza de un ejemplar calificado mueve su score en el dashboard
+        changes = []
+        for animal in animals:
+            if animal.identificador in existing:
+                old_raza, score = existing[animal.identificador]
+                changes.append((old_raza, score, animal.raza_id, score))
+        dashboard.apply_deltas(dashboard.score_deltas(changes))
+
+
+def import_animals(records, update_existing=True, dry_run=False, batch_size=None):
+    """
+    Importa los ejemplares de ``records`` (``(fila, registro)``, p. ej. de ``iter_upload``).
+
+    Cada lote se escribe en su propia transacción, así que un error de formato
+    a mitad del archivo (AnimalImportError) deja guardados los lotes
+    anteriores; ``dry_run`` permite detectarlo antes. Devuelve un ImportResult.
+    """
+    batch_size = batch_size or getattr(settings, 'ANIMAL_IMPORT_BATCH_SIZE', 1000)
+    result = ImportResult(max_rejects=getattr(settings, 'ANIMAL_IMPORT_MAX_REJECTS', 1000), dry_run=dry_run)
+    breeds = breed_ids()
+    seen = {}
+    records = iter(records)
+    columns = None
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        if columns is None:
+            columns = set(batch[0][1])
+            update_fields = ['raza', 'fecha_nacimiento'] + [field for field in OPTIONAL_COLUMNS if field in columns]
+        _write_batch(build_animals(batch, columns, breeds, seen, result), update_fields, update_existing, result)
+
+    if result.accepted and not dry_run:
+        # Altas fuera de las señales: el total de ejemplares de la cobertura y los últimos calificados cambian
+        dashboard.invalidate()
+        transaction.on_commit(lambda: tasks.submit(dashboard.refresh_sensor_coverage))
+    return result
@@ -0,0 +1,15 @@
+"""
+Rutas que con ASGI sirven las vistas asíncronas de ``api.async_views``.
+
+Se anteponen a ``api.urls`` en ``mycows_rfi.asgi_urls``; los nombres son los
+mismos, de modo que ``reverse`` no cambia.
+"""
+from django.urls import path
+from .async_views import AnimalSensorDataListView, AnimalAlertListView, ScoreTemplateView, DashboardScoresView
+
+urlpatterns = [
+    path('animals/<int:animal_pk>/sensor-data/', AnimalSensorDataListView.as_view(), name='animal-sensor-data-list'),
+    path('animals/<int:animal_pk>/alerts/', AnimalAlertListView.as_view(), name='animal-alerts-list'),
+    path('score-templates/breed/<int:breed_id>/', ScoreTemplateView.as_view(), name='score-template-by-breed'),
+    path('dashboard/scores/', DashboardScoresView.as_view(), name='dashboard-scores'),
+]
@@ -0,0 +1,239 @@
+"""
+Vistas asíncronas (ASGI) de los endpoints de lectura más consultados.
+
+DRF no ejecuta vistas asíncronas, así que estas son vistas de Django que
+leen con el ORM asíncrono y responden con la misma salida que sus
+equivalentes de ``api.views``. Mientras esperan a la base no ocupan un hilo
+del servidor: un proceso ASGI atiende muchos dashboards a la vez.
+
+Solo resuelven el caso común (GET en JSON con un JWT válido); cualquier otra
+cosa (escrituras, la API navegable, errores de autenticación o de cursor) se
+delega en la vista síncrona, que produce exactamente la respuesta de DRF.
+Con ASGI las rutas se toman de ``ASGI_URLCONF`` (ver
+``api.middleware.AsyncRoutesMiddleware``); con WSGI siguen sirviendo las
+vistas de DRF.
+
+También vive aquí ``live_events``, el stream de eventos en vivo (``api.push``).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .fastpath import RowSerializer, render
+from .models import Alert, SensorData
+from .pagination import TimeSeriesPagination
+from .serializers import AlertSerializer, SensorDataSerializer
+from . import dashboard, push, score_templates, views
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """ JWTAuthentication con la búsqueda del usuario por el ORM asíncrono. """
+
+    async def aauthenticate(self, request, raw_token=None):
+        """ Usuario del token (``raw_token`` o cabecera Authorization); None si falta o no es válido. """
+        if raw_token is None:
+            header = self.get_header(request)
+            raw_token = self.get_raw_token(header) if header else None
+        if not raw_token:
+            return None
+        try:
+            return await self.aget_user(self.get_validated_token(raw_token))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+
+    async def aget_user(self, validated_token):
+        """ Mismas comprobaciones que ``JWTAuthentication.get_user``. """
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        user = await self.user_model.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
+
+
+def _plain_json(request):
+    """ La negociación de DRF elegiría JSON compacto (sin API navegable ni ``indent``). """
+    if request.GET.get('format') not in (None, 'json'):
+        return False
+    accept = request.headers.get('Accept', '')
+    return 'text/html' not in accept and 'indent' not in accept
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncReadView(View):
+    """
+    GET asíncrono para el caso común; lo demás lo atiende ``sync_view``.
+
+    ``get`` devuelve None para delegar en la vista síncrona. ``allow`` es la
+    cabecera Allow que envía DRF para la misma ruta.
+    """
+    sync_view = None
+    allow = 'GET, HEAD, OPTIONS'
+
+    async def dispatch(self, request, *args, **kwargs):
+        response = None
+        if request.method == 'GET' and _plain_json(request):
+            user = await AsyncJWTAuthentication().aauthenticate(request)
+            if user is not None:
+                request.user = user
+                try:
+                    response = await self.get(request, *args, **kwargs)
+                except (APIException, Http404):
+                    response = None
+        if response is None:
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+        response['Vary'] = 'Accept'
+        response['Allow'] = self.allow
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+
+class AsyncListView(AsyncReadView):
+    """ Listado paginado por keyset leído y serializado como ``FastListMixin.list``. """
+    serializer_class = None
+    pagination_class = None
+    allow = 'GET, POST, HEAD, OPTIONS'
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        if not getattr(settings, 'API_FAST_SERIALIZATION', True):
+            return None
+        drf_request = Request(request)
+        paginator = self.pagination_class()
+        ordering = [name.lstrip('-') for name in paginator.ordering]
+        row_serializer = RowSerializer(self.serializer_class(context={'request': drf_request, 'view': self}), extra_lookups=ordering)
+        page = await paginator.apaginate_queryset(row_serializer.rows(self.get_queryset()), drf_request)
+        content = render(paginator.get_paginated_data(row_serializer.to_dicts(page)), plain_floats=row_serializer.plain_floats(page))
+        return HttpResponse(content, content_type='application/json')
+
+
+class AnimalSensorDataListView(AsyncListView):
+    serializer_class = SensorDataSerializer
+    pagination_class = TimeSeriesPagination
+    sync_view = staticmethod(views.SensorDataViewSet.as_view({'get': 'list', 'post': 'create'}))
+
+    def get_queryset(self):
+        return SensorData.objects.filter(ejemplar=self.kwargs['animal_pk']).order_by('-timestamp', '-id')
+
+
+class AnimalAlertListView(AsyncListView):
+    serializer_class = AlertSerializer
+    pagination_class = TimeSeriesPagination
+    sync_view = staticmethod(views.AlertViewSet.as_view({'get': 'list', 'post': 'create'}))
+
+    def get_queryset(self):
+        return Alert.objects.filter(ejemplar=self.kwargs['animal_pk'])
+
+
+class ScoreTemplateView(AsyncReadView):
+    sync_view = staticmethod(views.ScoreTemplateView.as_view())
+
+    async def get(self, request, breed_id):
+        template = await score_templates.aget_template(breed_id)
+        if template is None:
+            return None
+        headers = {'ETag': template.etag, 'Cache-Control': 'private, no-cache'}
+        if views._etag_matches(request, template.etag):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers, content_type='application/json')
+        return HttpResponse(JSONRenderer().render(template.payload), headers=headers, content_type='application/json')
+
+
+class DashboardScoresView(AsyncReadView):
+    sync_view = staticmethod(views.DashboardScoresView.as_view())
+
+    async def get(self, request):
+        async def recent_scores():
+            row_serializer, rows = views.recent_scores_rows(request)
+            return row_serializer.to_dicts([row async for row in rows])
+
+        payload = await dashboard.aget_payload(recent_scores)
+        return HttpResponse(JSONRenderer().render(payload), content_type='application/json')
+
+
+def _parse_id_list(value):
+    """ Ids separados por comas (``?animal=1,2``); None si el parámetro no está. """
+    if not value:
+        return None
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+async def _event_stream(broker, animals, razas, types, last_event_id):
+    loop = asyncio.get_running_loop()
+    subscription = broker.subscribe(loop, animals, razas, types, last_event_id)
+    heartbeat = getattr(settings, 'PUSH_HEARTBEAT_SECONDS', 15)
+    try:
+        yield b'retry: %d\n\n' % getattr(settings, 'PUSH_RETRY_MILLISECONDS', 3000)
+        while True:
+            # Sin wait_for: en Python 3.11 puede tragarse la cancelación cuando el cliente se desconecta
+            wakeup = loop.call_later(heartbeat, subscription.ready.set)
+            try:
+                await subscription.ready.wait()
+            finally:
+                wakeup.cancel()
+            if subscription.overflowed:
+                break
+            # Sin eventos: comentario SSE que mantiene abierta la conexión a través de proxies
+            yield subscription.drain() or b': ping\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@require_GET
+async def live_events(request):
+    """ Stream SSE de alertas nuevas y últimas lecturas (ver api.push); filtros ``animal``, ``raza`` y ``types``. """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Los eventos en vivo requieren servir la aplicación con ASGI.'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    # EventSource no permite cabeceras: el navegador usa un ticket de events/ticket/ en ?ticket=
+    if 'ticket' in request.GET:
+        user_id = push.ticket_user_id(request.GET['ticket'])
+        user = await User.objects.filter(pk=user_id, is_active=True).afirst() if user_id is not None else None
+    else:
+        user = await AsyncJWTAuthentication().aauthenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Ticket o token inválido, vencido o ausente.'}, status=status.HTTP_401_UNAUTHORIZED)
+    try:
+        animals = _parse_id_list(request.GET.get('animal'))
+        razas = _parse_id_list(request.GET.get('raza'))
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('lastEventId')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({'detail': 'animal, raza y Last-Event-ID deben ser ids numéricos.'}, status=status.HTTP_400_BAD_REQUEST)
+    types = request.GET.get('types')
+    types = types.split(',') if types else push.EVENT_TYPES
+    if not set(types) <= set(push.EVENT_TYPES):
+        return JsonResponse({'detail': f'types debe contener: {", ".join(push.EVENT_TYPES)}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        _event_stream(push.get_broker(), animals, razas, types, last_event_id), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx no debe acumular el stream en su buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
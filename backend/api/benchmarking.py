@@ -0,0 +1,64 @@
+"""
+Utilidades compartidas por los comandos ``benchmark_*``.
+
+Los benchmarks crean sus datos sintéticos dentro de una transacción que se
+revierte al final, de modo que pueden ejecutarse contra la base de desarrollo
+sin dejar residuos.
+"""
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.db import transaction
+
+from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """ Ejecuta el bloque en una transacción que siempre se revierte. """
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+@contextmanager
+def timer(results, label):
+    """ Guarda en ``results[label]`` los segundos que tarda el bloque. """
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def create_synthetic_herd(size, prefix='BENCH', raza=None):
+    """ Crea ``size`` ejemplares con bulk_create y devuelve la lista. """
+    if raza is None:
+        raza, _ = Raza.objects.get_or_create(nombre=f'{prefix} RAZA')
+    ejemplares = [
+        Ejemplar(identificador=f'{prefix}-{i:07d}', nombre=f'{prefix} {i}', raza=raza, fecha_nacimiento=date(2020, 1, 1))
+        for i in range(size)
+    ]
+    return Ejemplar.objects.bulk_create(ejemplares, batch_size=5000)
+
+
+def create_synthetic_template(raza, categories=5, traits_per_category=5):
+    """ Crea una plantilla de calificación para ``raza`` y devuelve sus características. """
+    categorias = CategoriaPuntuacion.objects.bulk_create([
+        CategoriaPuntuacion(raza=raza, nombre=f'Categoría {i}', ponderacion=100 // categories) for i in range(categories)
+    ])
+    return Caracteristica.objects.bulk_create([
+        Caracteristica(categoria=categoria, nombre=f'{categoria.nombre} - rasgo {j}', puntaje_ideal=10,
+                       rango_aceptado_min=0, rango_aceptado_max=10)
+        for categoria in categorias for j in range(traits_per_category)
+    ])
+
+
+def rate(count, seconds):
+    return count / seconds if seconds > 0 else float('inf')
@@ -0,0 +1,248 @@
+"""
+Indicadores del dashboard mantenidos de forma incremental.
+
+Los agregados (promedio e histograma de scores por raza, alertas por tipo y
+cobertura de sensores) viven en la tabla DashboardStat. Quien cambia scores o
+alertas aplica incrementos con ``apply_deltas`` (un único INSERT ... ON
+CONFLICT DO UPDATE), y la respuesta completa del endpoint se guarda en la
+caché de Django hasta el siguiente cambio. ``rebuild`` recalcula todo desde
+las tablas de origen.
+
+La clave de la respuesta cacheada lleva la versión ``dashboard`` de
+``api.versions``, guardada en la base: ``invalidate`` la incrementa al
+confirmarse el cambio y todos los procesos dejan de usar la respuesta
+anterior, aunque la caché de Django sea un LocMemCache por proceso.
+"""
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Floor, Greatest, Least
+from django.utils import timezone
+
+from .models import Alert, DashboardStat, Ejemplar, Raza, SensorLatest
+from . import tasks, versions
+
+PAYLOAD_KEY = 'dashboard:payload'
+VERSION_NAME = 'dashboard'
+COVERAGE_PENDING_KEY = 'dashboard:coverage_pending'
+BUILT_STAT = 'meta:built'
+HISTOGRAM_BINS = 10
+
+
+def histogram_bin(score):
+    """ Intervalo de 10 puntos del score (los scores fuera de 0-100 van a los extremos). """
+    return min(max(int(score // 10), 0), HISTOGRAM_BINS - 1)
+
+
+def score_deltas(changes):
+    """
+    Incrementos por cambios de score.
+
+    ``changes`` es una lista de (raza_id anterior, score anterior, raza_id
+    nuevo, score nuevo); los valores None indican que no había o no queda score.
+    """
+    deltas = {}
+
+    def add(name, count, total=0.0):
+        current = deltas.get(name, (0, 0.0))
+        deltas[name] = (current[0] + count, current[1] + total)
+
+    for old_raza, old_score, new_raza, new_score in changes:
+        if old_raza == new_raza and old_score == new_score:
+            continue
+        if old_score is not None:
+            add(f'breed:{old_raza}', -1, -old_score)
+            add(f'histogram:{old_raza}:{histogram_bin(old_score)}', -1)
+        if new_score is not None:
+            add(f'breed:{new_raza}', 1, new_score)
+            add(f'histogram:{new_raza}:{histogram_bin(new_score)}', 1)
+    return deltas
+
+
+def alert_deltas(alerts, sign=1):
+    deltas = {}
+    for alert in alerts:
+        name = f'alerts:{alert.alert_type}'
+        deltas[name] = (deltas.get(name, (0, 0.0))[0] + sign, 0.0)
+    return deltas
+
+
+def invalidate():
+    """ Descarta la respuesta cacheada en todos los procesos cuando confirme la transacción en curso. """
+    # Tras el commit y no dentro de la transacción: la fila de versión no queda bloqueada mientras
+    # dura cada sesión de calificación. Un fallo se registra sin afectar al cambio ya confirmado;
+    # la respuesta vieja caduca igual a los DASHBOARD_CACHE_TIMEOUT segundos.
+    transaction.on_commit(lambda: versions.bump(VERSION_NAME), robust=True)
+
+
+def payload_key(version=None):
+    """ Clave de la respuesta cacheada para ``version`` (por defecto, la actual). """
+    return f'{PAYLOAD_KEY}:{versions.current(VERSION_NAME) if version is None else version}'
+
+
+def apply_deltas(deltas):
+    """ Suma ``deltas`` ({nombre: (count, total)}) a DashboardStat en una sola sentencia. """
+    deltas = {name: value for name, value in deltas.items() if value != (0, 0.0)}
+    if not deltas:
+        return
+    quote = connection.ops.quote_name
+    table = quote(DashboardStat._meta.db_table)
+    name, count, total, updated_at = (quote(column) for column in ('name', 'count', 'total', 'updated_at'))
+    now = timezone.now()
+    rows = ', '.join(['(%s, %s, %s, %s)'] * len(deltas))
+    params = [value for item, (delta_count, delta_total) in deltas.items() for value in (item, delta_count, delta_total, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({name}, {count}, {total}, {updated_at}) VALUES {rows} '
+            f'ON CONFLICT ({name}) DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}, '
+            f'{total} = {table}.{total} + EXCLUDED.{total}, {updated_at} = EXCLUDED.{updated_at}',
+            params,
+        )
+    invalidate()
+
+
+def _replace(condition, stats):
+    """ Reemplaza las filas que cumplen ``condition`` (un Q) por ``stats`` ({nombre: (count, total)}). """
+    with transaction.atomic():
+        DashboardStat.objects.filter(condition).delete()
+        DashboardStat.objects.bulk_create([
+            DashboardStat(name=name, count=count, total=total) for name, (count, total) in stats.items()
+        ])
+        invalidate()
+
+
+def rebuild_scores(raza_ids=None):
+    """ Recalcula promedios e histogramas de score (de ``raza_ids`` o de todas las razas). """
+    ejemplares = Ejemplar.objects.filter(score_total__isnull=False)
+    if raza_ids is not None:
+        ejemplares = ejemplares.filter(raza_id__in=raza_ids)
+    stats = {}
+    for row in ejemplares.values('raza_id').annotate(n=Count('id'), total=Sum('score_total')).order_by():
+        stats[f'breed:{row["raza_id"]}'] = (row['n'], row['total'])
+    # Mismo criterio que histogram_bin, resuelto en la base
+    score_bin = Least(Greatest(Floor(F('score_total') / 10), Value(0.0)), Value(HISTOGRAM_BINS - 1.0))
+    for row in ejemplares.annotate(bin=score_bin).values('raza_id', 'bin').annotate(n=Count('id')).order_by():
+        stats[f'histogram:{row["raza_id"]}:{int(row["bin"])}'] = (row['n'], 0.0)
+    if raza_ids is None:
+        condition = Q(name__startswith='breed:') | Q(name__startswith='histogram:')
+    else:
+        condition = Q(name__in=[f'breed:{raza_id}' for raza_id in raza_ids])
+        for raza_id in raza_ids:
+            condition |= Q(name__startswith=f'histogram:{raza_id}:')
+    _replace(condition, stats)
+
+
+def rebuild_alerts():
+    stats = {
+        f'alerts:{row["alert_type"]}': (row['n'], 0.0)
+        for row in Alert.objects.values('alert_type').annotate(n=Count('id')).order_by()
+    }
+    _replace(Q(name__startswith='alerts:'), stats)
+
+
+def refresh_sensor_coverage():
+    """ Ejemplares con lecturas dentro de la ventana (DASHBOARD_COVERAGE_WINDOW) sobre el total. """
+    since = timezone.now() - getattr(settings, 'DASHBOARD_COVERAGE_WINDOW', timedelta(hours=24))
+    animals = Ejemplar.objects.count()
+    # Una fila por ejemplar con su última lectura (api.latest_readings): no recorre el historial
+    reporting = SensorLatest.objects.filter(timestamp__gte=since).count()
+    _replace(Q(name__startswith='sensors:'), {'sensors:animals': (animals, 0.0), 'sensors:reporting': (reporting, 0.0)})
+    return reporting, animals
+
+
+def enqueue_coverage_refresh():
+    """ Tras una ingesta, recalcula la cobertura en segundo plano como máximo una vez por intervalo. """
+    interval = getattr(settings, 'DASHBOARD_COVERAGE_REFRESH_INTERVAL', 300)
+    if cache.add(COVERAGE_PENDING_KEY, True, timeout=interval):
+        return tasks.submit(refresh_sensor_coverage)
+    return None
+
+
+def rebuild():
+    """ Recalcula todos los indicadores desde las tablas de origen. """
+    rebuild_scores()
+    rebuild_alerts()
+    refresh_sensor_coverage()
+    _replace(Q(name=BUILT_STAT), {BUILT_STAT: (1, 0.0)})
+
+
+def build_payload(recent_scores):
+    """ Respuesta del dashboard a partir de DashboardStat; ``recent_scores`` ya serializados. """
+    stats = {stat.name: stat for stat in DashboardStat.objects.all()}
+    if BUILT_STAT not in stats:
+        # Primera consulta tras el despliegue: se llena la tabla una vez
+        rebuild()
+        stats = {stat.name: stat for stat in DashboardStat.objects.all()}
+    return _payload(stats, dict(Raza.objects.values_list('pk', 'nombre')), recent_scores)
+
+
+async def abuild_payload(recent_scores):
+    """ ``build_payload`` con el ORM asíncrono. """
+    stats = {stat.name: stat async for stat in DashboardStat.objects.all()}
+    if BUILT_STAT not in stats:
+        return await sync_to_async(build_payload)(recent_scores)
+    return _payload(stats, {pk: nombre async for pk, nombre in Raza.objects.values_list('pk', 'nombre')}, recent_scores)
+
+
+def _payload(stats, breeds, recent_scores):
+    by_breed = []
+    for raza_id, nombre in breeds.items():
+        stat = stats.get(f'breed:{raza_id}')
+        if stat is None or stat.count <= 0:
+            continue
+        by_breed.append({
+            'breedName': nombre,
+            'averageScore': stat.total / stat.count,
+            'count': stat.count,
+            'histogram': [
+                stats[f'histogram:{raza_id}:{index}'].count if f'histogram:{raza_id}:{index}' in stats else 0
+                for index in range(HISTOGRAM_BINS)
+            ],
+        })
+    by_breed.sort(key=lambda item: item['breedName'])
+
+    animals = stats.get('sensors:animals')
+    reporting = stats.get('sensors:reporting')
+    window = getattr(settings, 'DASHBOARD_COVERAGE_WINDOW', timedelta(hours=24))
+    return {
+        'averageScoresByBreed': by_breed,
+        'recentScores': recent_scores,
+        'alertsByType': {
+            choice: stats[f'alerts:{choice}'].count if f'alerts:{choice}' in stats else 0
+            for choice in Alert.AlertType.values
+        },
+        'sensorCoverage': {
+            'animals': animals.count if animals else 0,
+            'reporting': reporting.count if reporting else 0,
+            'windowHours': window.total_seconds() / 3600,
+            'updatedAt': reporting.updated_at if reporting else None,
+        },
+        'generatedAt': timezone.now(),
+    }
+
+
+def get_payload(build_recent_scores):
+    """ Respuesta cacheada del dashboard; ``build_recent_scores`` se llama solo si hay que regenerarla. """
+    key = payload_key()
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_payload(build_recent_scores())
+        # Dentro de una transacción los datos podrían no confirmarse: no se cachea
+        if not connection.in_atomic_block:
+            cache.set(key, payload, timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return payload
+
+
+async def aget_payload(build_recent_scores):
+    """ ``get_payload`` para vistas asíncronas; ``build_recent_scores`` es una corrutina. """
+    key = payload_key(await versions.acurrent(VERSION_NAME))
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await abuild_payload(await build_recent_scores())
+        if not await sync_to_async(lambda: connection.in_atomic_block)():
+            await cache.aset(key, payload, timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return payload
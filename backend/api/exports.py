@@ -0,0 +1,286 @@
+"""
+Exportación masiva de lecturas (SensorData) y calificaciones a archivos
+columnares para análisis fuera de la aplicación.
+
+Las filas se leen con un cursor del lado del servidor (``iterator`` o
+``connection.chunked_cursor``) en bloques de ``EXPORT_CHUNK_SIZE`` y cada
+bloque se escribe de inmediato, así que la memoria no depende del tamaño de la
+exportación. Formatos:
+
+- ``parquet``: Parquet con zstd, un row group por bloque (requiere pyarrow).
+- ``arrow``: Arrow IPC en formato stream (requiere pyarrow).
+- ``csv``: CSV comprimido con gzip (solo biblioteca estándar).
+
+El destino puede ser un archivo (``export_to_file``) o una respuesta HTTP en
+streaming (``export_stream`` genera los bytes a medida que se producen).
+"""
+import csv
+import gzip
+import io
+import itertools
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import SensorData, Calificacion
+
+FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows'),
+    'csv': ('application/gzip', '.csv.gz'),
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+class Column:
+    """ Columna exportada: nombre, lookup de ``values_list`` y tipo de Arrow (int64, float64, string, timestamp, date). """
+    __slots__ = ('name', 'lookup', 'type')
+
+    def __init__(self, name, type, lookup=None):
+        self.name = name
+        self.type = type
+        self.lookup = lookup or name
+
+
+SENSOR_DATA_COLUMNS = (
+    Column('id', 'int64'),
+    Column('ejemplar_id', 'int64'),
+    Column('timestamp', 'timestamp'),
+    Column('temperatura', 'float64'),
+    Column('actividad', 'float64'),
+)
+
+
+class Dataset:
+    """ Tabla exportable: columnas y campo de fecha por el que se acota con ``from``/``to``. """
+
+    def __init__(self, model, columns, date_field):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+
+    def queryset(self, ejemplar_ids=None, raza_id=None, start=None, end=None):
+        queryset = self.model.objects.all()
+        if ejemplar_ids:
+            queryset = queryset.filter(ejemplar_id__in=ejemplar_ids)
+        if raza_id is not None:
+            queryset = queryset.filter(ejemplar__raza_id=raza_id)
+        if start is not None:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{self.date_field}__lt': end})
+        # Orden del índice (ejemplar, fecha): el archivo queda agrupado por ejemplar y comprime mejor
+        return queryset.order_by('ejemplar_id', self.date_field, 'id').values_list(*(column.lookup for column in self.columns))
+
+
+DATASETS = {
+    'sensor-data': Dataset(SensorData, SENSOR_DATA_COLUMNS + (
+        Column('identificador', 'string', 'ejemplar__identificador'),
+    ), 'timestamp'),
+    'calificaciones': Dataset(Calificacion, (
+        Column('id', 'int64'),
+        Column('ejemplar_id', 'int64'),
+        Column('identificador', 'string', 'ejemplar__identificador'),
+        Column('caracteristica_id', 'int64'),
+        Column('caracteristica', 'string', 'caracteristica__nombre'),
+        Column('puntuacion_obtenida', 'float64'),
+        Column('fecha_calificacion', 'date'),
+        Column('evaluador_id', 'int64'),
+    ), 'fecha_calificacion'),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ExportError('Los formatos parquet y arrow requieren pyarrow (pip install pyarrow).')
+    return pa
+
+
+def _arrow_schema(pa, columns):
+    types = {
+        'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string(),
+        'timestamp': pa.timestamp('us', tz='UTC'), 'date': pa.date32(),
+    }
+    return pa.schema([(column.name, types[column.type]) for column in columns])
+
+
+def _arrow_batch(pa, schema, rows):
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema,
+    )
+
+
+class ParquetWriter:
+    def __init__(self, fileobj, columns):
+        self.pa = _pyarrow()
+        import pyarrow.parquet as pq
+        self.schema = _arrow_schema(self.pa, columns)
+        self.writer = pq.ParquetWriter(fileobj, self.schema, compression='zstd')
+
+    def write(self, rows):
+        self.writer.write_batch(_arrow_batch(self.pa, self.schema, rows))
+
+    def close(self):
+        self.writer.close()
+
+
+class ArrowWriter:
+    def __init__(self, fileobj, columns):
+        self.pa = _pyarrow()
+        self.schema = _arrow_schema(self.pa, columns)
+        self.writer = self.pa.ipc.new_stream(fileobj, self.schema)
+
+    def write(self, rows):
+        self.writer.write_batch(_arrow_batch(self.pa, self.schema, rows))
+
+    def close(self):
+        self.writer.close()
+
+
+class CSVWriter:
+    def __init__(self, fileobj, columns):
+        self.gzip = gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6)
+        self.text = io.StringIO()
+        self.csv = csv.writer(self.text, lineterminator='\n')
+        self.csv.writerow([column.name for column in columns])
+        # Fechas en ISO 8601, como en la API
+        self.datetimes = [index for index, column in enumerate(columns) if column.type in ('timestamp', 'date')]
+
+    def write(self, rows):
+        if self.datetimes:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for index in self.datetimes:
+                    if row[index] is not None:
+                        row[index] = row[index].isoformat()
+        self.csv.writerows(rows)
+        self.gzip.write(self.text.getvalue().encode())
+        self.text.seek(0)
+        self.text.truncate()
+
+    def close(self):
+        if self.text.tell():
+            self.gzip.write(self.text.getvalue().encode())
+        self.gzip.close()
+
+
+WRITERS = {'parquet': ParquetWriter, 'arrow': ArrowWriter, 'csv': CSVWriter}
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 50000)
+
+
+def iter_chunks(queryset, size=None):
+    """
+    Bloques de filas de ``queryset`` leídos con un cursor del lado del servidor.
+
+    Se lee dentro de una transacción: en autocommit PostgreSQL declara el
+    cursor WITH HOLD y materializa el resultado completo antes de la primera fila.
+    """
+    size = size or chunk_size()
+    with transaction.atomic():
+        rows = queryset.iterator(chunk_size=size)
+        while True:
+            chunk = list(itertools.islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def cursor_chunks(cursor, size=None):
+    """ Bloques de filas de un cursor ya ejecutado (``connection.chunked_cursor``). """
+    size = size or chunk_size()
+    while True:
+        chunk = cursor.fetchmany(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_chunks(chunks, columns, file_format, fileobj):
+    """ Escribe ``chunks`` (listas de tuplas en el orden de ``columns``) en ``fileobj``; devuelve las filas escritas. """
+    if file_format not in WRITERS:
+        raise ExportError(f'Formato desconocido: {file_format}. Use uno de: {", ".join(WRITERS)}.')
+    writer = WRITERS[file_format](fileobj, columns)
+    rows = 0
+    for chunk in chunks:
+        writer.write(chunk)
+        rows += len(chunk)
+    writer.close()
+    return rows
+
+
+class _Buffer(io.RawIOBase):
+    """ Destino en memoria que se vacía después de cada bloque (ver ``export_stream``). """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def export_stream(dataset, file_format, size=None, **filters):
+    """ Genera los bytes de la exportación a medida que se escriben (para StreamingHttpResponse). """
+    dataset = DATASETS[dataset]
+    if file_format not in WRITERS:
+        raise ExportError(f'Formato desconocido: {file_format}. Use uno de: {", ".join(WRITERS)}.')
+    buffer = _Buffer()
+    writer = WRITERS[file_format](buffer, dataset.columns)
+
+    def generate():
+        for chunk in iter_chunks(dataset.queryset(**filters), size):
+            writer.write(chunk)
+            data = buffer.drain()
+            if data:
+                yield data
+        writer.close()
+        yield buffer.drain()
+    return generate()
+
+
+async def aiter_stream(chunks):
+    """
+    Versión asíncrona de ``export_stream`` para ASGI: cada bloque se genera en
+    el hilo de la petición, donde vive la transacción del cursor.
+    """
+    done = object()
+    try:
+        while (data := await sync_to_async(next)(chunks, done)) is not done:
+            yield data
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def export_to_file(dataset, file_format, path, size=None, **filters):
+    """ Exporta ``dataset`` a ``path``; devuelve las filas escritas. """
+    dataset = DATASETS[dataset]
+    with open(path, 'wb') as fileobj:
+        return write_chunks(iter_chunks(dataset.queryset(**filters), size), dataset.columns, file_format, fileobj)
+
+
+def filename(dataset, file_format, now=None):
+    now = now or datetime.now()
+    return f'{dataset}-{now:%Y%m%d-%H%M%S}{FORMATS[file_format][1]}'
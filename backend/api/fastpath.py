@@ -0,0 +1,222 @@
+"""
+Serialización rápida de los listados de solo lectura.
+
+Con miles de filas el costo de un listado lo dominan la instanciación de
+modelos y el ``to_representation`` de cada campo. ``RowSerializer`` compila
+una vez por petición las columnas de un serializer de DRF (respetando
+``?fields=``) a lookups de ``values_list`` con su conversión, arma los dicts
+directamente desde las tuplas y ``render`` los codifica con orjson. La salida
+es byte a byte la misma que la de JSONRenderer: si orjson escribiría algo
+distinto (floats con exponente, U+2028/U+2029) se usa el módulo json. La
+única diferencia son los floats NaN/infinito, que DRF rechaza con un error y
+orjson escribe como null.
+
+Los SerializerMethodField necesitan una columna equivalente declarada en
+``fast_columns`` del serializer (ver ``absolute_file_url``).
+"""
+import json
+import re
+from datetime import date, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.utils.http import parse_header_parameters
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Campos cuyo to_representation devuelve el mismo valor que entrega la base
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.FloatField, serializers.BooleanField,
+)
+
+# Números que orjson escribe distinto que json: exponentes (1e16 frente a 1e+16) y
+# valores menores que 1e-4 (0.00001 frente a 1e-05). La expresión empieza con un
+# literal para que la búsqueda sea rápida; el contexto se verifica en _diverges.
+_DIVERGENT_CANDIDATE = re.compile(rb'0\.0000|e[-0-9]')
+
+
+def absolute_file_url(lookup):
+    """ Columna rápida para un SerializerMethodField que devuelve la URL absoluta del archivo en ``lookup``. """
+    def factory(serializer):
+        field = _model_field(serializer.Meta.model, lookup)
+        request = serializer.context.get('request')
+        if request is None:
+            return lambda name: None
+        return lambda name: request.build_absolute_uri(field.storage.url(name)) if name else None
+    return lookup, factory
+
+
+def _model_field(model, lookup):
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+    if output_format.lower() != ISO_8601:
+        return field.to_representation
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    utc_output = tz is not None and str(tz) in ('UTC', 'Etc/UTC')
+
+    def convert(value):
+        # Caso común (base y zona horaria en UTC): se evita el astimezone
+        if utc_output and value.tzinfo is dt_timezone.utc:
+            return value.isoformat()[:-6] + 'Z'
+        # Mismo resultado que DateTimeField.enforce_timezone + to_representation
+        if tz is not None and value.tzinfo is not None:
+            value = value.astimezone(tz)
+        else:
+            value = field.enforce_timezone(value)
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _converter(field):
+    """ Función que replica ``field.to_representation`` sobre el valor crudo de la base; None si no hace falta. """
+    if isinstance(field, serializers.ChoiceField):
+        if all(str(key) == value for key, value in field.choice_strings_to_values.items()):
+            return None
+        return field.to_representation
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.DateField):
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is None:
+            return None
+        return date.isoformat if output_format.lower() == ISO_8601 else field.to_representation
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return None
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    raise ImproperlyConfigured(f'{type(field).__name__} no es compatible con la serialización rápida.')
+
+
+def compile_columns(serializer):
+    """ [(nombre, lookup de values_list, conversor o None)] de los campos legibles de ``serializer``. """
+    fast_columns = getattr(serializer, 'fast_columns', {})
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in fast_columns:
+            lookup, factory = fast_columns[name]
+            columns.append((name, lookup, factory(serializer)))
+            continue
+        if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+            raise ImproperlyConfigured(f'{type(serializer).__name__}.{name} necesita una entrada en fast_columns.')
+        columns.append((name, '__'.join(field.source_attrs), _converter(field)))
+    return columns
+
+
+class RowSerializer:
+    """ Columnas precompiladas de un serializer: lee con values_list y arma los dicts de salida. """
+
+    def __init__(self, serializer, extra_lookups=()):
+        columns = compile_columns(serializer)
+        self.keys = [name for name, _, _ in columns]
+        self.lookups = list(dict.fromkeys([lookup for _, lookup, _ in columns] + list(extra_lookups)))
+        positions = {lookup: index for index, lookup in enumerate(self.lookups)}
+        self.positions = [positions[lookup] for _, lookup, _ in columns]
+        self.converters = [(index, convert) for index, (_, _, convert) in enumerate(columns) if convert is not None]
+        self.float_positions = [
+            index for index, (name, _, _) in enumerate(columns)
+            if isinstance(serializer.fields.get(name), serializers.FloatField)
+        ]
+
+    def rows(self, queryset):
+        """ Queryset de tuplas con nombre (la paginación por keyset lee los campos de orden por atributo). """
+        return queryset.values_list(*self.lookups, named=True)
+
+    def plain_floats(self, rows):
+        """ True si ningún float de ``rows`` se escribe con exponente (ver ``render``). """
+        for index in self.float_positions:
+            position = self.positions[index]
+            values = [abs(value) for value in (row[position] for row in rows) if value]
+            if values and (min(values) < 1e-4 or max(values) >= 1e16):
+                return False
+        return True
+
+    def to_dicts(self, rows):
+        keys, positions, converters = self.keys, self.positions, self.converters
+        if positions == list(range(len(keys))) and not converters:
+            return [dict(zip(keys, row)) for row in rows]
+        result = []
+        for row in rows:
+            values = [row[index] for index in positions]
+            for index, convert in converters:
+                if values[index] is not None:
+                    values[index] = convert(values[index])
+            result.append(dict(zip(keys, values)))
+        return result
+
+
+def enabled(request):
+    """ La respuesta se puede generar por la vía rápida: JSON compacto sin indentación. """
+    if not getattr(settings, 'API_FAST_SERIALIZATION', True):
+        return False
+    renderer = getattr(request, 'accepted_renderer', None)
+    if type(renderer) is not JSONRenderer:
+        return False
+    _, params = parse_header_parameters(request.accepted_media_type or '')
+    return 'indent' not in params
+
+
+def _diverges(content):
+    for match in _DIVERGENT_CANDIDATE.finditer(content):
+        previous = content[match.start() - 1:match.start()]
+        if match.group().startswith(b'e'):
+            if previous.isdigit():
+                return True
+        elif previous in b':,[-':
+            return True
+    return False
+
+
+def render(data, plain_floats=False):
+    """
+    Equivalente byte a byte de JSONRenderer().render(data) para datos ya primitivos.
+
+    Con ``plain_floats`` (verificado con ``RowSerializer.plain_floats``) se omite
+    la búsqueda de números divergentes en la salida de orjson.
+    """
+    strict_defaults = api_settings.UNICODE_JSON and api_settings.COMPACT_JSON and api_settings.STRICT_JSON
+    content = orjson.dumps(data) if orjson is not None and strict_defaults else None
+    if content is None or (not plain_floats and _diverges(content)):
+        content = json.dumps(
+            data, ensure_ascii=not api_settings.UNICODE_JSON, allow_nan=not api_settings.STRICT_JSON,
+            separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': '),
+        ).encode()
+    # Igual que JSONRenderer: JSON válido también como JavaScript
+    return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastListMixin:
+    """ ``list`` por la vía rápida para las peticiones JSON; el resto sigue por los serializers de DRF. """
+
+    def list(self, request, *args, **kwargs):
+        if not enabled(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = [name.lstrip('-') for name in getattr(self.paginator, 'ordering', ())]
+        row_serializer = RowSerializer(self.get_serializer(), extra_lookups=ordering)
+        rows = row_serializer.rows(queryset)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            page = list(rows)
+            data = row_serializer.to_dicts(page)
+        else:
+            data = self.paginator.get_paginated_data(row_serializer.to_dicts(page))
+        content = render(data, plain_floats=row_serializer.plain_floats(page))
+        return HttpResponse(content, content_type='application/json')
@@ -0,0 +1,292 @@
+"""
+Ingesta por lotes de lecturas de sensores (SensorData).
+
+Las lecturas llegan identificadas por el RFID del ejemplar (``identificador``).
+Todos los RFID de un lote se resuelven con una única consulta y las filas
+válidas se escriben con ``bulk_create`` o, en PostgreSQL y para lotes grandes,
+con ``COPY``. Las filas inválidas no detienen el lote: se devuelven como
+rechazos indicando su posición dentro del payload.
+
+Para subidas grandes (gateways que vuelcan horas de lecturas acumuladas) está
+``stream_ingest``, que lee el cuerpo NDJSON línea a línea y confirma lotes de
+tamaño fijo a medida que avanza, registrando el offset confirmado en
+``IngestSession`` para que el gateway pueda reanudar tras un corte.
+"""
+import io
+import json
+import logging
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Ejemplar, SensorData, IngestSession
+from . import alerts, dashboard, latest_readings, push, rollups
+
+logger = logging.getLogger(__name__)
+
+READING_FIELDS = ('temperatura', 'actividad')
+COPY_COLUMNS = ('ejemplar_id', 'timestamp', 'temperatura', 'actividad')
+
+
+class IngestConflict(Exception):
+    """ Otra petición confirmó registros de la misma subida en paralelo. """
+
+
+class IngestResult:
+    """
+    Acumula el número de filas aceptadas y los rechazos de un lote.
+
+    Solo se guarda el detalle de los primeros ``max_rejects`` rechazos para que
+    una subida llena de filas inválidas no crezca sin límite en memoria.
+    """
+
+    def __init__(self, max_rejects=None):
+        self.accepted = 0
+        self.rejected = []
+        self.rejected_count = 0
+        self.max_rejects = max_rejects
+
+    def reject(self, row, errors, identificador=None):
+        self.rejected_count += 1
+        if self.max_rejects is None or len(self.rejected) < self.max_rejects:
+            self.rejected.append({'row': row, 'identificador': identificador, 'errors': errors})
+
+    def as_dict(self):
+        return {'accepted': self.accepted, 'rejected_count': self.rejected_count, 'rejected': self.rejected}
+
+
+def _parse_float(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError('Se esperaba un número.')
+    value = float(value)
+    # nan, inf o 1e999 envenenarían la última lectura, los rollups y la línea base de alertas
+    if not math.isfinite(value):
+        raise ValueError('Se esperaba un número.')
+    return value
+
+
+def _parse_timestamp(value):
+    if value is None or value == '':
+        return timezone.now()
+    if not isinstance(value, datetime):
+        value = parse_datetime(str(value))
+        if value is None:
+            raise ValueError('Formato de fecha inválido, use ISO 8601.')
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def resolve_identificadores(identificadores):
+    """ Devuelve {identificador: ejemplar_id} con una sola consulta. """
+    if not identificadores:
+        return {}
+    return dict(
+        Ejemplar.objects.filter(identificador__in=set(identificadores)).values_list('identificador', 'id')
+    )
+
+
+def build_readings(records, result, start_row=0, rows=None):
+    """
+    Valida ``records`` y devuelve instancias de SensorData sin guardar.
+
+    ``start_row`` es la posición del primer registro dentro del payload
+    completo, de modo que los rechazos se reportan con su posición absoluta.
+    ``rows`` permite indicar la posición de cada registro explícitamente.
+    """
+    identificadores = [
+        str(record['identificador']) for record in records
+        if isinstance(record, dict) and record.get('identificador') not in (None, '')
+    ]
+    ejemplar_ids = resolve_identificadores(identificadores)
+
+    readings = []
+    if rows is None:
+        rows = range(start_row, start_row + len(records))
+    for row, record in zip(rows, records):
+        if not isinstance(record, dict):
+            result.reject(row, {'non_field_errors': ['Se esperaba un objeto.']})
+            continue
+
+        identificador = record.get('identificador')
+        identificador = str(identificador) if identificador not in (None, '') else None
+        errors = {}
+        if identificador is None:
+            errors['identificador'] = ['Este campo es requerido.']
+        elif identificador not in ejemplar_ids:
+            errors['identificador'] = ['No existe un ejemplar con este identificador.']
+
+        values = {}
+        for field in READING_FIELDS:
+            try:
+                values[field] = _parse_float(record.get(field))
+            except (TypeError, ValueError, OverflowError):
+                errors[field] = ['Se esperaba un número.']
+        if not errors and values['temperatura'] is None and values['actividad'] is None:
+            errors['non_field_errors'] = ['La lectura no contiene temperatura ni actividad.']
+
+        try:
+            timestamp = _parse_timestamp(record.get('timestamp'))
+        except (TypeError, ValueError) as exc:
+            errors['timestamp'] = [str(exc)]
+
+        if errors:
+            result.reject(row, errors, identificador)
+            continue
+
+        readings.append(SensorData(ejemplar_id=ejemplar_ids[identificador], timestamp=timestamp, **values))
+    return readings
+
+
+def _use_copy(readings):
+    threshold = getattr(settings, 'SENSOR_INGEST_COPY_THRESHOLD', 1000)
+    return connection.vendor == 'postgresql' and threshold is not None and len(readings) >= threshold
+
+
+def _copy_value(value):
+    if value is None:
+        return r'\N'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def copy_readings(readings):
+    """ Escribe las lecturas con COPY FROM STDIN (solo PostgreSQL). """
+    sql = f'COPY {SensorData._meta.db_table} ({", ".join(COPY_COLUMNS)}) FROM STDIN'
+    rows = ((r.ejemplar_id, r.timestamp, r.temperatura, r.actividad) for r in readings)
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy'):
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            # psycopg2
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(_copy_value(value) for value in row))
+                buffer.write('\n')
+            buffer.seek(0)
+            raw_cursor.copy_expert(sql, buffer)
+
+
+def _after_commit(readings):
+    alerts.enqueue_readings(readings)
+    rollups.enqueue_readings(readings)
+    dashboard.enqueue_coverage_refresh()
+    # Al final y sin propagar errores: las lecturas ya se confirmaron y un broker caído
+    # (Redis) no debe saltarse el resto ni devolver un 500 al gateway
+    try:
+        push.publish_readings(readings)
+    except Exception:
+        logger.exception('No se pudieron publicar %d lecturas en los eventos en vivo', len(readings))
+
+
+def dispatch_readings(readings):
+    """
+    Actualiza la última lectura de cada ejemplar en la transacción en curso y
+    programa el procesamiento posterior (alertas, rollups, cobertura del
+    dashboard, eventos en vivo) para cuando confirme.
+    """
+    if readings:
+        latest_readings.upsert(readings)
+        transaction.on_commit(lambda: _after_commit(readings))
+
+
+def write_readings(readings):
+    """ Persiste las lecturas ya validadas y devuelve cuántas se escribieron. """
+    if not readings:
+        return 0
+    if _use_copy(readings):
+        copy_readings(readings)
+    else:
+        SensorData.objects.bulk_create(readings, batch_size=getattr(settings, 'SENSOR_INGEST_BATCH_SIZE', 1000))
+    dispatch_readings(readings)
+    return len(readings)
+
+
+def ingest_records(records, start_row=0):
+    """ Valida y guarda un lote de registros en una sola transacción. """
+    result = IngestResult()
+    readings = build_readings(records, result, start_row=start_row)
+    with transaction.atomic():
+        result.accepted = write_readings(readings)
+    return result
+
+
+def iter_ndjson(stream, start_offset=0):
+    """
+    Genera ``(offset, registro, error)`` leyendo ``stream`` línea a línea.
+
+    Las líneas vacías se ignoran y no consumen offset. Si una línea no es JSON
+    válido se genera con ``registro=None`` y el mensaje de error.
+    """
+    offset = start_offset
+    for raw_line in stream:
+        line = raw_line.strip()
+        if not line:
+            continue
+        try:
+            record, error = json.loads(line), None
+        except ValueError as exc:
+            record, error = None, f'JSON inválido: {exc}'
+        yield offset, record, error
+        offset += 1
+
+
+def _flush_stream_batch(session, batch, first_offset, result):
+    records, rows = [], []
+    for row, (record, error) in enumerate(batch, start=first_offset):
+        if error is None:
+            records.append(record)
+            rows.append(row)
+        else:
+            result.reject(row, {'non_field_errors': [error]})
+    readings = build_readings(records, result, rows=rows)
+
+    next_offset = first_offset + len(batch)
+    with transaction.atomic():
+        written = write_readings(readings)
+        updated = IngestSession.objects.filter(pk=session.pk, acknowledged=session.acknowledged).update(
+            acknowledged=next_offset, updated_at=timezone.now()
+        )
+        if not updated:
+            raise IngestConflict
+    session.acknowledged = next_offset
+    result.accepted += written
+
+
+def stream_ingest(stream, session, start_offset=0, batch_size=None):
+    """
+    Ingiere un cuerpo NDJSON de forma incremental.
+
+    ``start_offset`` es el offset del primer registro del cuerpo; los registros
+    ya confirmados en ``session`` se saltan, por lo que reenviar una subida
+    interrumpida desde cualquier offset anterior es seguro. Cada lote se
+    escribe junto con el nuevo offset confirmado en la misma transacción.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'SENSOR_INGEST_STREAM_BATCH_SIZE', 1000)
+    result = IngestResult(max_rejects=getattr(settings, 'SENSOR_INGEST_MAX_REJECTS', 1000))
+    batch = []
+    first_offset = None
+    for offset, record, error in iter_ndjson(stream, start_offset):
+        if offset < session.acknowledged:
+            continue
+        if first_offset is None:
+            first_offset = offset
+        batch.append((record, error))
+        if len(batch) >= batch_size:
+            _flush_stream_batch(session, batch, first_offset, result)
+            batch, first_offset = [], None
+    if batch:
+        _flush_stream_batch(session, batch, first_offset, result)
+    return result
@@ -0,0 +1,77 @@
+"""
+Última lectura de cada ejemplar (tabla SensorLatest).
+
+La vista del establo necesita la temperatura y la actividad actuales de todo
+el hato; calcularlas desde SensorData obliga a recorrer el historial. Por eso
+cada lote de la ingesta, en su misma transacción, reduce sus lecturas a la
+más reciente por ejemplar y las escribe con un único INSERT ... ON CONFLICT
+DO UPDATE que solo reemplaza la fila guardada si la lectura nueva no es más
+antigua (un gateway que sube horas atrasadas no pisa el estado actual).
+``rebuild`` regenera la tabla desde los datos crudos.
+"""
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Ejemplar, SensorData, SensorLatest
+
+COLUMNS = ('ejemplar_id', 'timestamp', 'temperatura', 'actividad', 'updated_at')
+
+
+def latest_per_animal(readings):
+    """ La lectura más reciente de cada ejemplar de ``readings``, ordenadas por ejemplar. """
+    latest = {}
+    for reading in readings:
+        current = latest.get(reading.ejemplar_id)
+        if current is None or reading.timestamp >= current.timestamp:
+            latest[reading.ejemplar_id] = reading
+    return [latest[ejemplar_id] for ejemplar_id in sorted(latest)]
+
+
+def upsert(readings, batch_size=1000):
+    """ Actualiza SensorLatest con un lote de SensorData; devuelve cuántos ejemplares tocó el lote. """
+    latest = latest_per_animal(readings)
+    if not latest:
+        return 0
+    quote = connection.ops.quote_name
+    table = quote(SensorLatest._meta.db_table)
+    ejemplar_id, timestamp, temperatura, actividad, updated_at = (quote(column) for column in COLUMNS)
+    adapt = connection.ops.adapt_datetimefield_value
+    now = adapt(timezone.now())
+    # Orden por ejemplar: dos lotes concurrentes bloquean las filas en el mismo orden y no se interbloquean
+    with connection.cursor() as cursor:
+        for start in range(0, len(latest), batch_size):
+            batch = latest[start:start + batch_size]
+            rows = ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))
+            params = [
+                value for reading in batch
+                for value in (reading.ejemplar_id, adapt(reading.timestamp), reading.temperatura, reading.actividad, now)
+            ]
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(quote(column) for column in COLUMNS)}) VALUES {rows} '
+                f'ON CONFLICT ({ejemplar_id}) DO UPDATE SET {timestamp} = EXCLUDED.{timestamp}, '
+                f'{temperatura} = EXCLUDED.{temperatura}, {actividad} = EXCLUDED.{actividad}, '
+                f'{updated_at} = EXCLUDED.{updated_at} WHERE {table}.{timestamp} <= EXCLUDED.{timestamp}',
+                params,
+            )
+    return len(latest)
+
+
+def rebuild(ejemplar_ids=None):
+    """ Regenera SensorLatest desde SensorData (todos los ejemplares o ``ejemplar_ids``). """
+    last = SensorData.objects.filter(ejemplar_id=OuterRef('pk')).order_by('-timestamp', '-id')
+    ejemplares = Ejemplar.objects.all() if ejemplar_ids is None else Ejemplar.objects.filter(pk__in=ejemplar_ids)
+    # Una búsqueda por índice (ejemplar, -timestamp) por ejemplar, sin agrupar todo el historial
+    rows = ejemplares.annotate(
+        last_timestamp=Subquery(last.values('timestamp')[:1]),
+        last_temperatura=Subquery(last.values('temperatura')[:1]),
+        last_actividad=Subquery(last.values('actividad')[:1]),
+    ).filter(last_timestamp__isnull=False).values_list('pk', 'last_timestamp', 'last_temperatura', 'last_actividad')
+    with transaction.atomic():
+        stale = SensorLatest.objects.all() if ejemplar_ids is None else SensorLatest.objects.filter(ejemplar_id__in=ejemplar_ids)
+        stale.delete()
+        created = SensorLatest.objects.bulk_create([
+            SensorLatest(ejemplar_id=pk, timestamp=timestamp, temperatura=temperatura, actividad=actividad)
+            for pk, timestamp, temperatura, actividad in rows
+        ], batch_size=1000)
+    return len(created)
@@ -0,0 +1,311 @@
+"""
+Pruebas de carga contra la aplicación ASGI o WSGI en proceso o contra un servidor.
+
+Los clientes virtuales son corrutinas que piden rutas de una mezcla de
+``Target`` ponderados hasta completar el total de peticiones. Con ASGI cada
+petición entra a ``mycows_rfi.asgi.application`` como lo haría desde uvicorn;
+con WSGI se atiende en un pool de ``workers`` hilos, como un servidor WSGI
+con hilos (gunicorn ``--threads``), y la espera por un hilo libre cuenta en
+la latencia. Con ``HttpClient`` las peticiones van por HTTP a un servidor ya
+levantado (runserver, gunicorn, uvicorn), con una conexión keep-alive por
+cliente. ``simulated_db_latency`` agrega una demora a cada consulta SQL para
+reproducir una base lenta sin depender del hardware.
+"""
+import asyncio
+import http.client
+import io
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from urllib.parse import unquote, urlsplit
+
+from django.db.backends.signals import connection_created
+from django.db import connections
+
+HOST = 'localhost'
+
+
+class Target:
+    """
+    Ruta de la mezcla de tráfico con su peso relativo.
+
+    ``path`` puede ser una función ``path(rng)`` para variar la ruta en cada
+    petición (p. ej. un ejemplar al azar) y ``body(rng)`` arma el cuerpo en
+    bytes de las peticiones con ``method`` distinto de GET.
+    """
+    __slots__ = ('name', 'path', 'weight', 'method', 'body', 'content_type')
+
+    def __init__(self, name, path, weight=1, method='GET', body=None, content_type='application/json'):
+        self.name = name
+        self.path = path
+        self.weight = weight
+        self.method = method
+        self.body = body
+        self.content_type = content_type
+
+    def build(self, rng):
+        """ (ruta, cuerpo) de la próxima petición. """
+        path = self.path(rng) if callable(self.path) else self.path
+        return path, self.body(rng) if self.body is not None else b''
+
+
+def percentile(values, q):
+    """ Percentil ``q`` (0-100) de una lista ya ordenada. """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+class LoadResult:
+    """ Latencias por ruta, códigos de respuesta y concurrencia máxima de una corrida. """
+
+    def __init__(self, label, clients):
+        self.label = label
+        self.clients = clients
+        self.latencies = defaultdict(list)
+        self.statuses = Counter()
+        self.failures = Counter()
+        self.elapsed = 0.0
+        self.peak_in_flight = 0
+
+    @property
+    def requests(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def errors(self):
+        return sum(self.failures.values())
+
+    def record(self, name, status, latency):
+        self.latencies[name].append(latency)
+        self.statuses[status] += 1
+        # 0: la conexión con el servidor falló
+        if not status or status >= 400:
+            self.failures[name] += 1
+
+    def summary(self, name=None):
+        """ {requests, errors, rps, p50, p95, p99, max} en segundos, de una ruta o de todas. """
+        values = sorted(self.latencies[name] if name else [v for values in self.latencies.values() for v in values])
+        return {
+            'requests': len(values),
+            'errors': self.failures[name] if name else self.errors,
+            'rps': len(values) / self.elapsed if self.elapsed else 0.0,
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': values[-1] if values else None,
+        }
+
+
+def _split(path):
+    parts = urlsplit(path)
+    return unquote(parts.path), parts.query
+
+
+def _body_headers(body, content_type):
+    if not body:
+        return []
+    return [('Content-Type', content_type or 'application/octet-stream'), ('Content-Length', str(len(body)))]
+
+
+async def asgi_request(application, path, headers=(), method='GET', body=b'', content_type=None):
+    """ Petición a una aplicación ASGI; devuelve (status, cuerpo). """
+    path_info, query = _split(path)
+    headers = [*headers, *_body_headers(body, content_type)]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path_info, 'raw_path': path_info.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', HOST.encode())] + [(name.lower().encode(), value.encode()) for name, value in headers],
+        'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+    }
+    finished = asyncio.Event()
+    sent_request = False
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                finished.set()
+
+    await application(scope, receive, send)
+    finished.set()
+    return status, b''.join(chunks)
+
+
+async def asgi_get(application, path, headers=()):
+    """ GET a una aplicación ASGI; devuelve (status, cuerpo). """
+    return await asgi_request(application, path, headers)
+
+
+def wsgi_request(application, path, headers=(), method='GET', body=b'', content_type=None):
+    """ Petición a una aplicación WSGI; devuelve (status, cuerpo). """
+    path_info, query = _split(path)
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path_info, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    for name, value in [*headers, *_body_headers(body, content_type)]:
+        # CONTENT_TYPE y CONTENT_LENGTH van sin el prefijo HTTP_ (PEP 3333)
+        key = name.upper().replace('-', '_')
+        environ[key if key in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{key}'] = value
+    started = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+
+    result = application(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return started['status'], body
+
+
+def wsgi_get(application, path, headers=()):
+    """ GET a una aplicación WSGI; devuelve (status, cuerpo). """
+    return wsgi_request(application, path, headers)
+
+
+class HttpClient:
+    """
+    Cliente HTTP bloqueante para un servidor en ``base_url``, con una conexión
+    keep-alive por hilo. ``request`` devuelve (status, cuerpo) o (0, b'') si
+    la conexión falla.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _send(self, path, headers, method, body):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        try:
+            connection.request(method, self.prefix + path, body=body or None, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            raise
+
+    def request(self, path, headers=(), method='GET', body=b'', content_type=None):
+        headers = dict([*headers, *_body_headers(body, content_type)])
+        try:
+            return self._send(path, headers, method, body)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # El servidor cerró la conexión keep-alive inactiva: se reintenta una vez con una nueva
+            pass
+        except (OSError, http.client.HTTPException):
+            return 0, b''
+        try:
+            return self._send(path, headers, method, body)
+        except (OSError, http.client.HTTPException):
+            return 0, b''
+
+
+async def run(label, targets, clients, requests, headers=(), asgi_application=None, wsgi_application=None,
+              workers=8, seed=42, http_client=None):
+    """
+    Ejecuta ``requests`` peticiones con ``clients`` clientes concurrentes.
+
+    Se usa ``asgi_application``, ``http_client`` (un hilo por cliente) o, si no
+    se indica ninguno, ``wsgi_application`` en un pool de ``workers`` hilos.
+    Devuelve un LoadResult.
+    """
+    rng = random.Random(seed)
+    weights = [target.weight for target in targets]
+    result = LoadResult(label, clients)
+    remaining = requests
+    in_flight = 0
+    pool = handler = None
+    if http_client is not None:
+        pool = ThreadPoolExecutor(max_workers=clients, thread_name_prefix='http')
+        handler = http_client.request
+    elif asgi_application is None:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wsgi')
+        handler = partial(wsgi_request, wsgi_application)
+    loop = asyncio.get_running_loop()
+
+    async def client():
+        nonlocal remaining, in_flight
+        while remaining > 0:
+            remaining -= 1
+            target = rng.choices(targets, weights)[0]
+            path, body = target.build(rng)
+            in_flight += 1
+            result.peak_in_flight = max(result.peak_in_flight, in_flight)
+            start = time.perf_counter()
+            if pool is None:
+                status, _ = await asgi_request(asgi_application, path, headers, target.method, body, target.content_type)
+            else:
+                status, _ = await loop.run_in_executor(pool, handler, path, headers, target.method, body, target.content_type)
+            result.record(target.name, status, time.perf_counter() - start)
+            in_flight -= 1
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(client() for _ in range(clients)))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+_db_latency = 0.0
+_latency_lock = threading.Lock()
+
+
+def _delay_query(execute, sql, params, many, context):
+    if _db_latency:
+        time.sleep(_db_latency)
+    return execute(sql, params, many, context)
+
+
+def _install_delay(sender, connection, **kwargs):
+    if _delay_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_delay_query)
+
+
+@contextmanager
+def simulated_db_latency(seconds):
+    """ Demora ``seconds`` cada consulta SQL de cualquier hilo mientras dura el bloque. """
+    global _db_latency
+    with _latency_lock:
+        _db_latency = seconds
+    connection_created.connect(_install_delay)
+    for connection in connections.all(initialized_only=True):
+        _install_delay(None, connection)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(_install_delay)
+        with _latency_lock:
+            _db_latency = 0.0
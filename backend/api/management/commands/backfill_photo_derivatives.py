@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import Ejemplar
+from api.thumbnails import generate_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generates the thumbnail and medium versions of animal photos that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate every photo, not only the missing ones.')
+
+    def handle(self, *args, **options):
+        ejemplares = Ejemplar.objects.exclude(foto='').exclude(foto__isnull=True)
+        if not options['all']:
+            ejemplares = ejemplares.filter(foto_thumb__isnull=True)
+        ejemplar_ids = list(ejemplares.order_by('pk').values_list('pk', flat=True))
+
+        start = time.perf_counter()
+        done = failed = 0
+        for ejemplar_id in ejemplar_ids:
+            try:
+                generate_derivatives(ejemplar_id)
+                done += 1
+            # PIL.UnidentifiedImageError y los archivos faltantes son OSError
+            except OSError as exc:
+                failed += 1
+                self.stderr.write(f'Ejemplar {ejemplar_id}: {exc}')
+        seconds = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {done} photos in {seconds:.2f}s ({failed} failed).'))
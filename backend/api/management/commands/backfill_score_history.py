@@ -0,0 +1,36 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.score_history import backfill
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized per-animal, per-date score history from the stored scores and current template weights.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First scoring date (YYYY-MM-DD), inclusive.')
+        parser.add_argument('--to', dest='date_to', help='Last scoring date (YYYY-MM-DD), inclusive.')
+        parser.add_argument('--raza', type=int, help='Only animals of this breed id.')
+        parser.add_argument('--chunk-animals', type=int, default=5000, help='Animals loaded into memory at once.')
+        parser.add_argument('--dry-run', action='store_true', help='Compute the history without saving it.')
+
+    def handle(self, *args, **options):
+        date_from = _parse_date(options['date_from']) if options['date_from'] else None
+        date_to = _parse_date(options['date_to']) if options['date_to'] else None
+        if date_from and date_to and date_to < date_from:
+            raise CommandError('--to must not be before --from.')
+
+        start = time.perf_counter()
+        rows = backfill(date_from, date_to, options['raza'], options['chunk_animals'], options['dry_run'])
+        seconds = time.perf_counter() - start
+        verb = 'Computed' if options['dry_run'] else 'Saved'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {rows} score history rows in {seconds:.2f}s.'))
@@ -0,0 +1,85 @@
+import csv
+import random
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import animal_import
+from api.benchmarking import rolled_back, timer, rate
+from api.models import Raza, Ejemplar
+from api.serializers import EjemplarSerializer
+
+COLUMNS = ['identificador', 'nombre', 'raza', 'fecha_nacimiento', 'peso_actual', 'talla_actual']
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the bulk animal import from CSV and XLSX (dry run, create, then update of the same file) '
+            'against creating the animals one by one through EjemplarSerializer. Runs in a rolled back transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--baseline-rows', type=int, default=500, help='Animals created one by one for the baseline.')
+        parser.add_argument('--breeds', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with rolled_back(), tempfile.TemporaryDirectory() as directory:
+            breeds = [Raza.objects.create(nombre=f'BENCH-IMPORT RAZA {i}') for i in range(options['breeds'])]
+            rows = [
+                {'identificador': f'BENCH-IMPORT-{i:07d}', 'nombre': f'Vaca {i}', 'raza': rng.choice(breeds).nombre.lower(),
+                 'fecha_nacimiento': (date(2018, 1, 1) + timedelta(days=rng.randrange(2000))).isoformat(),
+                 'peso_actual': round(rng.uniform(350, 700), 1), 'talla_actual': round(rng.uniform(120, 150), 1)}
+                for i in range(options['rows'])
+            ]
+            files = {'csv': self._write_csv(Path(directory) / 'animals.csv', rows)}
+            try:
+                files['xlsx'] = self._write_xlsx(Path(directory) / 'animals.xlsx', rows)
+            except ImportError:
+                self.stdout.write(self.style.WARNING('openpyxl is not installed; skipping XLSX.'))
+
+            for file_format, path in files.items():
+                for label, dry_run in (('dry run', True), ('create', False), ('update', False)):
+                    results = {}
+                    with open(path, 'rb') as fileobj, CaptureQueriesContext(connection) as queries, timer(results, label):
+                        result = animal_import.import_animals(animal_import.iter_upload(fileobj, path.name), dry_run=dry_run)
+                    expected = 'created' if label != 'update' else 'updated'
+                    if result.rejected_count or getattr(result, expected) != len(rows):
+                        raise CommandError(f'{file_format} {label}: unexpected result {result.as_dict()}')
+                    self._report(f'{file_format} {label}', len(rows), len(queries), results[label])
+                Ejemplar.objects.filter(identificador__startswith='BENCH-IMPORT-').delete()
+
+            # Alta individual como la de EjemplarViewSet.create: validación y un INSERT por ejemplar
+            baseline = rows[:options['baseline_rows']]
+            breed_ids = {raza.nombre.lower(): raza.pk for raza in breeds}
+            results = {}
+            with CaptureQueriesContext(connection) as queries, timer(results, 'baseline'):
+                for row in baseline:
+                    serializer = EjemplarSerializer(data=dict(row, raza=breed_ids[row['raza']]))
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+            self._report('one by one', len(baseline), len(queries), results['baseline'])
+
+    def _write_csv(self, path, rows):
+        with open(path, 'w', newline='') as fileobj:
+            writer = csv.DictWriter(fileobj, COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def _write_xlsx(self, path, rows):
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(COLUMNS)
+        for row in rows:
+            sheet.append([row[column] for column in COLUMNS])
+        workbook.save(path)
+        return path
+
+    def _report(self, label, rows, queries, seconds):
+        self.stdout.write(f'{label:<14} {rows:>7} rows {queries:>6} queries {seconds:>8.2f}s {rate(rows, seconds):>10.0f} rows/s')
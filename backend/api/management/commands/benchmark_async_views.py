@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import random
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import alerts, loadtest
+from api.benchmarking import create_synthetic_herd, create_synthetic_template
+from api.models import Raza, Alert, SensorData
+from api.scoring import save_session
+
+PREFIX = 'BENCH-ASYNC'
+STACKS = ('asgi', 'asgi-sync', 'wsgi')
+
+
+class Fixture:
+    """
+    Datos del benchmark. Se confirman en la base porque cada petición usa
+    su propio hilo y su propia conexión; ``delete`` los elimina al final.
+    """
+
+    def __init__(self, animals, readings, seed=42):
+        rng = random.Random(seed)
+        now = timezone.now()
+        self.user = User.objects.create_user(PREFIX.lower(), f'{PREFIX.lower()}@example.com', PREFIX.lower())
+        self.raza = Raza.objects.create(nombre=f'{PREFIX} RAZA')
+        traits = create_synthetic_template(self.raza)
+        self.herd = create_synthetic_herd(animals, prefix=PREFIX, raza=self.raza)
+        save_session([
+            {'ejemplar_id': ejemplar.pk,
+             'scores': [{'caracteristica_id': trait.pk, 'puntuacion_obtenida': rng.uniform(5, 10)} for trait in traits]}
+            for ejemplar in self.herd
+        ])
+        # Las lecturas y alertas se concentran en unos pocos ejemplares, como los que se consultan en la app
+        self.monitored = self.herd[:10]
+        SensorData.objects.bulk_create([
+            SensorData(ejemplar=ejemplar, timestamp=now - timedelta(minutes=i), temperatura=rng.uniform(37.5, 39.5),
+                       actividad=rng.uniform(0, 100))
+            for ejemplar in self.monitored for i in range(readings)
+        ], batch_size=5000)
+        alerts.save_alerts([
+            Alert(ejemplar=ejemplar, alert_type=Alert.AlertType.FIEBRE, message='Temperatura elevada',
+                  timestamp=now - timedelta(minutes=i))
+            for ejemplar in self.monitored for i in range(20)
+        ])
+        self.headers = [('Authorization', f'Bearer {AccessToken.for_user(self.user)}')]
+
+    def targets(self):
+        """ Mezcla de lecturas de la app: dashboard, series de sensores, alertas y plantilla. """
+        share = 1 / len(self.monitored)
+        return [
+            loadtest.Target('dashboard', '/api/dashboard/scores/', 3),
+            loadtest.Target('template', f'/api/score-templates/breed/{self.raza.pk}/', 1),
+            *(loadtest.Target('sensor-data', f'/api/animals/{ejemplar.pk}/sensor-data/', 4 * share) for ejemplar in self.monitored),
+            *(loadtest.Target('alerts', f'/api/animals/{ejemplar.pk}/alerts/', 2 * share) for ejemplar in self.monitored),
+        ]
+
+    def delete(self):
+        # Por instancia (señales): los contadores del dashboard y la versión de la plantilla quedan al día
+        for ejemplar in self.herd:
+            ejemplar.delete()
+        self.raza.delete()
+        self.user.delete()
+
+
+class Command(BaseCommand):
+    help = ('Load-tests the hot read endpoints (dashboard, sensor data, alerts, score template) in-process, '
+            'comparing the async views under ASGI with the DRF views under ASGI and under a threaded WSGI '
+            'server. Checks that every stack returns identical responses before timing, then reports '
+            'throughput and p50/p95/p99 latency per concurrency level. Under ASGI every in-flight request holds '
+            'its own database connection, so keep --clients below the server\'s max_connections.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stacks', nargs='+', choices=STACKS, default=list(STACKS))
+        parser.add_argument('--clients', type=int, nargs='+', default=[1, 16, 64], help='Concurrent clients per run.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per run.')
+        parser.add_argument('--workers', type=int, default=8, help='WSGI server threads.')
+        parser.add_argument('--db-latency', type=float, default=20.0,
+                            help='Milliseconds added to every SQL query, as a network round trip to the database.')
+        parser.add_argument('--animals', type=int, default=200)
+        parser.add_argument('--readings', type=int, default=500, help='Readings per monitored animal.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username=PREFIX.lower()).exists():
+            raise CommandError(f'Leftover data from an interrupted run: delete user {PREFIX.lower()!r} and breed {PREFIX} RAZA.')
+        fixture = Fixture(options['animals'], options['readings'], options['seed'])
+        try:
+            applications = {'asgi': get_asgi_application(), 'wsgi': get_wsgi_application()}
+            asyncio.run(self._check_identical(fixture, applications))
+            with loadtest.simulated_db_latency(options['db_latency'] / 1000):
+                self.stdout.write(
+                    f'{options["requests"]} requests per run, {options["workers"]} WSGI threads, '
+                    f'{options["db_latency"]:g} ms added per query'
+                )
+                self.stdout.write(f'{"stack":<10} {"clients":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>6}')
+                for clients in options['clients']:
+                    for stack in options['stacks']:
+                        result = asyncio.run(self._run(stack, fixture, applications, clients, options))
+                        self._report(result)
+        finally:
+            fixture.delete()
+
+    def _serve(self, stack, applications, path, headers):
+        """ Corrutina que pide ``path`` con la pila indicada. """
+        if stack == 'wsgi':
+            return asyncio.to_thread(loadtest.wsgi_get, applications['wsgi'], path, headers)
+        return loadtest.asgi_get(applications['asgi'], path, headers)
+
+    async def _fetch(self, stack, applications, path, headers):
+        with override_settings(ASGI_URLCONF=None) if stack == 'asgi-sync' else nullcontext():
+            return await self._serve(stack, applications, path, headers)
+
+    async def _check_identical(self, fixture, applications):
+        animal = fixture.monitored[0]
+        paths = sorted({target.path for target in fixture.targets()}) + [
+            f'/api/animals/{animal.pk}/sensor-data/?page_size=7',
+            f'/api/animals/{animal.pk}/sensor-data/?cursor=invalid',
+            f'/api/animals/{animal.pk}/alerts/?format=api',
+            '/api/score-templates/breed/0/',
+        ]
+        # La primera petición llena las cachés (dashboard, plantilla); todas las pilas deben leer lo mismo
+        await self._fetch('wsgi', applications, '/api/dashboard/scores/', fixture.headers)
+        # Los 401 y 404 esperados no se registran como advertencias
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            for path in paths:
+                for headers in (fixture.headers, [('Authorization', 'Bearer invalid')]):
+                    await self._compare(applications, path, headers)
+        finally:
+            request_logger.setLevel(level)
+        self.stdout.write(f'{len(paths) * 2} requests identical across {", ".join(STACKS)}')
+
+    async def _compare(self, applications, path, headers):
+        responses = {stack: await self._fetch(stack, applications, path, headers) for stack in STACKS}
+        # La API navegable lleva un token CSRF distinto en cada respuesta
+        compared = {status for status, _ in responses.values()} if 'format=api' in path else set(responses.values())
+        if len(compared) != 1:
+            detail = ', '.join(f'{stack}: {status} {body[:120]!r}' for stack, (status, body) in responses.items())
+            raise CommandError(f'GET {path} differs between stacks: {detail}')
+
+    async def _run(self, stack, fixture, applications, clients, options):
+        kwargs = {'wsgi_application': applications['wsgi'], 'workers': options['workers']} if stack == 'wsgi' else {
+            'asgi_application': applications['asgi'],
+        }
+        with override_settings(ASGI_URLCONF=None) if stack == 'asgi-sync' else nullcontext():
+            return await loadtest.run(
+                stack, fixture.targets(), clients, options['requests'], fixture.headers, seed=options['seed'], **kwargs,
+            )
+
+    def _report(self, result):
+        summary = result.summary()
+        self.stdout.write(
+            f'{result.label:<10} {result.clients:>7} {summary["rps"]:>8.0f} {summary["p50"] * 1000:>8.1f} '
+            f'{summary["p95"] * 1000:>8.1f} {summary["p99"] * 1000:>8.1f} {result.errors:>6}'
+        )
+        if result.errors:
+            raise CommandError(f'{result.label}: {result.errors} error responses {dict(result.statuses)}.')
+
@@ -0,0 +1,78 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Avg
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api import dashboard
+from api.benchmarking import rolled_back, create_synthetic_herd
+from api.models import Ejemplar, Raza
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the dashboard endpoint: legacy per-request aggregation versus cold and warm KPI cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animals', type=int, default=50000)
+        parser.add_argument('--breeds', type=int, default=5)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _measure(self, iterations, func, before=None):
+        timings = []
+        for _ in range(iterations):
+            if before is not None:
+                before()
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        with CaptureQueriesContext(connection) as queries:
+            if before is not None:
+                before()
+            func()
+        return statistics.median(timings) * 1000, len(queries), result
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        client = APIClient(SERVER_NAME='localhost')
+        url = '/api/dashboard/scores/'
+        with rolled_back():
+            per_breed = options['animals'] // options['breeds']
+            herd = []
+            for index in range(options['breeds']):
+                raza = Raza.objects.create(nombre=f'BENCH-DASHBOARD RAZA {index}')
+                herd += create_synthetic_herd(per_breed, prefix=f'BENCH-DASHBOARD-{index}', raza=raza)
+            for ejemplar in herd:
+                ejemplar.score_total = rng.uniform(50, 100)
+                ejemplar.last_score_date = date.today()
+            Ejemplar.objects.bulk_update(herd, ['score_total', 'last_score_date'], batch_size=5000)
+            dashboard.rebuild()
+
+            def legacy():
+                # Consultas que el endpoint hacía en cada petición
+                list(Ejemplar.objects.filter(score_total__isnull=False).values('raza__nombre')
+                     .annotate(average_score=Avg('score_total')).order_by('raza__nombre'))
+                list(Ejemplar.objects.filter(last_score_date__isnull=False).order_by('-last_score_date')[:10])
+
+            iterations = options['iterations']
+            legacy_ms, legacy_queries, _ = self._measure(iterations, legacy)
+            cold_ms, cold_queries, response = self._measure(
+                iterations, lambda: client.get(url), before=lambda: cache.delete(dashboard.payload_key()),
+            )
+            if response.status_code != 200:
+                raise CommandError(f'Dashboard returned {response.status_code}.')
+            # Dentro de la transacción del benchmark la vista no cachea; se precarga como lo haría fuera de ella
+            cache.set(dashboard.payload_key(), response.data)
+            warm_ms, warm_queries, _ = self._measure(iterations, lambda: client.get(url))
+            cache.delete(dashboard.payload_key())
+
+        self.stdout.write(f'{len(herd)} animals, {options["breeds"]} breeds')
+        self.stdout.write(f'legacy aggregation {legacy_ms:>8.2f} ms ({legacy_queries} queries)')
+        self.stdout.write(f'cold KPI cache     {cold_ms:>8.2f} ms ({cold_queries} queries)')
+        self.stdout.write(f'warm KPI cache     {warm_ms:>8.2f} ms ({warm_queries} queries)')
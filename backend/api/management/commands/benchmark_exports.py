@@ -0,0 +1,96 @@
+import random
+import resource
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from api import exports
+from api.benchmarking import rolled_back, create_synthetic_herd, rate
+from api.ingest import copy_readings
+from api.models import SensorData
+
+
+def peak_rss_mb():
+    """ Pico de memoria residente del proceso (ru_maxrss está en KB en Linux). """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = ('Measures export throughput (rows/s, MB/s, file size) of the sensor-data dataset in each format, '
+            'to a file and through the streaming generator used by the API, plus the process peak memory. '
+            'Synthetic rows are generated in a rolled back transaction; use --existing to export the '
+            'current table instead (e.g. a 50M-row production copy).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic readings to generate.')
+        parser.add_argument('--animals', type=int, default=1000)
+        parser.add_argument('--existing', action='store_true', help='Export the existing SensorData table, generate nothing.')
+        parser.add_argument('--formats', nargs='+', choices=list(exports.FORMATS), default=list(exports.FORMATS))
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with nullcontext() if options['existing'] else rolled_back():
+            if not options['existing']:
+                self._generate(options)
+            rows = SensorData.objects.count()
+            self.stdout.write(f'{rows} rows in SensorData, chunks of {options["chunk_size"] or exports.chunk_size()}, '
+                              f'peak RSS before exporting {peak_rss_mb():.0f} MB')
+            # La primera lectura de filas recién escritas es mucho más lenta (PostgreSQL marca su
+            # visibilidad en cada página); se mide aparte para no cargársela al primer formato
+            start = time.perf_counter()
+            scanned = sum(len(chunk) for chunk in exports.iter_chunks(
+                exports.DATASETS['sensor-data'].queryset(), options['chunk_size']))
+            self._report('cold scan', scanned, 0, time.perf_counter() - start)
+            with tempfile.TemporaryDirectory() as directory:
+                for file_format in options['formats']:
+                    path = Path(directory) / f'export{exports.FORMATS[file_format][1]}'
+                    start = time.perf_counter()
+                    written = exports.export_to_file('sensor-data', file_format, path, size=options['chunk_size'])
+                    self._report(f'{file_format} file', written, path.stat().st_size, time.perf_counter() - start)
+                    path.unlink()
+
+                    start = time.perf_counter()
+                    size = sum(len(data) for data in exports.export_stream('sensor-data', file_format, size=options['chunk_size']))
+                    self._report(f'{file_format} stream', written, size, time.perf_counter() - start)
+
+    def _generate(self, options):
+        rng = random.Random(options['seed'])
+        herd = create_synthetic_herd(options['animals'], prefix='BENCH-EXPORT')
+        per_animal = max(1, options['rows'] // len(herd))
+        start = timezone.now() - timedelta(minutes=per_animal)
+        began = time.perf_counter()
+        batch = []
+        for minute in range(per_animal):
+            timestamp = start + timedelta(minutes=minute)
+            batch.extend(
+                SensorData(ejemplar_id=ejemplar.pk, timestamp=timestamp, temperatura=rng.uniform(37.5, 40),
+                           actividad=rng.uniform(0, 100))
+                for ejemplar in herd
+            )
+            if len(batch) >= 100_000:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+        self.stdout.write(f'Generated {per_animal * len(herd)} readings in {time.perf_counter() - began:.0f}s')
+
+    def _write(self, readings):
+        if not readings:
+            return
+        if connection.vendor == 'postgresql':
+            copy_readings(readings)
+        else:
+            SensorData.objects.bulk_create(readings, batch_size=5000)
+
+    def _report(self, label, rows, size, seconds):
+        mb = size / 1024 / 1024
+        self.stdout.write(
+            f'{label:<15} {rate(rows, seconds):>10.0f} rows/s {rate(mb, seconds):>7.1f} MB/s {mb:>8.1f} MB '
+            f'{size / rows if rows else 0:>6.1f} B/row  peak RSS {peak_rss_mb():.0f} MB'
+        )
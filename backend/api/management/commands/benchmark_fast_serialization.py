@@ -0,0 +1,137 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.benchmarking import rolled_back, timer, create_synthetic_herd, create_synthetic_template, rate
+from api.fastpath import RowSerializer, render
+from api.models import Raza, Alert, Calificacion, Ejemplar, SensorData
+from api.serializers import CalificacionSerializer, SensorDataSerializer, RecentScoreAnimalSerializer
+
+# Valores que orjson escribe distinto que json o que JSONRenderer escapa
+EDGE_FLOATS = [1e-05, 1e16, 1.5e300, 0.0001, -0.0, 123456789012345.6, None]
+EDGE_TEXTS = ['Fiebre ñandú', 'línea separada', 'control\x01\x1f', 'comillas "y" \\barras\\', 'é\U0001f404']
+
+
+class Command(BaseCommand):
+    help = ('Checks that the fast list serialization is byte-identical to the DRF serializers and '
+            'benchmarks its rows/sec against them on sensor data and grades.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Sensor readings of the benchmarked animal.')
+        parser.add_argument('--iterations', type=int, default=20, help='Requests per mode for the HTTP page timings.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _setup(self, rows, rng):
+        user = User.objects.create_user('bench-fast', 'bench-fast@example.com', 'bench-fast')
+        raza = Raza.objects.create(nombre='BENCH-FAST RAZA')
+        traits = create_synthetic_template(raza, categories=5, traits_per_category=5)
+        herd = create_synthetic_herd(400, prefix='BENCH-FAST', raza=raza)
+        Ejemplar.objects.filter(pk__in=[ejemplar.pk for ejemplar in herd[::3]]).update(foto='ejemplares_fotos/vaca ñ.jpg')
+        for ejemplar, text in zip(herd, EDGE_TEXTS):
+            ejemplar.nombre = text
+        Ejemplar.objects.bulk_update(herd[:len(EDGE_TEXTS)], ['nombre'])
+        Ejemplar.objects.filter(pk__in=[ejemplar.pk for ejemplar in herd[:20]]).update(
+            score_total=81.25, last_score_date=date.today() - timedelta(days=1),
+        )
+        Calificacion.objects.bulk_create(
+            (Calificacion(ejemplar=ejemplar, caracteristica=trait, puntuacion_obtenida=rng.uniform(5, 10), evaluador=user)
+             for ejemplar in herd for trait in traits),
+            batch_size=10000,
+        )
+        animal = herd[0]
+        now = timezone.now()
+        SensorData.objects.bulk_create(
+            (SensorData(ejemplar=animal, timestamp=now - timedelta(seconds=30 * i, microseconds=i % 7),
+                        temperatura=EDGE_FLOATS[i % len(EDGE_FLOATS)] if i % 997 == 0 else rng.uniform(37.5, 39.5),
+                        actividad=None if i % 11 == 0 else rng.uniform(0, 100))
+             for i in range(rows)),
+            batch_size=10000,
+        )
+        Alert.objects.bulk_create([
+            Alert(ejemplar=animal, alert_type=Alert.AlertType.values[i % 3], message=EDGE_TEXTS[i % len(EDGE_TEXTS)],
+                  timestamp=now - timedelta(minutes=i), is_read=i % 2 == 0)
+            for i in range(2000)
+        ])
+        return user, animal
+
+    def _compare(self, client, url):
+        """ Recorre las páginas de ``url`` con y sin la vía rápida y falla ante cualquier diferencia de bytes. """
+        pages = 0
+        while url:
+            fast = client.get(url)
+            with override_settings(API_FAST_SERIALIZATION=False):
+                slow = client.get(url)
+            if fast.status_code != 200 or fast.content != slow.content or fast['Content-Type'] != slow['Content-Type']:
+                raise CommandError(f'Fast and DRF responses differ for {url}:\n{fast.content[:500]!r}\n{slow.content[:500]!r}')
+            url = fast.json().get('next') if isinstance(fast.json(), dict) else None
+            pages += 1
+        return pages
+
+    def _page_timings(self, client, url, iterations):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client.get(url)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        results = {}
+        with rolled_back():
+            with timer(results, 'setup'):
+                user, animal = self._setup(options['rows'], rng)
+            self.stdout.write(f'setup: {options["rows"]} readings in {results["setup"]:.1f}s')
+
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+            checked = 0
+            for url in (
+                f'/api/animals/{animal.pk}/sensor-data/?page_size=1000',
+                f'/api/animals/{animal.pk}/sensor-data/?page_size=500&fields=timestamp,temperatura',
+                f'/api/animals/{animal.pk}/alerts/?page_size=300',
+                '/api/calificaciones/?page_size=1000',
+                '/api/calificaciones/?page_size=1000&format=json&fields=id,animalName,animalPhotoUrl,nope',
+            ):
+                checked += self._compare(client, url)
+            request = Request(APIRequestFactory().get('/api/dashboard/scores/', SERVER_NAME='localhost'))
+            recent = Ejemplar.objects.filter(last_score_date__isnull=False).order_by('-last_score_date', 'pk')[:10]
+            row_serializer = RowSerializer(RecentScoreAnimalSerializer(context={'request': request}))
+            if render(row_serializer.to_dicts(row_serializer.rows(recent))) != JSONRenderer().render(
+                    RecentScoreAnimalSerializer(recent, many=True, context={'request': request}).data):
+                raise CommandError('Fast and DRF recent scores differ.')
+            self.stdout.write(f'byte-identical output on {checked} pages and the dashboard recent scores')
+
+            context = {'request': Request(APIRequestFactory().get('/', SERVER_NAME='localhost'))}
+            cases = [
+                ('sensor-data', SensorData.objects.filter(ejemplar=animal).order_by('-timestamp', '-id'), SensorDataSerializer),
+                ('calificaciones', Calificacion.objects.select_related('ejemplar', 'caracteristica').order_by('id'), CalificacionSerializer),
+            ]
+            for label, queryset, serializer_class in cases:
+                count = queryset.count()
+                with timer(results, f'{label} drf'):
+                    JSONRenderer().render(serializer_class(list(queryset), many=True, context=context).data)
+                with timer(results, f'{label} fast'):
+                    row_serializer = RowSerializer(serializer_class(context=context))
+                    rows = list(row_serializer.rows(queryset))
+                    render(row_serializer.to_dicts(rows), plain_floats=row_serializer.plain_floats(rows))
+                drf, fast = results[f'{label} drf'], results[f'{label} fast']
+                self.stdout.write(
+                    f'{label:<15} {count:>7} rows  drf {rate(count, drf):>10.0f} rows/s  '
+                    f'fast {rate(count, fast):>10.0f} rows/s  ({drf / fast:.1f}x)'
+                )
+
+            url = f'/api/animals/{animal.pk}/sensor-data/?page_size=1000'
+            fast = self._page_timings(client, url, options['iterations'])
+            with override_settings(API_FAST_SERIALIZATION=False):
+                drf = self._page_timings(client, url, options['iterations'])
+            self.stdout.write(f'HTTP page of 1000 readings: drf {drf * 1000:.1f} ms  fast {fast * 1000:.1f} ms ({drf / fast:.1f}x)')
@@ -0,0 +1,85 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.benchmarking import rolled_back, create_synthetic_herd
+from api.ingest import write_readings
+from api.models import SensorData, SensorLatest
+
+
+class Command(BaseCommand):
+    help = ('Grows the sensor history through the ingest path (batches arriving out of order) and compares '
+            'the herd snapshot endpoint, read from the latest-reading table, with a GROUP BY over the raw '
+            'readings at each history size. Fails if the table disagrees with the raw data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animals', type=int, default=500)
+        parser.add_argument('--history', type=int, nargs='+', default=[10, 100, 400],
+                            help='Readings per animal at each measurement.')
+        parser.add_argument('--batch', type=int, default=1000, help='Readings per ingest batch.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with rolled_back(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            user = User.objects.create_user('bench-snapshot', 'bench-snapshot@example.com', 'bench-snapshot')
+            herd = create_synthetic_herd(options['animals'], prefix='BENCH-SNAPSHOT')
+            client = APIClient()
+            client.force_authenticate(user)
+            start = timezone.now() - timedelta(days=30)
+
+            self.stdout.write(f'{len(herd)} animals')
+            self.stdout.write(f'{"readings/animal":>15} {"rows":>9} {"group by ms":>12} {"snapshot ms":>12}')
+            ingested = 0
+            for history in sorted(options['history']):
+                readings = [
+                    SensorData(ejemplar_id=ejemplar.pk, timestamp=start + timedelta(minutes=minute),
+                               temperatura=rng.uniform(37.5, 40), actividad=rng.uniform(0, 100))
+                    for minute in range(ingested, history) for ejemplar in herd
+                ]
+                # Los gateways suben lotes atrasados: el orden de llegada no es el cronológico
+                batches = [readings[i:i + options['batch']] for i in range(0, len(readings), options['batch'])]
+                rng.shuffle(batches)
+                for batch in batches:
+                    write_readings(batch)
+                ingested = history
+
+                expected = dict(
+                    SensorData.objects.filter(ejemplar__in=herd).values('ejemplar_id')
+                    .annotate(last=Max('timestamp')).order_by().values_list('ejemplar_id', 'last')
+                )
+                stored = dict(SensorLatest.objects.filter(ejemplar__in=herd).values_list('ejemplar_id', 'timestamp'))
+                if stored != expected:
+                    raise CommandError(f'SensorLatest differs from the raw readings at {history} readings per animal.')
+
+                group_by = self._best(options['repeat'], lambda: list(
+                    SensorData.objects.filter(ejemplar__in=herd).values('ejemplar_id')
+                    .annotate(last=Max('timestamp')).order_by()
+                ))
+                snapshot = self._best(options['repeat'], lambda: self._fetch_snapshot(client, len(herd)))
+                rows = SensorData.objects.filter(ejemplar__in=herd).count()
+                self.stdout.write(f'{history:>15} {rows:>9} {group_by * 1000:>12.1f} {snapshot * 1000:>12.1f}')
+
+    def _fetch_snapshot(self, client, expected):
+        response = client.get('/api/sensor-data/latest/', {'page_size': expected})
+        if response.status_code != 200:
+            raise CommandError(f'GET /api/sensor-data/latest/ returned {response.status_code}.')
+        return response
+
+    def _best(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,168 @@
+import asyncio
+import random
+import re
+import statistics
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import push
+from api.benchmarking import rolled_back, create_synthetic_herd, rate
+from api.models import Raza, Alert, SensorData
+
+EVENT_ID = re.compile(rb'^id: (\d+)\nevent: (\w+)\ndata: .*"ejemplar":(\d+)', re.MULTILINE)
+
+
+class Client:
+    """ Conexión SSE abierta con AsyncClient: acumula (id, tipo, ejemplar, hora de llegada) de cada evento. """
+
+    def __init__(self, response):
+        self.response = response
+        self.events = []
+        # El stream se suscribe al broker al empezar a leerse; el primer chunk (retry:) llega ya suscrito
+        self.subscribed = asyncio.Event()
+
+    async def read(self):
+        async for chunk in self.response.streaming_content:
+            now = time.perf_counter()
+            self.subscribed.set()
+            self.events.extend((int(id), kind.decode(), int(ejemplar), now) for id, kind, ejemplar in EVENT_ID.findall(chunk))
+
+
+class Command(BaseCommand):
+    help = ('Opens many live event (SSE) connections against the in-memory broker, publishes batches of '
+            'readings and alerts, and reports fan-out throughput and delivery latency. Fails if a client '
+            'receives events outside its filter or a subscription leaks after disconnecting.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200, help='Open connections (half herd-wide, half per animal).')
+        parser.add_argument('--animals', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=20, help='Ingest batches published, one reading per animal each.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        previous = push.set_broker(push.LocalBroker(replay=0))
+        try:
+            # AsyncClient siempre envía Host: testserver
+            with rolled_back(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                user = User.objects.create_user('bench-live', 'bench-live@example.com', 'bench-live')
+                razas = [Raza.objects.create(nombre=f'BENCH-LIVE RAZA {i}') for i in range(2)]
+                herd = []
+                for index, raza in enumerate(razas):
+                    herd += create_synthetic_herd(options['animals'] // 2, prefix=f'BENCH-LIVE-{index}', raza=raza)
+                async_to_sync(self._run)(user, razas, herd, options)
+        finally:
+            push.set_broker(previous)
+
+    async def _connect(self, url, token):
+        response = await self.client.get(url, headers={'Authorization': f'Bearer {token}'})
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}: {response.content[:300]!r}')
+        return Client(response)
+
+    async def _run(self, user, razas, herd, options):
+        rng = random.Random(options['seed'])
+        broker = push.get_broker()
+        token = str(AccessToken.for_user(user))
+        self.client = AsyncClient()
+
+        unauthorized = await self.client.get('/api/events/')
+        if unauthorized.status_code != 401:
+            raise CommandError(f'Unauthenticated connection returned {unauthorized.status_code}.')
+
+        filters = []
+        for index in range(options['clients']):
+            if index % 2:
+                filters.append(('animal', rng.choice(herd).pk))
+            elif index % 4 == 0:
+                filters.append(('raza', razas[index % 8 == 0].pk))
+            else:
+                filters.append((None, None))
+        # Las consultas de la vista corren (sync_to_async) en el hilo principal, con su conexión
+        queries = CaptureQueriesContext(connection)
+        await sync_to_async(queries.__enter__)()
+        start = time.perf_counter()
+        clients = [
+            await self._connect(f'/api/events/?{name}={value}' if name else '/api/events/', token)
+            for name, value in filters
+        ]
+        await sync_to_async(queries.__exit__)(None, None, None)
+        query_count = await sync_to_async(len)(queries)
+        readers = [asyncio.create_task(client.read()) for client in clients]
+        await asyncio.wait_for(asyncio.gather(*(client.subscribed.wait() for client in clients)), 30)
+        connect_seconds = time.perf_counter() - start
+        self.stdout.write(
+            f'{len(clients)} connections in {connect_seconds:.2f}s, {query_count / len(clients):.1f} queries per connection'
+        )
+
+        raza_of = {ejemplar.pk: ejemplar.raza_id for ejemplar in herd}
+        expected = 0
+        for name, value in filters:
+            if name == 'animal':
+                expected += 1
+            elif name == 'raza':
+                expected += sum(1 for raza_id in raza_of.values() if raza_id == value)
+            else:
+                expected += len(herd)
+        expected *= options['rounds']
+
+        published = {}
+        start = time.perf_counter()
+        for _ in range(options['rounds']):
+            now = timezone.now()
+            readings = [
+                SensorData(ejemplar_id=ejemplar.pk, timestamp=now, temperatura=rng.uniform(37.5, 39.5),
+                           actividad=rng.uniform(0, 100))
+                for ejemplar in herd
+            ]
+            before = time.perf_counter()
+            # Como en la ingesta: se publica desde un hilo distinto del event loop
+            await sync_to_async(push.publish_readings)(readings)
+            published.update(dict.fromkeys(range(len(published) + 1, len(published) + len(readings) + 1), before))
+            await asyncio.sleep(0)
+        await sync_to_async(push.publish_alerts)([
+            Alert(id=0, ejemplar_id=herd[0].pk, alert_type=Alert.AlertType.FIEBRE, message='Temperatura elevada',
+                  timestamp=timezone.now())
+        ])
+
+        deadline = time.perf_counter() + 30
+        while sum(len(client.events) for client in clients) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        for client in clients:
+            await client.response.streaming_content.aclose()
+
+        delivered = 0
+        latencies = []
+        for client, (name, value) in zip(clients, filters):
+            for id, kind, ejemplar, arrival in client.events:
+                if (name == 'animal' and ejemplar != value) or (name == 'raza' and raza_of[ejemplar] != value):
+                    raise CommandError(f'Client filtered by {name}={value} received an event of animal {ejemplar}.')
+                if kind == 'reading':
+                    delivered += 1
+                    latencies.append(arrival - published[id])
+        if delivered != expected:
+            raise CommandError(f'Delivered {delivered} reading events, expected {expected}.')
+        if broker.has_subscribers():
+            raise CommandError('Subscriptions remain registered after the clients disconnected.')
+
+        latencies.sort()
+        self.stdout.write(
+            f'{options["rounds"]} batches of {len(herd)} readings: {delivered} deliveries in {elapsed:.2f}s '
+            f'({rate(delivered, elapsed):.0f} events/s)'
+        )
+        self.stdout.write(
+            f'delivery latency p50 {statistics.median(latencies) * 1000:.1f} ms  '
+            f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms  max {latencies[-1] * 1000:.1f} ms'
+        )
@@ -0,0 +1,78 @@
+import random
+import time
+from concurrent.futures import wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageFilter
+
+from api import tasks
+from api.benchmarking import rate
+from api.thumbnails import render_sizes, sizes
+
+
+def synthetic_photo(width, height, rng):
+    """ JPEG de cámara de teléfono aproximado: degradado con ruido y algo de detalle. """
+    noise = Image.effect_noise((width // 8, height // 8), 48).resize((width, height), Image.Resampling.BILINEAR)
+    base = Image.merge('RGB', [
+        Image.linear_gradient('L').resize((width, height)),
+        noise,
+        Image.linear_gradient('L').rotate(rng.choice([90, 180, 270])).resize((width, height)),
+    ]).filter(ImageFilter.DETAIL)
+    buffer = BytesIO()
+    base.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def naive_render(data, targets):
+    """ Referencia: decodificación completa y un redimensionado desde el original por tamaño. """
+    rendered = {}
+    for name, edge in targets.items():
+        with Image.open(BytesIO(data)) as original:
+            image = original.convert('RGB')
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=85)
+        rendered[name] = buffer.getvalue()
+    return rendered
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks generating the thumbnail and medium photo versions for a batch of synthetic phone photos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--photos', type=int, default=20)
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        photos = [synthetic_photo(options['width'], options['height'], rng) for _ in range(options['photos'])]
+        targets = sizes()
+        original_kb = sum(len(photo) for photo in photos) / len(photos) / 1024
+        self.stdout.write(f'{len(photos)} photos of {options["width"]}x{options["height"]}, {original_kb:.0f} KB on average')
+
+        results = {}
+        start = time.perf_counter()
+        for photo in photos:
+            naive_render(photo, targets)
+        results['naive (full decode per size)'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rendered = [render_sizes(BytesIO(photo), targets) for photo in photos]
+        results['pipeline (draft decode, serial)'] = time.perf_counter() - start
+
+        workers = getattr(settings, 'TASK_QUEUES', {}).get('images', 1)
+        start = time.perf_counter()
+        wait([tasks.submit(render_sizes, BytesIO(photo), targets, queue='images') for photo in photos])
+        results[f'pipeline (images queue, {workers} threads)'] = time.perf_counter() - start
+
+        for label, seconds in results.items():
+            self.stdout.write(
+                f'{label:<38} {seconds / len(photos) * 1000:>8.1f} ms/photo {rate(len(photos), seconds):>8.1f} photos/s'
+            )
+        for name in targets:
+            kb = sum(len(item[name]) for item in rendered) / len(rendered) / 1024
+            self.stdout.write(f'{name:<12} {kb:>6.1f} KB on average ({kb / original_kb:.1%} of the original)')
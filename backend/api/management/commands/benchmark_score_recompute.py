@@ -0,0 +1,57 @@
+import random
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import rolled_back, timer, create_synthetic_herd, create_synthetic_template, rate
+from api.models import Raza, Calificacion, Ejemplar
+from api.scoring import compute_score, load_score_matrix, load_traits, recompute_scores, score_matrix
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the vectorized herd-wide score recomputation on a synthetic scored herd.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animals', type=int, default=100000)
+        parser.add_argument('--traits', type=int, default=25, help='Characteristics scored per animal.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        results = {}
+        with rolled_back():
+            raza = Raza.objects.create(nombre='BENCH-RECOMPUTE RAZA')
+            traits = create_synthetic_template(raza, categories=5, traits_per_category=max(1, options['traits'] // 5))
+            with timer(results, 'setup'):
+                herd = create_synthetic_herd(options['animals'], prefix='BENCH-RECOMPUTE', raza=raza)
+                Calificacion.objects.bulk_create(
+                    (Calificacion(ejemplar=ejemplar, caracteristica=trait, puntuacion_obtenida=rng.uniform(5, 10),
+                                  fecha_calificacion=date.today())
+                     for ejemplar in herd for trait in traits),
+                    batch_size=10000,
+                )
+                # recompute_scores solo lee la sesión de last_score_date
+                Ejemplar.objects.filter(raza=raza).update(last_score_date=date.today())
+            rows = len(herd) * len(traits)
+            self.stdout.write(f'setup: {len(herd)} animals, {rows} scores in {results["setup"]:.1f}s')
+
+            with timer(results, 'load'):
+                ejemplar_ids, caracteristica_ids, matrix = load_score_matrix([raza.pk])
+            trait_table = load_traits([raza.pk], caracteristica_ids.tolist())
+            with timer(results, 'compute'):
+                ideal = np.array([trait_table[pk].puntaje_ideal for pk in caracteristica_ids.tolist()], dtype=np.float64)
+                weight = np.array([trait_table[pk].ponderacion for pk in caracteristica_ids.tolist()], dtype=np.float64)
+                scores = score_matrix(matrix, ideal, weight)
+            with timer(results, 'end-to-end'):
+                recompute_scores([raza.pk])
+
+            # El resultado vectorizado debe coincidir con el cálculo por ejemplar
+            for row in rng.sample(range(len(ejemplar_ids)), min(100, len(ejemplar_ids))):
+                values = {pk: value for pk, value in zip(caracteristica_ids.tolist(), matrix[row].tolist())}
+                expected = compute_score(values, trait_table)
+                if abs(expected - scores[row]) > 1e-9:
+                    raise CommandError(f'Score mismatch for ejemplar {ejemplar_ids[row]}: {scores[row]} != {expected}')
+
+        for label in ('load', 'compute', 'end-to-end'):
+            self.stdout.write(f'{label:<11} {results[label]:>8.3f}s {rate(len(ejemplar_ids), results[label]):>12.0f} animals/s')
@@ -0,0 +1,55 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Raza
+from api.score_templates import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks cold, warm and conditional (304) latency of the compiled score-template endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--breed', type=int, help='Breed id (default: every breed with a template).')
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def _measure(self, client, url, iterations, before=None, **headers):
+        timings = []
+        for _ in range(iterations):
+            if before is not None:
+                before()
+            start = time.perf_counter()
+            response = client.get(url, **headers)
+            timings.append(time.perf_counter() - start)
+        with CaptureQueriesContext(connection) as queries:
+            if before is not None:
+                before()
+            response = client.get(url, **headers)
+        return statistics.median(timings) * 1000, len(queries), response
+
+    def handle(self, *args, **options):
+        razas = Raza.objects.annotate(categories=Count('categorias_puntuacion')).filter(categories__gt=0)
+        if options['breed'] is not None:
+            razas = razas.filter(pk=options['breed'])
+        if not razas:
+            raise CommandError('No breed with a score template found; run populate_templates first.')
+
+        client = APIClient(SERVER_NAME='localhost')
+        iterations = options['iterations']
+        for raza in razas:
+            url = f'/api/score-templates/breed/{raza.pk}/'
+            cold, cold_queries, response = self._measure(client, url, iterations, before=bump_version)
+            warm, warm_queries, response = self._measure(client, url, iterations)
+            etag = response['ETag']
+            cached, cached_queries, response = self._measure(client, url, iterations, HTTP_IF_NONE_MATCH=etag)
+            if response.status_code != 304:
+                raise CommandError(f'Expected 304 for a matching ETag, got {response.status_code}.')
+            self.stdout.write(
+                f'{raza.nombre:<20} cold {cold:>7.2f} ms ({cold_queries} queries)  '
+                f'warm {warm:>7.2f} ms ({warm_queries} queries)  304 {cached:>7.2f} ms ({cached_queries} queries)'
+            )
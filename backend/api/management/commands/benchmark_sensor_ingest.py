@@ -0,0 +1,74 @@
+import json
+from datetime import timedelta
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.benchmarking import rolled_back, timer, create_synthetic_herd, rate
+from api.ingest import ingest_records
+
+
+class Command(BaseCommand):
+    help = 'Compares rows/sec of the per-row sensor-data endpoint against the bulk ingestion path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Readings per bulk run.')
+        parser.add_argument('--per-row-rows', type=int, default=500, help='Readings posted one by one (sampled, the per-row path is slow).')
+        parser.add_argument('--animals', type=int, default=200, help='Size of the synthetic herd.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        client = APIClient(SERVER_NAME='localhost')
+        results = {}
+
+        with rolled_back():
+            herd = create_synthetic_herd(options['animals'])
+            now = timezone.now()
+
+            def make_records(count):
+                return [
+                    {
+                        'identificador': herd[i % len(herd)].identificador,
+                        'timestamp': (now - timedelta(seconds=i)).isoformat(),
+                        'temperatura': round(rng.uniform(38.0, 39.5), 1),
+                        'actividad': rng.randint(100, 1000),
+                    }
+                    for i in range(count)
+                ]
+
+            # Ruta actual: una petición y un INSERT por lectura
+            per_row = make_records(options['per_row_rows'])
+            ejemplar_ids = {e.identificador: e.id for e in herd}
+            with timer(results, 'per-row POST'):
+                for record in per_row:
+                    payload = {'ejemplar': ejemplar_ids[record['identificador']], 'timestamp': record['timestamp'],
+                               'temperatura': record['temperatura'], 'actividad': record['actividad']}
+                    client.post(f'/api/animals/{payload["ejemplar"]}/sensor-data/', payload, format='json')
+            counts = {'per-row POST': len(per_row)}
+
+            records = make_records(options['rows'])
+            with override_settings(SENSOR_INGEST_COPY_THRESHOLD=None):
+                with timer(results, 'bulk JSON (bulk_create)'):
+                    client.post('/api/sensor-data/bulk/', records, format='json')
+                ndjson = '\n'.join(json.dumps(r) for r in records)
+                with timer(results, 'bulk NDJSON (bulk_create)'):
+                    client.generic('POST', '/api/sensor-data/bulk/', ndjson, content_type='application/x-ndjson')
+                with timer(results, 'ingest_records (bulk_create)'):
+                    ingest_records(records)
+            counts.update({label: len(records) for label in results if label != 'per-row POST'})
+
+            if connection.vendor == 'postgresql':
+                with override_settings(SENSOR_INGEST_COPY_THRESHOLD=1):
+                    with timer(results, 'ingest_records (COPY)'):
+                        ingest_records(records)
+                counts['ingest_records (COPY)'] = len(records)
+
+        baseline = rate(counts['per-row POST'], results['per-row POST'])
+        for label, seconds in results.items():
+            rows_per_sec = rate(counts[label], seconds)
+            self.stdout.write(f'{label:<32} {counts[label]:>8} rows {seconds:>9.3f}s {rows_per_sec:>12.0f} rows/s  x{rows_per_sec / baseline:.1f}')
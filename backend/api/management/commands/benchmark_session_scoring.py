@@ -0,0 +1,59 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmarking import rolled_back, timer, create_synthetic_herd, create_synthetic_template, rate
+from api.models import Raza, Calificacion, Ejemplar
+from api.scoring import save_session
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks session scoring and fails if its query count grows with the number of animals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animals', type=int, nargs='+', default=[1, 30, 300])
+        parser.add_argument('--traits', type=int, default=25, help='Characteristics scored per animal.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        counts = {}
+        with rolled_back():
+            evaluador = User.objects.create_user('bench-scoring', 'bench@example.com', 'bench')
+            raza = Raza.objects.create(nombre='BENCH-SCORING RAZA')
+            traits = create_synthetic_template(raza, categories=5, traits_per_category=max(1, options['traits'] // 5))
+            herd = create_synthetic_herd(max(options['animals']), prefix='BENCH-SCORING', raza=raza)
+
+            for animals in options['animals']:
+                entries = [
+                    {'ejemplar_id': ejemplar.pk,
+                     'scores': [{'caracteristica_id': trait.pk, 'puntuacion_obtenida': rng.uniform(5, 10)} for trait in traits]}
+                    for ejemplar in herd[:animals]
+                ]
+                results = {}
+                with CaptureQueriesContext(connection) as queries, timer(results, 'session'):
+                    save_session(entries, evaluador)
+                counts[animals] = len(queries)
+                rows = animals * len(traits)
+                self.stdout.write(f'{animals:>6} animals {rows:>8} scores {len(queries):>3} queries '
+                                  f'{results["session"]:>8.3f}s {rate(rows, results["session"]):>10.0f} scores/s')
+
+            # Un segundo envío del mismo día actualiza en lugar de duplicar
+            scored = herd[:max(options['animals'])]
+            expected = len(scored) * len(traits)
+            stored = Calificacion.objects.filter(ejemplar__in=scored).count()
+            if stored != expected:
+                raise CommandError(f'Expected {expected} stored scores after re-scoring, found {stored}.')
+            if Ejemplar.objects.filter(pk__in=[e.pk for e in scored], score_total__isnull=True).exists():
+                raise CommandError('Some scored animals have no score_total.')
+
+        if len(set(counts.values())) > 1:
+            if connection.vendor != 'postgresql':
+                # SQLite parte los INSERT/UPDATE masivos según su límite de parámetros
+                self.stdout.write(self.style.WARNING(f'Query counts {counts} vary because {connection.vendor} limits query parameters.'))
+                return
+            raise CommandError(f'Query count depends on the batch size: {counts}')
+        self.stdout.write(self.style.SUCCESS(f'Fixed query count: {next(iter(counts.values()))} per session.'))
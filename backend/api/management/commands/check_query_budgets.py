@@ -0,0 +1,232 @@
+import json
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import dashboard, latest_readings, reports, urls
+from api.benchmarking import rolled_back, create_synthetic_herd, create_synthetic_template
+from api.models import Raza, Alert, ReportJob, ScoreHistory, SensorData
+from api.querybudget import QueryBudgetExceeded, assert_constant_queries, count_queries
+from api.scoring import save_session
+
+
+class World:
+    """ Datos sintéticos de tamaño ``size``: cada listado de la API devuelve del orden de ``size`` filas. """
+
+    def __init__(self, size, seed=42):
+        rng = random.Random(seed)
+        now = timezone.now()
+        self.user = User.objects.create_user('query-budget', 'query-budget@example.com', 'query-budget')
+        self.raza = Raza.objects.create(nombre='QUERY-BUDGET RAZA')
+        self.traits = create_synthetic_template(self.raza, categories=size, traits_per_category=2)
+        self.categoria = self.traits[0].categoria
+        self.herd = create_synthetic_herd(size, prefix='QUERY-BUDGET', raza=self.raza)
+        self.animal = self.herd[0]
+        save_session([self.session_entry(ejemplar, rng) for ejemplar in self.herd])
+        ScoreHistory.objects.bulk_create([
+            ScoreHistory(ejemplar=self.animal, fecha=date.today() - timedelta(days=day), score_total=rng.uniform(50, 100),
+                         categorias={str(self.categoria.pk): rng.uniform(0, 20)})
+            for day in range(1, size + 1)
+        ])
+        latest_readings.upsert(SensorData.objects.bulk_create([
+            SensorData(ejemplar=ejemplar, timestamp=now - timedelta(minutes=10 * i),
+                       temperatura=rng.uniform(37.5, 39.5), actividad=rng.uniform(0, 100))
+            for i, ejemplar in enumerate([self.animal] * size + self.herd)
+        ]))
+        Alert.objects.bulk_create([
+            Alert(ejemplar=self.animal, alert_type=Alert.AlertType.FIEBRE, message='Temperatura elevada',
+                  timestamp=now - timedelta(minutes=i))
+            for i in range(size)
+        ])
+        self.calificacion = self.animal.calificaciones.first()
+        # Archivo mínimo con nombre fijo: ejecuciones repetidas reutilizan el mismo
+        key = reports.cache_key('query-budget', 'pdf', {})
+        self.report = ReportJob.objects.create(kind='herd-health', file_format='pdf', cache_key=key, status=ReportJob.Status.DONE,
+                                               progress=100, file=reports._store(key, 'pdf', b'%PDF-1.4\n'),
+                                               created_by=self.user)
+        self.readings = [
+            {'identificador': ejemplar.identificador, 'timestamp': (now - timedelta(seconds=i)).isoformat(),
+             'temperatura': rng.uniform(37.5, 39.5), 'actividad': rng.uniform(0, 100)}
+            for i, ejemplar in enumerate(self.herd)
+        ]
+        self.rng = rng
+
+    def session_entry(self, ejemplar, rng=None, traits=None):
+        rng = rng or self.rng
+        return {
+            'ejemplar_id': ejemplar.pk,
+            'scores': [
+                {'caracteristica_id': trait.pk, 'puntuacion_obtenida': rng.uniform(5, 10)}
+                for trait in (self.traits if traits is None else traits)
+            ],
+        }
+
+
+def _get(path):
+    return lambda world: ('get', path(world), {})
+
+
+def _post(path, data, **kwargs):
+    return lambda world: ('post', path(world), dict(data=data(world), format='json', **kwargs))
+
+
+def _animals_csv(world):
+    rows = [f'{ejemplar.identificador},{world.raza.nombre},2020-01-01' for ejemplar in world.herd]
+    rows += [f'QUERY-BUDGET-NEW-{i},{world.raza.nombre},2021-01-01' for i in range(len(world.herd))]
+    return 'identificador,raza,fecha_nacimiento\n' + '\n'.join(rows) + '\n'
+
+
+def _ndjson(world):
+    return '\n'.join(json.dumps(reading) for reading in world.readings) + '\n'
+
+
+# Escenarios por nombre de ruta de api.urls; una ruta sin escenario hace fallar el comando
+CHECKS = {
+    'api-root': [_get(lambda w: '/api/')],
+    'raza-list': [_get(lambda w: '/api/breeds/')],
+    'raza-detail': [_get(lambda w: f'/api/breeds/{w.raza.pk}/')],
+    'categoriapuntuacion-list': [_get(lambda w: '/api/categorias_puntuacion/')],
+    'categoriapuntuacion-detail': [_get(lambda w: f'/api/categorias_puntuacion/{w.categoria.pk}/')],
+    'caracteristica-list': [_get(lambda w: '/api/caracteristicas/')],
+    'caracteristica-detail': [_get(lambda w: f'/api/caracteristicas/{w.traits[0].pk}/')],
+    'ejemplar-list': [_get(lambda w: '/api/animals/')],
+    'ejemplar-detail': [_get(lambda w: f'/api/animals/{w.animal.pk}/')],
+    'ejemplar-recompute-scores': [_post(lambda w: '/api/animals/recompute-scores/', lambda w: {'raza': w.raza.pk})],
+    'ejemplar-import-animals': [
+        lambda w: ('post', '/api/animals/import/?dry_run=1', {'data': _animals_csv(w), 'content_type': 'text/csv'}),
+        lambda w: ('post', '/api/animals/import/', {'data': _animals_csv(w), 'content_type': 'text/csv'}),
+    ],
+    'calificacion-list': [_get(lambda w: '/api/calificaciones/')],
+    'calificacion-detail': [_get(lambda w: f'/api/calificaciones/{w.calificacion.pk}/')],
+    'calificacion-submit-animal-scores': [_post(
+        lambda w: f'/api/calificaciones/animal/{w.animal.pk}/scores/', lambda w: {'scores': w.session_entry(w.animal)['scores']},
+    )],
+    # Dos rasgos por ejemplar: con la plantilla completa las filas crecen con size² y SQLite parte el INSERT en lotes
+    'calificacion-submit-session-scores': [_post(
+        lambda w: '/api/calificaciones/session/',
+        lambda w: {'animals': [w.session_entry(ejemplar, traits=w.traits[:2]) for ejemplar in w.herd]},
+    )],
+    'token_obtain_pair': [_post(lambda w: '/api/token/', lambda w: {'username': w.user.username, 'password': 'query-budget'})],
+    'token_refresh': [_post(lambda w: '/api/token/refresh/', lambda w: {'refresh': str(RefreshToken.for_user(w.user))})],
+    'register': [_post(lambda w: '/api/register/', lambda w: {
+        'username': 'query-budget-new', 'email': 'query-budget-new@example.com', 'password': 'query-budget',
+        'password2': 'query-budget',
+    })],
+    'sensor-data-bulk': [_post(lambda w: '/api/sensor-data/bulk/', lambda w: w.readings)],
+    'sensor-data-stream': [
+        _get(lambda w: '/api/sensor-data/stream/query-budget/'),
+        lambda w: ('post', '/api/sensor-data/stream/query-budget/', {'data': _ndjson(w), 'content_type': 'application/x-ndjson'}),
+    ],
+    'herd-snapshot': [
+        _get(lambda w: '/api/sensor-data/latest/'),
+        _get(lambda w: f'/api/sensor-data/latest/?raza={w.raza.pk}&stale_hours=1&temperatura_above=38'),
+    ],
+    'animal-sensor-data-list': [_get(lambda w: f'/api/animals/{w.animal.pk}/sensor-data/')],
+    'animal-sensor-data': [_get(lambda w: f'/api/animals/{w.animal.pk}/sensor-data/')],
+    'animal-sensor-data-summary': [_get(lambda w: f'/api/animals/{w.animal.pk}/sensor-data/summary/?bucket=5m')],
+    'animal-alerts-list': [_get(lambda w: f'/api/animals/{w.animal.pk}/alerts/')],
+    'animal-submit-scores': [_post(
+        lambda w: f'/api/animals/{w.animal.pk}/scores/', lambda w: {'scores': w.session_entry(w.animal)['scores']},
+    )],
+    'animal-score-history': [_get(lambda w: f'/api/animals/{w.animal.pk}/score-history/')],
+    'score-history-percentiles': [_get(lambda w: '/api/score-history/percentiles/')],
+    'score-template-by-breed': [_get(lambda w: f'/api/score-templates/breed/{w.raza.pk}/')],
+    'dashboard-scores': [_get(lambda w: '/api/dashboard/scores/')],
+    'reportjob-list': [
+        _get(lambda w: '/api/reports/'),
+        _post(lambda w: '/api/reports/', lambda w: {'kind': 'classification-sheet', 'output': 'xlsx',
+                                                     'params': {'animals': [ejemplar.pk for ejemplar in w.herd]}}),
+        _post(lambda w: '/api/reports/', lambda w: {'kind': 'herd-health', 'output': 'pdf', 'params': {'raza': w.raza.pk}}),
+    ],
+    'reportjob-detail': [_get(lambda w: f'/api/reports/{w.report.pk}/')],
+    'reportjob-download': [_get(lambda w: f'/api/reports/{w.report.pk}/download/')],
+    'live-events-ticket': [_post(lambda w: '/api/events/ticket/', lambda w: {})],
+    'export': [
+        _get(lambda w: '/api/exports/sensor-data/?output=csv'),
+        _get(lambda w: f'/api/exports/calificaciones/?output=parquet&raza={w.raza.pk}'),
+    ],
+}
+
+# Rutas que no se pueden pedir con el cliente de pruebas (WSGI) y cómo se verifican
+SKIPPED = {
+    'live-events': 'SSE stream served only under ASGI; one user lookup per connection (see benchmark_live_events)',
+}
+
+
+def route_names(patterns=None):
+    """ Nombres de todas las rutas de api.urls (incluidas las del router). """
+    names = set()
+    for pattern in urls.urlpatterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Requests every route in api/urls.py against two synthetic data sizes and fails if any '
+            'endpoint issues more SQL queries for the larger one (N+1 detection).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs=2, default=[3, 15], metavar=('SMALL', 'LARGE'))
+        parser.add_argument('--route', nargs='+', help='Only check these route names.')
+
+    def _request(self, send, url, **kwargs):
+        response = send(url, **kwargs)
+        if response.streaming:
+            # Las respuestas en streaming consultan la base mientras se leen
+            b''.join(response.streaming_content)
+        return response
+
+    def _run(self, check):
+        def run(size):
+            queries = []
+            with rolled_back():
+                world = World(size)
+                method, url, kwargs = check(world)
+                client = APIClient(SERVER_NAME='localhost')
+                client.force_authenticate(world.user)
+                # La respuesta del dashboard cacheada ocultaría sus consultas
+                cache.delete(dashboard.payload_key())
+                queries, response = count_queries(self._request, getattr(client, method), url, **kwargs)
+                if response.status_code >= 400:
+                    raise CommandError(f'{method.upper()} {url} returned {response.status_code}: {response.content[:300]!r}')
+            return queries
+        return run
+
+    def handle(self, *args, **options):
+        names = route_names()
+        missing = names - CHECKS.keys() - SKIPPED.keys()
+        if missing:
+            raise CommandError(f'Routes without a query budget check: {", ".join(sorted(missing))}')
+        if options['route']:
+            unknown = set(options['route']) - names
+            if unknown:
+                raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+            names = set(options['route'])
+
+        small, large = sorted(options['sizes'])
+        failures = []
+        for name in sorted(names):
+            if name in SKIPPED:
+                self.stdout.write(f'{name:<36} skipped: {SKIPPED[name]}')
+                continue
+            for check in CHECKS[name]:
+                try:
+                    counts = assert_constant_queries(self._run(check), sizes=(small, large))
+                    self.stdout.write(f'{name:<36} {counts[small]:>3} -> {counts[large]:>3} queries  ok')
+                except QueryBudgetExceeded as exc:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'{name:<36} {exc}'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} route(s) grow with result size: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS(f'{len(names - SKIPPED.keys())} routes within budget.'))
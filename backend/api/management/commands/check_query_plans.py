@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg
+from django.utils import timezone
+
+from api.models import SensorData, SensorLatest, Alert, Ejemplar
+
+
+def hot_queries(ejemplar_id):
+    """ (descripción, queryset, índice esperado) de las consultas críticas de la API. """
+    since = timezone.now() - timedelta(days=1)
+    return [
+        ('sensor-data of one animal, newest first',
+         SensorData.objects.filter(ejemplar_id=ejemplar_id).order_by('-timestamp')[:100],
+         'sensordata_ejemplar_ts_idx'),
+        ('sensor-data of one animal, last 24 h',
+         SensorData.objects.filter(ejemplar_id=ejemplar_id, timestamp__gte=since).order_by('timestamp'),
+         'sensordata_ejemplar_ts_idx'),
+        ('alerts of one animal',
+         Alert.objects.filter(ejemplar_id=ejemplar_id),
+         'alert_ejemplar_ts_idx'),
+        ('unread alerts of one animal',
+         Alert.objects.filter(ejemplar_id=ejemplar_id, is_read=False),
+         'alert_unread_idx'),
+        ('dashboard average score by breed',
+         Ejemplar.objects.filter(score_total__isnull=False).values('raza__nombre')
+         .annotate(average_score=Avg('score_total')).order_by('raza__nombre'),
+         'ejemplar_raza_score_idx'),
+        ('dashboard recent scores',
+         Ejemplar.objects.filter(last_score_date__isnull=False)
+         .only('id', 'nombre', 'identificador', 'score_total', 'last_score_date', 'foto', 'foto_thumb')
+         .order_by('-last_score_date')[:10],
+         'ejemplar_recent_score_idx'),
+        ('dashboard sensor coverage',
+         SensorLatest.objects.filter(timestamp__gte=since),
+         'sensorlatest_ts_idx'),
+    ]
+
+
+def _index_names(plan):
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        names |= _index_names(child)
+    return names
+
+
+def _with_partitions(cursor, index_name):
+    """ Nombre del índice más los de sus particiones (tablas particionadas). """
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = %s
+        """,
+        [index_name],
+    )
+    return {index_name} | {row[0] for row in cursor.fetchall()}
+
+
+def used_indexes(cursor, queryset, expected):
+    """
+    (plan, índices usados, si alguno es ``expected`` o una de sus particiones)
+    de ``queryset`` según EXPLAIN.
+    """
+    sql, params = queryset.query.sql_with_params()
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+    plan = cursor.fetchone()[0]
+    plan = plan[0]['Plan'] if isinstance(plan, list) else plan
+    used = _index_names(plan)
+    return plan, used, bool(used & _with_partitions(cursor, expected))
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN on the hot API queries and fails if any of them does not use its intended index (PostgreSQL).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan of every query.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plan checks require PostgreSQL.')
+
+        failures = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Con tablas pequeñas el planner prefiere un seq scan; se desactiva para
+            # comprobar que el índice es utilizable, no si es el más barato hoy.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for description, queryset, expected in hot_queries(ejemplar_id=1):
+                plan, used, ok = used_indexes(cursor, queryset, expected)
+                if ok:
+                    self.stdout.write(self.style.SUCCESS(f'OK    {description}: {expected}'))
+                else:
+                    failures.append(description)
+                    self.stdout.write(self.style.ERROR(f'FAIL  {description}: expected {expected}, used {sorted(used) or "no index"}'))
+                if options['verbose_plans']:
+                    self.stdout.write(str(plan))
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries do not use their index: {", ".join(failures)}')
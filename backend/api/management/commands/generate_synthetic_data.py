@@ -0,0 +1,119 @@
+import time as clock
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import dashboard, latest_readings, rollups, score_history, synthetic
+from api.benchmarking import rate
+from api.models import Ejemplar
+from api.scoring import recompute_scores
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = ('Generates a reproducible synthetic dataset for performance work: breeds with their score templates, '
+            'herds, multi-day sensor series with injected fever and heat events, and scoring sessions, all written '
+            'with bulk inserts (COPY on PostgreSQL). Then rebuilds the derived tables (latest readings, rollups, '
+            'score history, dashboard). The data is committed so that load_test and a running server can use it; '
+            'remove it with --delete.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='SYN', help='Prefix of the generated breeds and animal identifiers.')
+        parser.add_argument('--breeds', type=int, default=3)
+        parser.add_argument('--animals', type=int, default=1000, help='Animals per breed.')
+        parser.add_argument('--days', type=int, default=7, help='Days of sensor data per animal.')
+        parser.add_argument('--interval', type=int, default=15, help='Minutes between readings.')
+        parser.add_argument('--end', help='Day (YYYY-MM-DD) the series end at, exclusive. Defaults to now.')
+        parser.add_argument('--fever-rate', type=float, default=0.01, help='Fever episodes per animal and day.')
+        parser.add_argument('--heat-rate', type=float, default=0.03, help='Heat episodes per animal and day.')
+        parser.add_argument('--sessions', type=int, default=4, help='Scoring sessions spread over the period.')
+        parser.add_argument('--categories', type=int, default=5, help='Score categories per breed.')
+        parser.add_argument('--traits', type=int, default=5, help='Traits per score category.')
+        parser.add_argument('--alerts', action='store_true', help='Run batch anomaly detection to create the alerts.')
+        parser.add_argument('--chunk-animals', type=int, default=200, help='Animals generated per transaction.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--delete', action='store_true', help='Delete the data generated with --prefix and exit.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['delete']:
+            deleted = synthetic.delete(prefix)
+            dashboard.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} animals and the breeds generated with prefix {prefix}.'))
+            return
+        if synthetic.exists(prefix):
+            raise CommandError(f'Data with prefix {prefix!r} already exists: delete it with --delete or use another --prefix.')
+        if options['interval'] <= 0 or options['days'] < 0 or options['animals'] <= 0 or options['breeds'] <= 0:
+            raise CommandError('--breeds, --animals and --interval must be positive and --days must not be negative.')
+
+        rng = np.random.default_rng(options['seed'])
+        if options['end']:
+            end = timezone.make_aware(datetime.combine(_parse_date(options['end']), time.min))
+        else:
+            end = timezone.now().replace(second=0, microsecond=0)
+        start = end - timedelta(days=options['days'])
+        timestamps = synthetic.timeline(start, end, timedelta(minutes=options['interval']))
+        timings = {}
+
+        started = clock.perf_counter()
+        # Sin contraseña utilizable: load_test se autentica con un AccessToken emitido directamente
+        evaluador = User.objects.create_user(synthetic.username(prefix), f'{synthetic.username(prefix)}@example.com')
+        herds = []
+        for index, (raza, traits) in enumerate(
+                synthetic.create_breeds(rng, options['breeds'], prefix, options['categories'], options['traits']), 1):
+            herd = synthetic.create_herd(rng, raza, index, options['animals'], prefix, end.date())
+            herds.append((raza, traits, [ejemplar.pk for ejemplar in herd]))
+        animal_count = options['breeds'] * options['animals']
+        timings['herds'] = clock.perf_counter() - started
+        self.stdout.write(f'{options["breeds"]} breeds, {animal_count} animals in {timings["herds"]:.1f} s')
+
+        started = clock.perf_counter()
+        ejemplar_ids = [pk for _, _, ids in herds for pk in ids]
+        readings, events = synthetic.generate_sensor_data(
+            rng, ejemplar_ids, timestamps, options['fever_rate'], options['heat_rate'], options['chunk_animals'],
+        )
+        timings['readings'] = clock.perf_counter() - started
+        kinds = Counter(event.kind for event in events)
+        self.stdout.write(
+            f'{readings} readings in {timings["readings"]:.1f} s ({rate(readings, timings["readings"]):,.0f} rows/s), '
+            f'{kinds[synthetic.FIEBRE]} fever and {kinds[synthetic.CELO]} heat events'
+        )
+
+        started = clock.perf_counter()
+        dates = synthetic.session_dates(start.date(), (end - timedelta(microseconds=1)).date(), options['sessions'])
+        scores = 0
+        for raza, traits, ids in herds:
+            scores += synthetic.score_sessions(rng, ids, traits, dates, evaluador)
+            Ejemplar.objects.filter(raza=raza).update(last_score_date=dates[-1])
+        recompute_scores({raza.pk for raza, _, _ in herds})
+        history = sum(score_history.backfill(raza_id=raza.pk) for raza, _, _ in herds)
+        timings['scores'] = clock.perf_counter() - started
+        self.stdout.write(f'{len(dates)} scoring sessions: {scores} scores, {history} score history rows in {timings["scores"]:.1f} s')
+
+        started = clock.perf_counter()
+        chunk = options['chunk_animals'] * 5
+        for offset in range(0, len(ejemplar_ids), chunk):
+            ids = ejemplar_ids[offset:offset + chunk]
+            latest_readings.rebuild(ids)
+            rollups.rebuild(start, end, ids)
+        if options['alerts']:
+            alerts = synthetic.detect_alerts(ejemplar_ids, start, end)
+            self.stdout.write(f'{alerts} alerts detected')
+        dashboard.rebuild()
+        timings['derived'] = clock.perf_counter() - started
+        self.stdout.write(f'Latest readings, rollups and dashboard rebuilt in {timings["derived"]:.1f} s')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated prefix {prefix} (seed {options["seed"]}) in {sum(timings.values()):.1f} s; '
+            f'scores are attributed to user {synthetic.username(prefix)!r}.'
+        ))
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import animal_import
+
+
+class Command(BaseCommand):
+    help = ('Creates or updates animals (Ejemplar) from a CSV or XLSX file with columns identificador, raza, '
+            'fecha_nacimiento and optionally nombre, peso_actual, talla_actual. Invalid rows are reported, not imported.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file (XLSX is detected by its extension).')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate and report what would be created or updated.')
+        parser.add_argument('--no-update', action='store_true', help='Reject rows whose identificador already exists.')
+        parser.add_argument('--batch-size', type=int, help='Rows validated and written per transaction (default ANIMAL_IMPORT_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist.')
+        with open(path, 'rb') as fileobj:
+            try:
+                result = animal_import.import_animals(
+                    animal_import.iter_upload(fileobj, path.name), update_existing=not options['no_update'],
+                    dry_run=options['dry_run'], batch_size=options['batch_size'],
+                )
+            except animal_import.AnimalImportError as exc:
+                raise CommandError(exc.detail)
+
+        for reject in result.rejected:
+            errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in reject['errors'].items())
+            self.stdout.write(self.style.WARNING(f'Row {reject["row"]} ({reject["identificador"] or "-"}): {errors}'))
+        if result.rejected_count > len(result.rejected):
+            self.stdout.write(self.style.WARNING(f'... and {result.rejected_count - len(result.rejected)} more rejected rows.'))
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} and {"would update" if options["dry_run"] else "updated"} {result.updated} animals; '
+            f'{result.rejected_count} rows rejected.'
+        ))
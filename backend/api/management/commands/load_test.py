@@ -0,0 +1,164 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import loadtest, synthetic
+from api.models import Caracteristica
+
+# Peso relativo de cada tipo de petición en la mezcla por defecto
+DEFAULT_MIX = {
+    'ingest': 30, 'dashboard': 25, 'scoring': 10, 'herd-snapshot': 10, 'sensor-data': 15, 'alerts': 10,
+}
+
+
+def _parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise CommandError(f'Unknown route "{name}" in --mix; choose from {", ".join(DEFAULT_MIX)}.')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Invalid weight "{weight}" for {name} in --mix, expected name=number.')
+    if not any(weight > 0 for weight in mix.values()):
+        raise CommandError('--mix needs at least one route with a positive weight.')
+    return mix
+
+
+class Traffic:
+    """
+    Mezcla de tráfico sobre los datos de ``generate_synthetic_data``: lotes
+    de lecturas recientes, sesiones de calificación de una raza y lecturas de
+    la app (dashboard, establo, series y alertas de un ejemplar al azar).
+    """
+
+    def __init__(self, prefix, ingest_batch, session_size):
+        self.herds = {}
+        for raza_id, pk, identificador in (synthetic.animals(prefix).order_by('raza_id', 'id')
+                                           .values_list('raza_id', 'id', 'identificador')):
+            self.herds.setdefault(raza_id, []).append((pk, identificador))
+        if not self.herds:
+            raise CommandError(f'No synthetic data with prefix {prefix!r}: run generate_synthetic_data first.')
+        self.traits = {}
+        for raza_id, pk, ideal in (Caracteristica.objects.filter(categoria__raza_id__in=self.herds)
+                                   .values_list('categoria__raza_id', 'id', 'puntaje_ideal')):
+            self.traits.setdefault(raza_id, []).append((pk, ideal))
+        self.raza_ids = sorted(self.herds)
+        self.animals = [animal for raza_id in self.raza_ids for animal in self.herds[raza_id]]
+        self.ingest_batch = ingest_batch
+        self.session_size = session_size
+
+    def ingest_body(self, rng):
+        now = timezone.now()
+        readings = []
+        for index in range(self.ingest_batch):
+            _, identificador = rng.choice(self.animals)
+            readings.append({
+                'identificador': identificador, 'timestamp': (now - timedelta(seconds=index)).isoformat(),
+                'temperatura': round(rng.gauss(38.6, 0.3), 2), 'actividad': round(rng.lognormvariate(4.1, 0.3), 1),
+            })
+        return json.dumps(readings).encode()
+
+    def session_body(self, rng):
+        raza_id = rng.choice(self.raza_ids)
+        herd = self.herds[raza_id]
+        # Orden por id: las sesiones concurrentes bloquean las filas en el mismo orden
+        animals = sorted(rng.sample(herd, min(self.session_size, len(herd))))
+        return json.dumps({'animals': [
+            {'ejemplar_id': pk, 'scores': [
+                {'caracteristica_id': trait_id, 'puntuacion_obtenida': round(min(ideal, rng.uniform(0.6, 1.0) * ideal), 1)}
+                for trait_id, ideal in self.traits.get(raza_id, [])
+            ]}
+            for pk, _ in animals
+        ]}).encode()
+
+    def targets(self, mix):
+        routes = {
+            'ingest': lambda weight: loadtest.Target('ingest', '/api/sensor-data/bulk/', weight, 'POST', self.ingest_body),
+            'dashboard': lambda weight: loadtest.Target('dashboard', '/api/dashboard/scores/', weight),
+            'scoring': lambda weight: loadtest.Target('scoring', '/api/calificaciones/session/', weight, 'POST', self.session_body),
+            'herd-snapshot': lambda weight: loadtest.Target(
+                'herd-snapshot', lambda rng: f'/api/sensor-data/latest/?raza={rng.choice(self.raza_ids)}', weight),
+            'sensor-data': lambda weight: loadtest.Target(
+                'sensor-data', lambda rng: f'/api/animals/{rng.choice(self.animals)[0]}/sensor-data/', weight),
+            'alerts': lambda weight: loadtest.Target(
+                'alerts', lambda rng: f'/api/animals/{rng.choice(self.animals)[0]}/alerts/', weight),
+        }
+        return [routes[name](weight) for name, weight in mix.items() if weight > 0]
+
+
+class Command(BaseCommand):
+    help = ('Replays a weighted mix of ingest, dashboard, scoring and read traffic against the data created by '
+            'generate_synthetic_data and reports throughput and p50/p95/p99 latency per route. Runs in-process '
+            'against the ASGI or WSGI application, or over HTTP against a running server with --url (the server '
+            'must use the same database). Ingest and scoring requests write to the database; remove the data '
+            'afterwards with generate_synthetic_data --delete.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='SYN', help='Prefix the data was generated with.')
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://127.0.0.1:8000.')
+        parser.add_argument('--stack', choices=('asgi', 'wsgi'), default='wsgi', help='In-process stack without --url.')
+        parser.add_argument('--mix', type=_parse_mix, default=DEFAULT_MIX,
+                            help='Route weights, e.g. "ingest=30,dashboard=25,scoring=10". '
+                                 f'Routes: {", ".join(DEFAULT_MIX)}.')
+        parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32], help='Concurrent clients per run.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per run.')
+        parser.add_argument('--workers', type=int, default=8, help='WSGI server threads of the in-process stack.')
+        parser.add_argument('--ingest-batch', type=int, default=100, help='Readings per ingest request.')
+        parser.add_argument('--session-size', type=int, default=25, help='Animals per scoring session.')
+        parser.add_argument('--warmup', type=int, default=50, help='Unreported requests before the first run.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=synthetic.username(options['prefix'])).first()
+        if user is None:
+            raise CommandError(f'No synthetic data with prefix {options["prefix"]!r}: run generate_synthetic_data first.')
+        traffic = Traffic(options['prefix'], options['ingest_batch'], options['session_size'])
+        targets = traffic.targets(options['mix'])
+        headers = [('Authorization', f'Bearer {AccessToken.for_user(user)}')]
+        if options['url']:
+            label, kwargs = options['url'], {'http_client': loadtest.HttpClient(options['url'])}
+        elif options['stack'] == 'asgi':
+            label, kwargs = 'asgi', {'asgi_application': get_asgi_application()}
+        else:
+            label, kwargs = 'wsgi', {'wsgi_application': get_wsgi_application(), 'workers': options['workers']}
+
+        if options['warmup']:
+            # Llena las cachés (dashboard, plantillas) y abre las conexiones antes de medir
+            warmup = asyncio.run(loadtest.run(label, targets, 1, options['warmup'], headers, seed=options['seed'], **kwargs))
+            if warmup.errors:
+                raise CommandError(f'Warm-up failed: {warmup.errors} error responses {dict(warmup.statuses)}.')
+        self.stdout.write(f'{label}: {len(traffic.animals)} animals, {options["requests"]} requests per run, '
+                          f'{options["ingest_batch"]} readings per ingest, {options["session_size"]} animals per session')
+        for clients in options['clients']:
+            result = asyncio.run(loadtest.run(label, targets, clients, options['requests'], headers,
+                                              seed=options['seed'] + clients, **kwargs))
+            self._report(result, options['ingest_batch'])
+
+    def _report(self, result, ingest_batch):
+        self.stdout.write(f'\n{result.clients} clients, {result.elapsed:.1f} s, peak {result.peak_in_flight} in flight')
+        self.stdout.write(f'{"route":<14} {"requests":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+                          f'{"max ms":>8} {"errors":>6}')
+        for name in [*sorted(result.latencies), None]:
+            summary = result.summary(name)
+            if not summary['requests']:
+                continue
+            self.stdout.write(
+                f'{name or "total":<14} {summary["requests"]:>8} {summary["rps"]:>8.1f} {summary["p50"] * 1000:>8.1f} '
+                f'{summary["p95"] * 1000:>8.1f} {summary["p99"] * 1000:>8.1f} {summary["max"] * 1000:>8.1f} '
+                f'{summary["errors"]:>6}'
+            )
+        ingested = (result.summary('ingest')['requests'] - result.failures['ingest']) * ingest_batch
+        if ingested:
+            self.stdout.write(f'{ingested / result.elapsed:,.0f} readings/s ingested')
+        if result.errors:
+            self.stdout.write(self.style.WARNING(f'{result.errors} error responses: {dict(result.statuses)}'))
@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import partitions
+
+
+class Command(BaseCommand):
+    help = 'Creates upcoming monthly SensorData partitions and archives (Parquet) then drops partitions past the retention period.'
+
+    def add_arguments(self, parser):
+        defaults = partitions.default_settings()
+        parser.add_argument('--ahead', type=int, default=defaults['months_ahead'], help='Months of partitions to create ahead of the current one.')
+        parser.add_argument('--retention-months', type=int, default=defaults['retention_months'], help='Full months of raw readings to keep.')
+        parser.add_argument('--archive-dir', default=str(defaults['archive_dir']), help='Directory for the exported Parquet files.')
+        parser.add_argument('--keep-detached', action='store_true', help='Keep expired partitions as detached tables instead of dropping them.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be done.')
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            raise CommandError('api_sensordata is not a partitioned PostgreSQL table; run the migrations on PostgreSQL first.')
+        today = date.today()
+
+        if options['dry_run']:
+            existing = partitions.list_partitions()
+            for offset in range(options['ahead'] + 1):
+                month = partitions.add_months(partitions.month_start(today), offset)
+                if month not in existing:
+                    self.stdout.write(f'Would create {partitions.partition_name(month)}')
+        else:
+            for name in partitions.ensure_future_partitions(today, options['ahead']):
+                self.stdout.write(self.style.SUCCESS(f'Created {name}'))
+
+        for month, name in partitions.expired_partitions(today, options['retention_months']):
+            if options['dry_run']:
+                self.stdout.write(f'Would archive and {"detach" if options["keep_detached"] else "drop"} {name}')
+                continue
+            try:
+                path, rows = partitions.archive_partition(month, name, options['archive_dir'], drop=not options['keep_detached'])
+            except partitions.PartitioningError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(f'Archived {rows} rows of {name} to {path}'))
@@ -1,197 +1,67 @@
-import re
-from django.core.management.base import BaseCommand
-from api.models import Raza, CategoriaPuntuacion, Caracteristica
+import time
 
-class Command(BaseCommand):
-    help = 'Populates the database with predefined scoring templates for different breeds.'
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-    def handle(self, *args, **options):
-        # WARNING: This command will DELETE all existing CategoriaPuntuacion and Caracteristica objects.
-        # This is done to ensure a clean population and avoid duplicate key errors.
-        self.stdout.write(self.style.WARNING('Deleting existing CategoriaPuntuacion and Caracteristica objects...'))
-        Caracteristica.objects.all().delete()
-        CategoriaPuntuacion.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS('Existing objects deleted.'))
+from api import template_sync
+from api.scoring import recompute_scores
 
-        templates_data = {
-            "BROWN SWISS": {
-                "Sistema Mamario": {
-                    "ponderacion": 40,
-                    "caracteristicas": [
-                        {"nombre": "Inserción anterior de la ubre", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Colocación de pezon anterior", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Longitud de pezón", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Profundidad de la ubre", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Altura de la ubre posterior", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Ligamentos suspensor medio", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Colocación de pezon posterior", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Anchura de la ubre trasera", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Inclinación de la ubre", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                    ]
-                },
-                "Fuerza Lechera": {
-                    "ponderacion": 20,
-                    "caracteristicas": [
-                        {"nombre": "Angularidad", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Fortaleza", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-                "Patas y Pezuñas": {
-                    "ponderacion": 20,
-                    "caracteristicas": [
-                        {"nombre": "Ángulo de pezuñas", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Patas vista lateral", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Locomoción", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Patas vista posterior", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Coxo femoral", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-                "Tren Anterior y Capacidad": {
-                    "ponderacion": 15,
-                    "caracteristicas": [
-                        {"nombre": "Estatura", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Profundidad", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Condición corporal", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                    ]
-                },
-                "Grupa": {
-                    "ponderacion": 5,
-                    "caracteristicas": [
-                        {"nombre": "Ángulo de la grupa", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Ancho de la grupa", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-            },
-            "HOLSTEIN": {
-                "Sistema Mamario": {
-                    "ponderacion": 40,
-                    "caracteristicas": [
-                        {"nombre": "Inserción anterior de la ubre", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Colocación de pezon anterior", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Longitud de pezón", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Profundidad de la ubre", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Altura de la ubre posterior", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Ligamentos suspensor medio", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Colocación de pezon posterior", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Anchura de la ubre trasera", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Inclinación de la ubre", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                    ]
-                },
-                "Fuerza Lechera": {
-                    "ponderacion": 20,
-                    "caracteristicas": [
-                        {"nombre": "Angularidad", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Fortaleza", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-                "Patas y Pezuñas": {
-                    "ponderacion": 20,
-                    "caracteristicas": [
-                        {"nombre": "Ángulo de pezuñas", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Patas vista lateral", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Locomoción", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Patas vista posterior", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Coxo femoral", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-                "Tren Anterior y Capacidad": {
-                    "ponderacion": 15,
-                    "caracteristicas": [
-                        {"nombre": "Estatura", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Profundidad", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Condición corporal", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                    ]
-                },
-                "Grupa": {
-                    "ponderacion": 5,
-                    "caracteristicas": [
-                        {"nombre": "Ángulo de la grupa", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Ancho de la grupa", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-            },
-            "JERSEY": {
-                "Sistema Mamario": {
-                    "ponderacion": 40,
-                    "caracteristicas": [
-                        {"nombre": "Inserción anterior de la ubre", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Colocación de pezon anterior", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Longitud de pezón", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Profundidad de la ubre", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Altura de la ubre posterior", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Ligamentos suspensor medio", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Colocación de pezon posterior", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Anchura de la ubre trasera", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Inclinación de la ubre", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                    ]
-                },
-                "Fuerza Lechera": {
-                    "ponderacion": 20,
-                    "caracteristicas": [
-                        {"nombre": "Angularidad", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Fortaleza", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-                "Patas y Pezuñas": {
-                    "ponderacion": 20,
-                    "caracteristicas": [
-                        {"nombre": "Ángulo de pezuñas", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Patas vista lateral", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Locomoción", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Patas vista posterior", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Coxo femoral", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-                "Tren Anterior y Capacidad": {
-                    "ponderacion": 15,
-                    "caracteristicas": [
-                        {"nombre": "Estatura", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Profundidad", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                        {"nombre": "Condición corporal", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                    ]
-                },
-                "Grupa": {
-                    "ponderacion": 5,
-                    "caracteristicas": [
-                        {"nombre": "Ángulo de la grupa", "puntaje_ideal": 5, "rango_aceptado_min": 4, "rango_aceptado_max": 6},
-                        {"nombre": "Ancho de la grupa", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9},
-                    ]
-                },
-            },
-        }
+KINDS = ('razas', 'categorias', 'caracteristicas')
 
-        for breed_name, categories_data in templates_data.items():
-            breed, created = Raza.objects.get_or_create(nombre=breed_name)
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created Breed: {breed_name}'))
-            else:
-                self.stdout.write(self.style.WARNING(f'Breed already exists: {breed_name}'))
 
-            for category_name, category_data in categories_data.items():
-                category, created = CategoriaPuntuacion.objects.get_or_create(
-                    raza=breed,
-                    nombre=category_name,
-                    ponderacion=category_data["ponderacion"]
-                )
-                if created:
-                    self.stdout.write(self.style.SUCCESS(f'Created Category: {category_name} for {breed_name}'))
-                else:
-                    self.stdout.write(self.style.WARNING(f'Category already exists: {category_name} for {breed_name}'))
+def _counts(counter):
+    return ', '.join(f'{counter[kind]} {kind}' for kind in KINDS)
+
+
+class Command(BaseCommand):
+    help = ('Syncs the scoring templates with JSON or YAML template files (by default the bundled '
+            'api/data/score_templates.json). Only the differences are written: new breeds, categories and traits are '
+            'bulk-inserted and changed ones bulk-updated, so historical scores are never deleted and re-running an '
+            'applied file writes nothing. Later files override the breeds of earlier ones.')
 
-                for char_data in category_data["caracteristicas"]:
-                    # Extraer rango aceptado y convertirlo a float
-                    rango_str = f"{char_data['rango_aceptado_min']} a {char_data['rango_aceptado_max']}"
-                    
-                    caracteristica, created = Caracteristica.objects.get_or_create(
-                        categoria=category,
-                        nombre=char_data["nombre"],
-                        puntaje_ideal=char_data["puntaje_ideal"],
-                        rango_aceptado_min=char_data["rango_aceptado_min"],
-                        rango_aceptado_max=char_data["rango_aceptado_max"]
-                    )
-                    if created:
-                        self.stdout.write(self.style.SUCCESS(f'Created Characteristic: {char_data["nombre"]} for {category_name}'))
-                    else:
-                        self.stdout.write(self.style.WARNING(f'Characteristic already exists: {char_data["nombre"]} for {category_name}'))
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Template files (.json, .yaml or .yml).')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them.')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete the categories and traits of the synced breeds that are not in the files. '
+                                 'Traits that have scores are always kept.')
+        parser.add_argument('--recompute', action='store_true',
+                            help='Recompute the scores of the breeds whose weights or ideal scores changed.')
 
-        self.stdout.write(self.style.SUCCESS('Successfully populated scoring templates.'))
+    def handle(self, *args, **options):
+        try:
+            loaded = [template_sync.load(path) for path in options['files'] or [template_sync.DEFAULT_FILE]]
+        except template_sync.TemplateSyncError as exc:
+            raise CommandError(exc.detail)
+        for path, (version, templates) in zip(options['files'] or [template_sync.DEFAULT_FILE], loaded):
+            self.stdout.write(f'{path}: version {version if version is not None else "-"}, {len(templates)} breeds')
+
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            result = template_sync.sync(template_sync.merge(loaded), prune=options['prune'], dry_run=options['dry_run'])
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if not result.changed:
+            self.stdout.write(self.style.SUCCESS(f'Templates up to date ({len(queries)} queries, {elapsed:.1f} ms).'))
+        else:
+            verb = 'Would create' if options['dry_run'] else 'Created'
+            self.stdout.write(f'{verb} {_counts(result.created)}.')
+            self.stdout.write(f'{"Would update" if options["dry_run"] else "Updated"} {_counts(result.updated)}.')
+            if options['prune']:
+                self.stdout.write(f'{"Would delete" if options["dry_run"] else "Deleted"} {_counts(result.deleted)}.')
+            self.stdout.write(self.style.SUCCESS(f'Done in {elapsed:.1f} ms ({len(queries)} queries).'))
+        if +result.stale and not options['prune']:
+            self.stdout.write(f'{_counts(result.stale)} of the synced breeds are not in the files; --prune deletes them.')
+        for trait in result.kept:
+            self.stdout.write(self.style.WARNING(f'Kept {trait}: it is not in the files but has scores.'))
+
+        if result.raza_ids and not options['dry_run']:
+            if options['recompute']:
+                ejemplar_ids, _ = recompute_scores(result.raza_ids)
+                self.stdout.write(self.style.SUCCESS(f'Recomputed {len(ejemplar_ids)} scores.'))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'Weights or ideal scores changed for breeds {sorted(result.raza_ids)}: run recompute_scores '
+                    '(or this command with --recompute) and backfill_score_history to update the stored scores.'
+                ))
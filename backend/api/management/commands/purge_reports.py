@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import reports
+
+
+class Command(BaseCommand):
+    help = 'Deletes report jobs finished more than --days ago and the report files no remaining job references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'REPORT_RETENTION_DAYS', 30))
+
+    def handle(self, *args, **options):
+        jobs, files = reports.purge(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {jobs} report jobs and {files} files.'))
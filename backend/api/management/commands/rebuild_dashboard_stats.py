@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import dashboard
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every dashboard KPI (breed averages, histograms, alert counts, sensor coverage) from the source tables.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        dashboard.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Dashboard stats rebuilt in {time.perf_counter() - start:.2f}s.'))
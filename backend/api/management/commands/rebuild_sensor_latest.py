@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api import latest_readings
+from api.models import Ejemplar
+
+
+class Command(BaseCommand):
+    help = 'Regenerates the latest-reading-per-animal table (SensorLatest) from raw SensorData.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-animals', type=int, default=1000, help='Animals rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        ejemplar_ids = list(Ejemplar.objects.order_by('id').values_list('id', flat=True))
+        chunk = options['chunk_animals']
+        total = 0
+        for i in range(0, len(ejemplar_ids), chunk):
+            total += latest_readings.rebuild(ejemplar_ids[i:i + chunk])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the latest reading of {total} of {len(ejemplar_ids)} animals.'))
@@ -0,0 +1,36 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import rollups
+from api.models import Ejemplar
+
+
+def _parse_date(value):
+    try:
+        return timezone.make_aware(datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), time.min))
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = 'Regenerates the hourly and daily sensor rollup tables from raw SensorData.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First day (YYYY-MM-DD), inclusive.')
+        parser.add_argument('--to', dest='date_to', help='Day (YYYY-MM-DD) to stop at, exclusive.')
+        parser.add_argument('--chunk-animals', type=int, default=1000, help='Animals rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        start = _parse_date(options['date_from']) if options['date_from'] else None
+        end = _parse_date(options['date_to']) if options['date_to'] else None
+
+        ejemplar_ids = list(Ejemplar.objects.order_by('id').values_list('id', flat=True))
+        chunk = options['chunk_animals']
+        total_hourly = total_daily = 0
+        for i in range(0, len(ejemplar_ids), chunk):
+            hourly, daily = rollups.rebuild(start, end, ejemplar_ids[i:i + chunk])
+            total_hourly += hourly
+            total_daily += daily
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_hourly} hourly and {total_daily} daily rollups.'))
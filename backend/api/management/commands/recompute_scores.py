@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.scoring import recompute_scores
+
+
+class Command(BaseCommand):
+    help = ('Recomputes Ejemplar.score_total from each animal\'s last scoring session (last_score_date) and the '
+            'current template weights for a breed or the whole herd, and rewrites that day\'s ScoreHistory row. '
+            'Run backfill_score_history to recompute the earlier history.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raza', type=int, nargs='+', help='Breed ids (default: every breed).')
+        parser.add_argument('--dry-run', action='store_true', help='Compute the scores without writing them.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        ejemplar_ids, scores = recompute_scores(options['raza'], dry_run=options['dry_run'])
+        seconds = time.perf_counter() - start
+        verb = 'Computed' if options['dry_run'] else 'Recomputed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(ejemplar_ids)} scores in {seconds:.2f}s.'))
+        if options['dry_run'] and len(scores):
+            self.stdout.write(f'min {scores.min():.2f}  mean {scores.mean():.2f}  max {scores.max():.2f}')
@@ -1,42 +1,48 @@
-from django.core.management.base import BaseCommand
-from api.models import Ejemplar, SensorData
-from datetime import datetime, timedelta
-import random
+from datetime import timedelta
 
-class Command(BaseCommand):
-    help = 'Seeds sensor data for two existing cows.'
-
-    def handle(self, *args, **options):
-        self.stdout.write(self.style.WARNING('Attempting to seed sensor data for two cows...'))
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
 
-        # --- IMPORTANTE: Reemplaza estos IDs con IDs de ejemplares reales de tu base de datos ---
-        # Puedes encontrar los IDs en el panel de administración de Django en la sección Ejemplares.
-        ejemplar_ids = [1, 2] # Ejemplo: IDs de dos vacas existentes
-        # ---------------------------------------------------------------------------------------
+from api import dashboard, latest_readings, rollups, synthetic
+from api.models import Ejemplar
 
-        for ej_id in ejemplar_ids:
-            try:
-                ejemplar = Ejemplar.objects.get(id=ej_id)
-                self.stdout.write(self.style.SUCCESS(f'Found Ejemplar: {ejemplar.nombre} (ID: {ejemplar.id})'))
 
-                # Generar datos de sensor para las últimas 24 horas
-                now = datetime.now()
-                for i in range(24):
-                    timestamp = now - timedelta(hours=i)
-                    temperatura = round(random.uniform(38.0, 39.5), 1) # Temperatura entre 38.0 y 39.5
-                    actividad = random.randint(100, 1000) # Actividad entre 100 y 1000
-
-                    SensorData.objects.create(
-                        ejemplar=ejemplar,
-                        timestamp=timestamp,
-                        temperatura=temperatura,
-                        actividad=actividad
-                    )
-                    self.stdout.write(self.style.SUCCESS(f'  - Added sensor data for {ejemplar.nombre} at {timestamp.strftime('%Y-%m-%d %H:%M')}'))
+class Command(BaseCommand):
+    help = ('Seeds synthetic sensor data, with occasional fever and heat events, for existing animals. '
+            'Use generate_synthetic_data to create a whole herd.')
 
-            except Ejemplar.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f'Ejemplar with ID {ej_id} not found. Skipping.'))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'An error occurred for Ejemplar ID {ej_id}: {e}'))
+    def add_arguments(self, parser):
+        parser.add_argument('ids', type=int, nargs='*', help='Animal ids. Defaults to every animal.')
+        parser.add_argument('--hours', type=int, default=24, help='Hours of data, ending now.')
+        parser.add_argument('--interval', type=int, default=60, help='Minutes between readings.')
+        parser.add_argument('--fever-rate', type=float, default=0.01, help='Fever episodes per animal and day.')
+        parser.add_argument('--heat-rate', type=float, default=0.03, help='Heat episodes per animal and day.')
+        parser.add_argument('--seed', type=int, default=42)
 
-        self.stdout.write(self.style.SUCCESS('Sensor data seeding process completed.'))
+    def handle(self, *args, **options):
+        ejemplares = Ejemplar.objects.order_by('id')
+        if options['ids']:
+            ejemplares = ejemplares.filter(id__in=options['ids'])
+        ejemplar_ids = list(ejemplares.values_list('id', flat=True))
+        missing = sorted(set(options['ids']) - set(ejemplar_ids))
+        if missing:
+            raise CommandError(f'Animals not found: {", ".join(map(str, missing))}.')
+        if not ejemplar_ids:
+            raise CommandError('There are no animals to seed.')
+        if options['interval'] <= 0:
+            raise CommandError('--interval must be positive.')
+
+        end = timezone.now().replace(second=0, microsecond=0)
+        start = end - timedelta(hours=options['hours'])
+        timestamps = synthetic.timeline(start, end, timedelta(minutes=options['interval']))
+        readings, events = synthetic.generate_sensor_data(
+            np.random.default_rng(options['seed']), ejemplar_ids, timestamps, options['fever_rate'], options['heat_rate'],
+        )
+        # Las lecturas se escriben sin pasar por la ingesta: se regeneran las tablas derivadas
+        latest_readings.rebuild(ejemplar_ids)
+        rollups.rebuild(start, end, ejemplar_ids)
+        dashboard.refresh_sensor_coverage()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {readings} readings for {len(ejemplar_ids)} animals ({len(events)} fever or heat events).'
+        ))
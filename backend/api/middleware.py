@@ -0,0 +1,28 @@
+"""
+Middleware de la app ``api``.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+class AsyncRoutesMiddleware:
+    """ Con ASGI resuelve las URLs con ``ASGI_URLCONF``; con WSGI no interviene. """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if urlconf:
+            request.urlconf = urlconf
+        return await self.get_response(request)
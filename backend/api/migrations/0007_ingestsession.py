@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_sensordata_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.CharField(help_text='Identificador de la subida asignado por el gateway', max_length=100, unique=True)),
+                ('acknowledged', models.BigIntegerField(default=0, help_text='Cantidad de registros ya confirmados (offset del siguiente)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
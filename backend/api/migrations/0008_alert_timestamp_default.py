@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_ingestsession'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alert',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
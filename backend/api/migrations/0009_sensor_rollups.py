@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_alert_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorRollupDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Inicio del intervalo')),
+                ('temperatura_min', models.FloatField(blank=True, null=True)),
+                ('temperatura_max', models.FloatField(blank=True, null=True)),
+                ('temperatura_sum', models.FloatField(default=0)),
+                ('temperatura_count', models.IntegerField(default=0)),
+                ('actividad_min', models.FloatField(blank=True, null=True)),
+                ('actividad_max', models.FloatField(blank=True, null=True)),
+                ('actividad_sum', models.FloatField(default=0)),
+                ('actividad_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ejemplar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.ejemplar')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'abstract': False,
+                'unique_together': {('ejemplar', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SensorRollupHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Inicio del intervalo')),
+                ('temperatura_min', models.FloatField(blank=True, null=True)),
+                ('temperatura_max', models.FloatField(blank=True, null=True)),
+                ('temperatura_sum', models.FloatField(default=0)),
+                ('temperatura_count', models.IntegerField(default=0)),
+                ('actividad_min', models.FloatField(blank=True, null=True)),
+                ('actividad_max', models.FloatField(blank=True, null=True)),
+                ('actividad_sum', models.FloatField(default=0)),
+                ('actividad_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ejemplar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.ejemplar')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'abstract': False,
+                'unique_together': {('ejemplar', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,111 @@
+"""
+Convierte api_sensordata en una tabla particionada por mes (solo PostgreSQL).
+
+La clave primaria pasa a ser (id, timestamp), como exige PostgreSQL para las
+tablas particionadas; para Django la pk sigue siendo ``id``. En otros motores
+la migración no hace nada.
+"""
+from datetime import date
+
+from django.db import migrations
+
+TABLE = 'api_sensordata'
+LEGACY = 'api_sensordata_legacy'
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month(value):
+    return date(value.year, value.month, 1)
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE {TABLE} RENAME TO {LEGACY}')
+    # Libera el nombre de la secuencia de id (identity o serial) para la tabla nueva
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT is_identity FROM information_schema.columns WHERE table_name = %s AND column_name = 'id'", [LEGACY]
+        )
+        is_identity = cursor.fetchone()[0] == 'YES'
+    if is_identity:
+        execute(f'ALTER TABLE {LEGACY} ALTER COLUMN id DROP IDENTITY')
+    else:
+        execute(f'ALTER TABLE {LEGACY} ALTER COLUMN id DROP DEFAULT')
+        execute(f'DROP SEQUENCE IF EXISTS {TABLE}_id_seq')
+    execute(f'CREATE SEQUENCE {TABLE}_id_seq')
+    execute(f"""
+        CREATE TABLE {TABLE} (
+            id bigint NOT NULL DEFAULT nextval('{TABLE}_id_seq'),
+            ejemplar_id bigint NOT NULL REFERENCES api_ejemplar (id) DEFERRABLE INITIALLY DEFERRED,
+            timestamp timestamp with time zone NOT NULL,
+            temperatura double precision NULL,
+            actividad double precision NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+    execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(timestamp), max(timestamp) FROM {LEGACY}')
+        first, last = cursor.fetchone()
+    # Particiones para los datos existentes y los próximos 3 meses
+    today = date.today()
+    month = _month(first) if first else _month(today)
+    stop = _add_months(_month(max(last.date(), today) if last else today), 3)
+    while month <= stop:
+        execute(
+            f'CREATE TABLE {TABLE}_p{month.year:04d}_{month.month:02d} PARTITION OF {TABLE} '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+    execute(f'INSERT INTO {TABLE} (id, ejemplar_id, timestamp, temperatura, actividad) '
+            f'SELECT id, ejemplar_id, timestamp, temperatura, actividad FROM {LEGACY}')
+    # Valida ya las FK diferidas: no se pueden crear índices con eventos de trigger pendientes
+    execute('SET CONSTRAINTS ALL IMMEDIATE')
+    execute(f"SELECT setval('{TABLE}_id_seq', COALESCE((SELECT max(id) FROM {TABLE}), 0) + 1, false)")
+    execute(f'DROP TABLE {LEGACY}')
+    execute(f'CREATE INDEX {TABLE}_timestamp_idx ON {TABLE} (timestamp)')
+    execute(f'CREATE INDEX {TABLE}_ejemplar_id_idx ON {TABLE} (ejemplar_id)')
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE {TABLE} RENAME TO {LEGACY}')
+    execute(f"""
+        CREATE TABLE {TABLE} (
+            id bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+            ejemplar_id bigint NOT NULL REFERENCES api_ejemplar (id) DEFERRABLE INITIALLY DEFERRED,
+            timestamp timestamp with time zone NOT NULL,
+            temperatura double precision NULL,
+            actividad double precision NULL
+        )
+    """)
+    execute(f'INSERT INTO {TABLE} (id, ejemplar_id, timestamp, temperatura, actividad) '
+            f'SELECT id, ejemplar_id, timestamp, temperatura, actividad FROM {LEGACY}')
+    # Valida ya las FK diferidas: no se pueden crear índices con eventos de trigger pendientes
+    execute('SET CONSTRAINTS ALL IMMEDIATE')
+    execute(f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE((SELECT max(id) FROM {TABLE}), 0) + 1, false)")
+    execute(f'DROP TABLE {LEGACY} CASCADE')
+    execute(f'CREATE INDEX {TABLE}_timestamp_idx ON {TABLE} (timestamp)')
+    execute(f'CREATE INDEX {TABLE}_ejemplar_id_idx ON {TABLE} (ejemplar_id)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_sensor_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_partition_sensordata'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alert',
+            name='ejemplar',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='api.ejemplar'),
+        ),
+        migrations.AlterField(
+            model_name='sensordata',
+            name='ejemplar',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sensor_data', to='api.ejemplar'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['ejemplar', '-timestamp'], name='alert_ejemplar_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['ejemplar', '-timestamp'], name='alert_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ejemplar',
+            index=models.Index(condition=models.Q(('score_total__isnull', False)), fields=['raza'], include=('score_total',), name='ejemplar_raza_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ejemplar',
+            index=models.Index(condition=models.Q(('last_score_date__isnull', False)), fields=['-last_score_date'], include=('score_total', 'nombre', 'identificador', 'foto'), name='ejemplar_recent_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensordata',
+            index=models.Index(fields=['ejemplar', '-timestamp'], name='sensordata_ejemplar_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('score_total', models.FloatField()),
+                ('categorias', models.JSONField(default=dict, help_text='{categoria_id: aporte al score_total}')),
+                ('ejemplar', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='score_history', to='api.ejemplar')),
+            ],
+            options={
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['fecha'], include=('score_total',), name='scorehistory_fecha_idx')],
+                'unique_together': {('ejemplar', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ejemplar',
+            name='ejemplar_recent_score_idx',
+        ),
+        migrations.AddField(
+            model_name='ejemplar',
+            name='foto_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='ejemplares_fotos/derivadas/'),
+        ),
+        migrations.AddField(
+            model_name='ejemplar',
+            name='foto_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='ejemplares_fotos/derivadas/'),
+        ),
+        migrations.AddIndex(
+            model_name='ejemplar',
+            index=models.Index(condition=models.Q(('last_score_date__isnull', False)), fields=['-last_score_date'], include=('score_total', 'nombre', 'identificador', 'foto', 'foto_thumb'), name='ejemplar_recent_score_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorLatest',
+            fields=[
+                ('ejemplar', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sensor_latest', serialize=False, to='api.ejemplar')),
+                ('timestamp', models.DateTimeField(help_text='Hora de la última lectura (última vez que se vio al ejemplar)')),
+                ('temperatura', models.FloatField(blank=True, null=True)),
+                ('actividad', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['timestamp'], name='sensorlatest_ts_idx'), models.Index(fields=['temperatura'], name='sensorlatest_temp_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_sensor_latest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='Ej.: classification-sheet, herd-health', max_length=50)),
+                ('file_format', models.CharField(help_text='pdf o xlsx', max_length=10)),
+                ('params', models.JSONField(default=dict)),
+                ('cache_key', models.CharField(help_text='sha256 del tipo, formato y datos del reporte', max_length=64)),
+                ('status', models.CharField(choices=[('PENDING', 'En cola'), ('RUNNING', 'Generando'), ('DONE', 'Listo'), ('FAILED', 'Falló')], default='PENDING', max_length=10)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Porcentaje completado')),
+                ('cached', models.BooleanField(default=False, help_text='El archivo se reutilizó de un reporte idéntico')),
+                ('file', models.FileField(blank=True, upload_to='reports/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cache_key', 'status'], name='reportjob_cache_key_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Raza(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -30,6 +31,14 @@ class Caracteristica(models.Model):
     def __str__(self):
         return self.nombre
 
+class CacheVersion(models.Model):
+    """ Versión de un conjunto de datos cacheados; se incrementa en la misma transacción que los modifica (ver api.versions). """
+    name = models.CharField(max_length=100, unique=True, help_text="Ej.: score_templates, dashboard")
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
 class Ejemplar(models.Model):
     identificador = models.CharField(max_length=50, unique=True, help_text="ID del arete o RFID")
     nombre = models.CharField(max_length=100, blank=True)
@@ -38,9 +47,22 @@ class Ejemplar(models.Model):
     peso_actual = models.FloatField(blank=True, null=True)
     talla_actual = models.FloatField(blank=True, null=True)
     foto = models.ImageField(upload_to='ejemplares_fotos/', blank=True, null=True)
+    # Versiones reducidas de la foto, generadas en segundo plano por api.thumbnails
+    foto_thumb = models.ImageField(upload_to='ejemplares_fotos/derivadas/', blank=True, null=True, editable=False)
+    foto_medium = models.ImageField(upload_to='ejemplares_fotos/derivadas/', blank=True, null=True, editable=False)
     score_total = models.FloatField(null=True, blank=True, help_text="Último score total calculado para el ejemplar")
     last_score_date = models.DateField(null=True, blank=True, help_text="Fecha de la última calificación")
 
+    class Meta:
+        indexes = [
+            # Promedio por raza del dashboard: index-only scan sobre los ejemplares calificados
+            models.Index(fields=['raza'], include=['score_total'], condition=models.Q(score_total__isnull=False),
+                         name='ejemplar_raza_score_idx'),
+            # Últimos calificados del dashboard: cubre las columnas de RecentScoreAnimalSerializer
+            models.Index(fields=['-last_score_date'], include=['score_total', 'nombre', 'identificador', 'foto', 'foto_thumb'],
+                         condition=models.Q(last_score_date__isnull=False), name='ejemplar_recent_score_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nombre or 'Sin Nombre'} ({self.identificador})"
 
@@ -57,19 +79,104 @@ class Calificacion(models.Model):
     def __str__(self):
         return f"{self.ejemplar} - {self.caracteristica.nombre}: {self.puntuacion_obtenida}"
 
+class ScoreHistory(models.Model):
+    """ Score materializado de un ejemplar en una fecha de calificación, con el aporte de cada categoría. """
+    # El índice único (ejemplar, fecha) ya cubre las búsquedas por ejemplar
+    ejemplar = models.ForeignKey(Ejemplar, on_delete=models.CASCADE, related_name='score_history', db_index=False)
+    fecha = models.DateField()
+    score_total = models.FloatField()
+    categorias = models.JSONField(default=dict, help_text="{categoria_id: aporte al score_total}")
+
+    class Meta:
+        ordering = ['fecha']
+        unique_together = ('ejemplar', 'fecha')
+        indexes = [
+            # Percentiles del rebaño por fecha: index-only scan sobre (fecha, score_total)
+            models.Index(fields=['fecha'], include=['score_total'], name='scorehistory_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ejemplar} @ {self.fecha}: {self.score_total:.2f}"
+
 class SensorData(models.Model):
     """ Almacena una lectura de sensor para un ejemplar en un momento dado. """
-    ejemplar = models.ForeignKey(Ejemplar, on_delete=models.CASCADE, related_name='sensor_data')
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # El índice compuesto (ejemplar, -timestamp) ya cubre las búsquedas por ejemplar
+    ejemplar = models.ForeignKey(Ejemplar, on_delete=models.CASCADE, related_name='sensor_data', db_index=False)
+    # Las lecturas por lote traen su propia hora de captura; auto_now_add la sobrescribiría.
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     temperatura = models.FloatField(null=True, blank=True)
     actividad = models.FloatField(null=True, blank=True, help_text="Nivel de actividad o pasos")
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['ejemplar', '-timestamp'], name='sensordata_ejemplar_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.ejemplar.identificador} @ {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
+class SensorLatest(models.Model):
+    """ Última lectura de cada ejemplar, actualizada en la ingesta (ver api.latest_readings). """
+    ejemplar = models.OneToOneField(Ejemplar, on_delete=models.CASCADE, primary_key=True, related_name='sensor_latest')
+    timestamp = models.DateTimeField(help_text="Hora de la última lectura (última vez que se vio al ejemplar)")
+    temperatura = models.FloatField(null=True, blank=True)
+    actividad = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp'], name='sensorlatest_ts_idx'),
+            models.Index(fields=['temperatura'], name='sensorlatest_temp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ejemplar_id} @ {self.timestamp:%Y-%m-%d %H:%M}"
+
+class SensorRollup(models.Model):
+    """ Agregados de las lecturas de un ejemplar en un intervalo (base de las tablas de rollup). """
+    ejemplar = models.ForeignKey(Ejemplar, on_delete=models.CASCADE, related_name='+')
+    bucket = models.DateTimeField(help_text="Inicio del intervalo")
+    temperatura_min = models.FloatField(null=True, blank=True)
+    temperatura_max = models.FloatField(null=True, blank=True)
+    temperatura_sum = models.FloatField(default=0)
+    temperatura_count = models.IntegerField(default=0)
+    actividad_min = models.FloatField(null=True, blank=True)
+    actividad_max = models.FloatField(null=True, blank=True)
+    actividad_sum = models.FloatField(default=0)
+    actividad_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        unique_together = ('ejemplar', 'bucket')
+        ordering = ['bucket']
+
+    def __str__(self):
+        return f"{self.ejemplar_id} @ {self.bucket:%Y-%m-%d %H:%M}"
+
+class SensorRollupHourly(SensorRollup):
+    """ Agregados por hora de SensorData, mantenidos incrementalmente por api.rollups. """
+
+    class Meta(SensorRollup.Meta):
+        pass
+
+class SensorRollupDaily(SensorRollup):
+    """ Agregados por día calculados a partir de los rollups por hora. """
+
+    class Meta(SensorRollup.Meta):
+        pass
+
+class IngestSession(models.Model):
+    """ Progreso de una subida en streaming de un gateway, para poder reanudarla. """
+    upload_id = models.CharField(max_length=100, unique=True, help_text="Identificador de la subida asignado por el gateway")
+    acknowledged = models.BigIntegerField(default=0, help_text="Cantidad de registros ya confirmados (offset del siguiente)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.upload_id} @ {self.acknowledged}"
+
 class Alert(models.Model):
     """ Almacena una alerta generada para un ejemplar. """
     class AlertType(models.TextChoices):
@@ -77,14 +184,61 @@ class Alert(models.Model):
         CELO = 'CELO', 'Posible Celo'
         INACTIVIDAD = 'INACTIVIDAD', 'Inactividad Anormal'
 
-    ejemplar = models.ForeignKey(Ejemplar, on_delete=models.CASCADE, related_name='alerts')
+    ejemplar = models.ForeignKey(Ejemplar, on_delete=models.CASCADE, related_name='alerts', db_index=False)
     alert_type = models.CharField(max_length=20, choices=AlertType.choices)
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Las alertas generadas por el motor llevan la hora de la lectura que las disparó.
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     is_read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['ejemplar', '-timestamp'], name='alert_ejemplar_ts_idx'),
+            models.Index(fields=['ejemplar', '-timestamp'], condition=models.Q(is_read=False), name='alert_unread_idx'),
+        ]
+
+    def __str__(self):
+        return f"Alerta {self.alert_type} para {self.ejemplar.identificador}"
+
+
+class DashboardStat(models.Model):
+    """ Contador agregado del dashboard; los cambios se aplican como incrementos (ver api.dashboard). """
+    name = models.CharField(max_length=100, unique=True, help_text="Ej.: breed:3, histogram:3:7, alerts:FIEBRE")
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.count} / {self.total}"
+
+class ReportJob(models.Model):
+    """ Generación en segundo plano de un reporte PDF o Excel (ver api.reports). """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'En cola'
+        RUNNING = 'RUNNING', 'Generando'
+        DONE = 'DONE', 'Listo'
+        FAILED = 'FAILED', 'Falló'
+
+    kind = models.CharField(max_length=50, help_text="Ej.: classification-sheet, herd-health")
+    file_format = models.CharField(max_length=10, help_text="pdf o xlsx")
+    params = models.JSONField(default=dict)
+    # Mismos parámetros sobre los mismos datos producen la misma clave y reutilizan el archivo
+    cache_key = models.CharField(max_length=64, help_text="sha256 del tipo, formato y datos del reporte")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Porcentaje completado")
+    cached = models.BooleanField(default=False, help_text="El archivo se reutilizó de un reporte idéntico")
+    file = models.FileField(upload_to='reports/', blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cache_key', 'status'], name='reportjob_cache_key_idx'),
+        ]
 
     def __str__(self):
-        return f"Alerta {self.alert_type} para {self.ejemplar.identificador}"
\ No newline at end of file
+        return f"{self.kind}.{self.file_format} #{self.pk} ({self.status})"
@@ -0,0 +1,151 @@
+"""
+Paginación por keyset (cursor) para los endpoints de listado.
+
+A diferencia de la paginación por offset, cada página se obtiene filtrando a
+partir de la última fila vista (``WHERE (timestamp, id) < (...)``), de modo que
+el costo de una página no depende de lo profundo que esté el cliente. Los
+cursores son opacos (base64) y estables aunque se inserten filas nuevas.
+"""
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """ Paginación por keyset sobre ``ordering`` (el último campo debe ser único). """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+        max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            return page_size
+        return max(1, min(requested, max_page_size))
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': reverse}, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """ Devuelve (posición, invertido); los valores de la posición ya convertidos al tipo de cada campo. """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            position, reverse = payload['p'], bool(payload['r'])
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            position = [model._meta.get_field(name).to_python(value) for (name, _), value in zip(self._fields(), position)]
+            if any(value is None for value in position):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def _position(self, item):
+        getter = item.get if isinstance(item, dict) else lambda name: getattr(item, name)
+        return [getter(name) for name, _ in self._fields()]
+
+    def _after(self, queryset, position, reverse):
+        """ Filtro lexicográfico: filas estrictamente posteriores a ``position`` en el orden pedido. """
+        condition = Q()
+        for i, (name, descending) in enumerate(self._fields()):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[i]})
+            for (prev_name, _), value in zip(self._fields()[:i], position[:i]):
+                step &= Q(**{prev_name: value})
+            condition |= step
+        return queryset.filter(condition)
+
+    def _page_queryset(self, queryset, request):
+        """ Queryset de la página pedida más una fila para saber si hay más. """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = position, reverse = self.decode_cursor(request, queryset.model)
+
+        # Para la página anterior se recorre el orden invertido y luego se da vuelta el resultado
+        order = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*order)
+        if position is not None:
+            queryset = self._after(queryset, position, reverse)
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """ ``paginate_queryset`` con el ORM asíncrono (vistas de ``api.async_views``). """
+        return self._page([row async for row in self._page_queryset(queryset, request)])
+
+    def _page(self, results):
+        position, reverse = self.position, self.reverse
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more if not reverse else position is not None
+        has_previous = position is not None if not reverse else has_more
+        self.next_position = self._position(results[-1]) if has_next and results else None
+        self.previous_position = self._position(results[0]) if has_previous and results else None
+        return results
+
+    def _link(self, position, reverse):
+        if position is None:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(position, reverse)
+        return self.request.build_absolute_uri(f'{self.request.path}?{urlencode(params, doseq=True)}')
+
+    def get_next_link(self):
+        return self._link(self.next_position, False)
+
+    def get_previous_link(self):
+        return self._link(self.previous_position, True)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class TimeSeriesPagination(KeysetPagination):
+    """ Series de tiempo (lecturas, alertas): de la más reciente a la más antigua. """
+    ordering = ('-timestamp', '-id')
+
+
+class IdPagination(KeysetPagination):
+    """ Catálogos (ejemplares, razas, calificaciones...): por id ascendente. """
+    ordering = ('id',)
@@ -0,0 +1,37 @@
+import codecs
+import csv
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """ Parsea un cuerpo con un objeto JSON por línea (NDJSON). """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        records = []
+        for line_number, line in enumerate(codecs.iterdecode(stream, encoding), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON inválido en la línea {line_number}: {exc}')
+        return records
+
+
+class CSVParser(BaseParser):
+    """ Parsea un CSV con cabecera en una lista de diccionarios. """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        reader = csv.DictReader(codecs.iterdecode(stream, encoding))
+        try:
+            return list(reader)
+        except csv.Error as exc:
+            raise ParseError(f'CSV inválido: {exc}')
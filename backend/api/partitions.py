@@ -0,0 +1,181 @@
+"""
+Particionado mensual de SensorData en PostgreSQL.
+
+La migración 0010 convierte ``api_sensordata`` en una tabla particionada por
+rango de ``timestamp`` (una partición por mes más una partición DEFAULT). Este
+módulo crea las particiones futuras y aplica la política de retención: las
+particiones más antiguas que ``SENSOR_DATA_RETENTION_MONTHS`` se desacoplan,
+se exportan a Parquet comprimido y se eliminan. Los rollups por hora y día no
+se tocan, así que las tendencias de largo plazo sobreviven a la retención.
+"""
+import re
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import SensorData
+from . import exports
+
+PARTITION_RE = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def parent_table():
+    return SensorData._meta.db_table
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{parent_table()}_p{month.year:04d}_{month.month:02d}'
+
+
+def default_partition():
+    """ Partición DEFAULT creada por la migración 0010. """
+    return f'{parent_table()}_default'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace",
+            [parent_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """ Devuelve {mes: nombre} de las particiones mensuales adjuntas. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s AND parent.relnamespace = current_schema()::regnamespace
+            """,
+            [parent_table()],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_RE.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def _bounds(month):
+    # Las cláusulas DDL no admiten parámetros; las fechas se generan aquí, no vienen del usuario
+    return f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def _range(month):
+    return [month, add_months(month, 1)]
+
+
+def create_partition(cursor, month):
+    """
+    Crea la partición del mes si no existe.
+
+    PostgreSQL rechaza ``PARTITION OF`` si la partición DEFAULT ya tiene
+    filas de ese mes (una ejecución de cron perdida, una carga histórica o
+    ``generate_synthetic_data``). En ese caso, dentro de una transacción, se
+    desacopla DEFAULT, se crea la partición, se mueven allí las filas y se
+    vuelve a acoplar DEFAULT.
+    """
+    quote = connection.ops.quote_name
+    parent, name, default = quote(parent_table()), quote(partition_name(month)), quote(default_partition())
+    with transaction.atomic():
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {default} WHERE timestamp >= %s AND timestamp < %s)', _range(month)
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} {_bounds(month)}')
+            return
+        cursor.execute(f'ALTER TABLE {parent} DETACH PARTITION {default}')
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} {_bounds(month)}')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE timestamp >= %s AND timestamp < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            _range(month),
+        )
+        cursor.execute(f'ALTER TABLE {parent} ATTACH PARTITION {default} DEFAULT')
+
+
+def ensure_future_partitions(today, months_ahead):
+    """ Crea las particiones desde el mes actual hasta ``months_ahead`` meses después. """
+    existing = list_partitions()
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(month_start(today), offset)
+            if month not in existing:
+                create_partition(cursor, month)
+                created.append(partition_name(month))
+    return created
+
+
+def expired_partitions(today, retention_months):
+    """ Particiones cuyo mes completo quedó fuera de la ventana de retención. """
+    cutoff = add_months(month_start(today), -retention_months)
+    return sorted((month, name) for month, name in list_partitions().items() if month < cutoff)
+
+
+def export_partition(name, path, chunk_size=50000):
+    """ Exporta una partición a Parquet (zstd) leyendo con un cursor del lado del servidor (ver api.exports). """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    quote = connection.ops.quote_name
+    columns = exports.SENSOR_DATA_COLUMNS
+    try:
+        with transaction.atomic(), connection.chunked_cursor() as cursor, open(path, 'wb') as fileobj:
+            cursor.execute(f'SELECT {", ".join(column.name for column in columns)} FROM {quote(name)} ORDER BY ejemplar_id, timestamp')
+            return exports.write_chunks(exports.cursor_chunks(cursor, chunk_size), columns, 'parquet', fileobj)
+    except exports.ExportError as exc:
+        raise PartitioningError(str(exc))
+
+
+def archive_partition(month, name, archive_dir, drop=True):
+    """
+    Desacopla la partición, la exporta a ``archive_dir`` y la elimina.
+
+    Con ``drop=False`` la tabla desacoplada se conserva tras exportarla.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(parent_table())} DETACH PARTITION {quote(name)}')
+    path = Path(archive_dir) / f'{name}.parquet'
+    try:
+        rows = export_partition(name, path)
+    except Exception:
+        # Sin archivo no se pierde nada: la partición vuelve a quedar visible
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {quote(parent_table())} ATTACH PARTITION {quote(name)} {_bounds(month)}')
+        raise
+    if drop:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {quote(name)}')
+    return path, rows
+
+
+def default_settings():
+    return {
+        'months_ahead': getattr(settings, 'SENSOR_DATA_PARTITIONS_AHEAD', 3),
+        'retention_months': getattr(settings, 'SENSOR_DATA_RETENTION_MONTHS', 13),
+        'archive_dir': getattr(settings, 'SENSOR_DATA_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'sensor_data'),
+    }
@@ -0,0 +1,320 @@
+"""
+Canal de eventos en vivo (Server-Sent Events) de alertas y lecturas.
+
+En lugar de consultar periódicamente ``animals/<pk>/alerts/`` y
+``sensor-data/``, el frontend abre ``events/`` (vista asíncrona, requiere
+servir la app con ASGI) y recibe las alertas nuevas y la última lectura de
+cada ejemplar en cuanto se confirman. Una suscripción se filtra por ejemplar
+(``animal``), por raza (``raza``) o recibe todo el rebaño.
+
+El reparto lo hace un broker: ``LocalBroker`` mantiene los suscriptores del
+proceso indexados por ejemplar, serializa cada evento una sola vez y entrega
+a cada suscriptor todos sus eventos de un lote con una única llamada a su
+event loop. ``RedisBroker`` (``PUSH_BROKER_URL``) reenvía los eventos entre
+procesos a través de Redis y en cada proceso reparte con ``LocalBroker``.
+Los últimos ``PUSH_REPLAY_EVENTS`` eventos se conservan para que un cliente
+que se reconecta con ``Last-Event-ID`` no pierda los intermedios.
+
+``LocalBroker``, el de por defecto, solo sirve con un único proceso ASGI que
+también recibe la ingesta: los eventos publicados por un worker WSGI, por
+otro worker ASGI o por un comando no llegan a sus suscriptores. Con más de
+un proceso hay que configurar ``PUSH_BROKER_URL``, que requiere el paquete
+``redis`` (no incluido en las dependencias del proyecto).
+
+EventSource no admite cabeceras, así que el navegador no abre ``events/``
+con el token JWT sino con un ticket firmado de ``events/ticket/``
+(``issue_ticket``). El ticket vence a los ``PUSH_TICKET_MAX_AGE`` segundos,
+de modo que lo que quede en los logs de acceso no sirve para nada después.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from .latest_readings import latest_per_animal
+from .models import Ejemplar
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ('alert', 'reading')
+TICKET_SALT = 'api.push.ticket'
+
+
+class Event:
+    """ Evento ya serializado: ``frame`` son los bytes SSE que recibe el cliente. """
+    __slots__ = ('id', 'type', 'ejemplar_id', 'raza_id', 'frame')
+
+    def __init__(self, id, type, ejemplar_id, raza_id, frame):
+        self.id = id
+        self.type = type
+        self.ejemplar_id = ejemplar_id
+        self.raza_id = raza_id
+        self.frame = frame
+
+    @classmethod
+    def build(cls, id, type, ejemplar_id, raza_id, data):
+        """ Evento con ``data`` (JSON en bytes) ya enmarcado en el formato SSE. """
+        return cls(id, type, ejemplar_id, raza_id, b'id: %d\nevent: %s\ndata: %s\n\n' % (id, type.encode(), data))
+
+
+class Subscription:
+    """
+    Suscriptor de un event loop. Los eventos se acumulan en ``pending`` y
+    ``ready`` despierta al consumidor, que los envía juntos en un solo write.
+    """
+
+    def __init__(self, loop, animals=None, razas=None, types=EVENT_TYPES, max_pending=1000):
+        self.loop = loop
+        self.animals = frozenset(animals) if animals else None
+        self.razas = frozenset(razas) if razas else None
+        self.types = frozenset(types)
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+        self.closed = False
+
+    def matches(self, event):
+        return event.type in self.types and (self.razas is None or event.raza_id in self.razas)
+
+    def deliver(self, frames):
+        """ Se ejecuta en el event loop del suscriptor. """
+        if self.overflowed:
+            return
+        self.pending.extend(frames)
+        if len(self.pending) > self.max_pending:
+            # Cliente lento: se corta el stream y al reconectar recupera lo posible con Last-Event-ID
+            self.overflowed = True
+            self.pending.clear()
+        self.ready.set()
+
+    def drain(self):
+        frames = b''.join(self.pending)
+        self.pending.clear()
+        self.ready.clear()
+        return frames
+
+
+def _deliver_all(batches):
+    for subscription, frames in batches:
+        subscription.deliver(frames)
+
+
+class LocalBroker:
+    """ Broker en memoria del proceso; también es el que se usa en pruebas. """
+
+    def __init__(self, replay=None):
+        if replay is None:
+            replay = getattr(settings, 'PUSH_REPLAY_EVENTS', 1000)
+        self._lock = threading.Lock()
+        self._herd = set()
+        self._by_animal = defaultdict(set)
+        self._history = deque(maxlen=replay)
+        self._ids = itertools.count(1)
+        self._raza_filtered = 0
+
+    def has_subscribers(self):
+        return bool(self._herd or self._by_animal)
+
+    def needs_razas(self):
+        """ Algún suscriptor filtra por raza (hay que resolver la raza de cada evento). """
+        return self._raza_filtered > 0
+
+    def next_ids(self, count):
+        with self._lock:
+            return [next(self._ids) for _ in range(count)]
+
+    def subscribe(self, loop, animals=None, razas=None, types=EVENT_TYPES, last_event_id=None):
+        """ Registra un suscriptor; con ``last_event_id`` recibe de inmediato los eventos posteriores guardados. """
+        subscription = Subscription(loop, animals, razas, types, getattr(settings, 'PUSH_MAX_PENDING_EVENTS', 1000))
+        with self._lock:
+            self._raza_filtered += subscription.razas is not None
+            if subscription.animals is None:
+                self._herd.add(subscription)
+            else:
+                for animal in subscription.animals:
+                    self._by_animal[animal].add(subscription)
+            if last_event_id is not None:
+                missed = [
+                    event.frame for event in self._history
+                    if event.id > last_event_id and self._wants(subscription, event)
+                ]
+                if missed:
+                    subscription.deliver(missed)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._raza_filtered -= subscription.razas is not None
+            self._herd.discard(subscription)
+            for animal in subscription.animals or ():
+                subscribers = self._by_animal.get(animal)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_animal[animal]
+
+    @staticmethod
+    def _wants(subscription, event):
+        return (subscription.animals is None or event.ejemplar_id in subscription.animals) and subscription.matches(event)
+
+    def publish(self, events):
+        """ Reparte ``events`` (ya serializados) a los suscriptores de este proceso. """
+        per_subscription = defaultdict(list)
+        with self._lock:
+            self._history.extend(events)
+            for event in events:
+                for subscription in itertools.chain(self._herd, self._by_animal.get(event.ejemplar_id, ())):
+                    if subscription.matches(event):
+                        per_subscription[subscription].append(event.frame)
+        per_loop = defaultdict(list)
+        for subscription, frames in per_subscription.items():
+            per_loop[subscription.loop].append((subscription, frames))
+        for loop, batches in per_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, batches)
+            except RuntimeError:
+                # El event loop ya se cerró; sus suscriptores se desregistran al cancelarse
+                pass
+
+
+class RedisBroker(LocalBroker):
+    """
+    Broker entre procesos: los eventos se publican en un canal de Redis y un
+    hilo por proceso los recibe y los reparte con ``LocalBroker.publish``.
+    """
+    CHANNEL = 'mycows:push'
+    ID_KEY = 'mycows:push:id'
+
+    def __init__(self, url, replay=None):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('PUSH_BROKER_URL requiere el paquete redis (pip install redis).')
+        super().__init__(replay)
+        self._redis = redis.Redis.from_url(url)
+        self._listener = None
+
+    def has_subscribers(self):
+        # Los suscriptores pueden estar en otro proceso
+        return True
+
+    def needs_razas(self):
+        return True
+
+    def next_ids(self, count):
+        last = self._redis.incrby(self.ID_KEY, count)
+        return list(range(last - count + 1, last + 1))
+
+    def subscribe(self, *args, **kwargs):
+        self._ensure_listener()
+        return super().subscribe(*args, **kwargs)
+
+    def publish(self, events):
+        message = json.dumps([
+            [event.id, event.type, event.ejemplar_id, event.raza_id, event.frame.decode()] for event in events
+        ])
+        self._redis.publish(self.CHANNEL, message)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='push-redis', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.CHANNEL)
+        for message in pubsub.listen():
+            try:
+                events = [
+                    Event(id, type, ejemplar_id, raza_id, frame.encode())
+                    for id, type, ejemplar_id, raza_id, frame in json.loads(message['data'])
+                ]
+                LocalBroker.publish(self, events)
+            except Exception:
+                logger.exception('Mensaje de eventos en vivo inválido')
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = getattr(settings, 'PUSH_BROKER_URL', None)
+            _broker = RedisBroker(url) if url else LocalBroker()
+        return _broker
+
+
+def set_broker(broker):
+    """ Reemplaza el broker del proceso (pruebas, benchmarks); devuelve el anterior. """
+    global _broker
+    with _broker_lock:
+        previous, _broker = _broker, broker
+    return previous
+
+
+def _publish(kind, items, serializer_class):
+    """ Serializa cada elemento una vez y lo publica; ``items`` son instancias con ``ejemplar_id``. """
+    broker = get_broker()
+    if not items or not broker.has_subscribers():
+        return 0
+    razas = {}
+    if broker.needs_razas():
+        razas = dict(
+            Ejemplar.objects.filter(pk__in={item.ejemplar_id for item in items}).values_list('id', 'raza_id')
+        )
+    renderer = JSONRenderer()
+    data = serializer_class(items, many=True).data
+    events = [
+        Event.build(event_id, kind, item.ejemplar_id, razas.get(item.ejemplar_id), renderer.render(row))
+        for event_id, item, row in zip(broker.next_ids(len(items)), items, data)
+    ]
+    broker.publish(events)
+    return len(events)
+
+
+def publish_readings(readings):
+    """ Publica la lectura más reciente de cada ejemplar de un lote ya confirmado. """
+    from .serializers import SensorDataSerializer
+    return _publish('reading', latest_per_animal(readings), SensorDataSerializer)
+
+
+def publish_alerts(alerts):
+    from .serializers import AlertSerializer
+    return _publish('alert', list(alerts), AlertSerializer)
+
+
+def publish_alerts_on_commit(alerts):
+    """ Publica ``alerts`` cuando confirme la transacción en curso. """
+    alerts = list(alerts)
+    if alerts and get_broker().has_subscribers():
+        # robust: un broker caído se registra sin afectar a lo que sigue tras el commit
+        transaction.on_commit(lambda: publish_alerts(alerts), robust=True)
+
+
+def issue_ticket(user):
+    """ Ticket firmado para abrir ``events/`` sin poner el token JWT en la URL. """
+    return signing.dumps({'u': user.pk}, salt=TICKET_SALT)
+
+
+def ticket_user_id(ticket):
+    """ Id del usuario del ticket; None si la firma no es válida o el ticket venció. """
+    try:
+        return signing.loads(ticket, salt=TICKET_SALT, max_age=getattr(settings, 'PUSH_TICKET_MAX_AGE', 30))['u']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
@@ -0,0 +1,75 @@
+"""
+Presupuestos de consultas SQL por endpoint.
+
+Un endpoint bien escrito hace la misma cantidad de consultas devuelva 2 o 100
+filas; si el número crece con el tamaño del resultado hay un N+1 (una relación
+leída fila a fila sin select_related/prefetch_related). ``query_budget`` falla
+si un bloque supera un máximo fijo y ``assert_constant_queries`` ejecuta el
+mismo escenario con dos tamaños de datos y falla si el segundo hace más
+consultas. ``QueryBudgetMixin`` expone ambos como aserciones de TestCase y el
+comando ``check_query_budgets`` los aplica a todas las rutas de ``api.urls``.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _format_queries(queries, limit=20, width=300):
+    lines = [f'  {index}. {query["sql"][:width]}' for index, query in enumerate(queries[:limit], start=1)]
+    if len(queries) > limit:
+        lines.append(f'  ... y {len(queries) - limit} más')
+    return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(limit, using=DEFAULT_DB_ALIAS):
+    """ Falla con QueryBudgetExceeded si el bloque ejecuta más de ``limit`` consultas. """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > limit:
+        raise QueryBudgetExceeded(
+            f'Se ejecutaron {len(context)} consultas con un presupuesto de {limit}:\n{_format_queries(context.captured_queries)}'
+        )
+
+
+def count_queries(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """ Ejecuta ``func`` y devuelve (consultas capturadas, resultado). """
+    with CaptureQueriesContext(connections[using]) as context:
+        result = func(*args, **kwargs)
+    return context.captured_queries, result
+
+
+def assert_constant_queries(run, sizes=(2, 10)):
+    """
+    Comprueba que la cantidad de consultas no crece con el tamaño de los datos.
+
+    ``run(size)`` prepara un escenario de ``size`` filas y devuelve la lista de
+    consultas capturadas al ejecutarlo. Devuelve {size: cantidad de consultas}.
+    """
+    captured = {size: run(size) for size in sizes}
+    counts = {size: len(queries) for size, queries in captured.items()}
+    smallest, largest = min(sizes), max(sizes)
+    if counts[largest] > counts[smallest]:
+        raise QueryBudgetExceeded(
+            f'Las consultas crecen con el tamaño del resultado ({smallest}: {counts[smallest]}, '
+            f'{largest}: {counts[largest]}):\n{_format_queries(captured[largest])}'
+        )
+    return counts
+
+
+class QueryBudgetMixin:
+    """ Aserciones de presupuesto de consultas para django.test.TestCase. """
+
+    def assertQueryBudget(self, limit, using=DEFAULT_DB_ALIAS):
+        return query_budget(limit, using=using)
+
+    def assertConstantQueries(self, run, sizes=(2, 10)):
+        try:
+            return assert_constant_queries(run, sizes)
+        except QueryBudgetExceeded as exc:
+            raise self.failureException(str(exc)) from None
@@ -0,0 +1,207 @@
+"""
+Dibujo de los reportes PDF (reportlab) y Excel (openpyxl).
+
+Este módulo corre en los procesos de ``tasks.submit_process``: no importa
+Django ni toca la base. Cada función recibe el contexto ya reunido por
+``api.reports`` (solo tipos de JSON, con fechas en ISO 8601) y devuelve los
+bytes del archivo. ``progress(fraction)`` informa el avance entre 0 y 1.
+"""
+from io import BytesIO
+
+
+class _Progress:
+    """ Reenvía el avance solo cuando cambia lo suficiente, para no saturar la cola. """
+
+    def __init__(self, callback, step=0.02):
+        self.callback = callback
+        self.step = step
+        self.last = 0.0
+
+    def __call__(self, fraction):
+        if self.callback is not None and fraction - self.last >= self.step:
+            self.last = fraction
+            self.callback(fraction)
+
+
+def _number(value, digits=1):
+    return '' if value is None else f'{value:.{digits}f}'
+
+
+def _pdf_document(buffer, title, pagesize=None):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate
+    return SimpleDocTemplate(buffer, pagesize=pagesize or A4, title=title, leftMargin=1.5 * cm, rightMargin=1.5 * cm,
+                             topMargin=1.5 * cm, bottomMargin=1.5 * cm)
+
+
+def _pdf_table(rows, col_widths=None, header_rows=1, bold_rows=()):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+    table = Table(rows, colWidths=col_widths, repeatRows=header_rows)
+    style = [
+        ('FONT', (0, 0), (-1, header_rows - 1), 'Helvetica-Bold', 9),
+        ('FONT', (0, header_rows), (-1, -1), 'Helvetica', 9),
+        ('BACKGROUND', (0, 0), (-1, header_rows - 1), colors.HexColor('#dfe8d8')),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]
+    style.extend(('FONT', (0, row), (-1, row), 'Helvetica-Bold', 9) for row in bold_rows)
+    table.setStyle(TableStyle(style))
+    return table
+
+
+def _build_pdf(doc, story, progress):
+    progress = _Progress(progress)
+    total = [len(story) or 1]
+
+    def on_progress(kind, value):
+        if kind == 'SIZE_EST':
+            total[0] = value or 1
+        elif kind == 'PROGRESS':
+            progress(value / total[0])
+
+    doc.setProgressCallBack(on_progress)
+    doc.build(story)
+
+
+def classification_sheet_pdf(context, progress=None):
+    """ Una página por ejemplar con sus puntuaciones por categoría y el score total. """
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import PageBreak, Paragraph, Spacer
+
+    styles = getSampleStyleSheet()
+    buffer = BytesIO()
+    doc = _pdf_document(buffer, 'Hojas de calificación')
+    story = []
+    for index, animal in enumerate(context['animals']):
+        if index:
+            story.append(PageBreak())
+        story.append(Paragraph(f'Hoja de calificación: {animal["identificador"]} {animal["nombre"]}', styles['Title']))
+        story.append(_pdf_table([
+            ['Raza', animal['raza'], 'Nacimiento', animal['fecha_nacimiento']],
+            ['Peso (kg)', _number(animal['peso_actual']), 'Talla (cm)', _number(animal['talla_actual'])],
+            ['Fecha de calificación', animal['fecha'] or 'Sin calificar', 'Score total', _number(animal['score_total'], 2)],
+        ], col_widths=[4 * cm, 5 * cm, 3.5 * cm, 5 * cm], header_rows=0))
+        story.append(Spacer(1, 0.5 * cm))
+        for categoria in animal['categorias']:
+            rows = [['Característica', 'Ideal', 'Rango aceptado', 'Puntuación']]
+            rows.extend(
+                [caracteristica['nombre'], caracteristica['puntaje_ideal'],
+                 f'{_number(caracteristica["rango_min"])} - {_number(caracteristica["rango_max"])}',
+                 _number(caracteristica['puntuacion'])]
+                for caracteristica in categoria['caracteristicas']
+            )
+            rows.append([f'{categoria["nombre"]} ({categoria["ponderacion"]}%)', '', 'Aporte al total',
+                         _number(categoria['aporte'], 2)])
+            story.append(_pdf_table(rows, col_widths=[7 * cm, 2.5 * cm, 4.5 * cm, 3.5 * cm], bold_rows=(len(rows) - 1,)))
+            story.append(Spacer(1, 0.3 * cm))
+    _build_pdf(doc, story, progress)
+    return buffer.getvalue()
+
+
+def herd_health_pdf(context, progress=None):
+    """ Totales del período y una fila por ejemplar con lecturas y alertas. """
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = getSampleStyleSheet()
+    buffer = BytesIO()
+    doc = _pdf_document(buffer, 'Resumen sanitario del hato', pagesize=landscape(A4))
+    totals = context['totales']
+    raza = f' - {context["raza"]}' if context['raza'] else ''
+    story = [
+        Paragraph(f'Resumen sanitario del hato{raza}', styles['Title']),
+        Paragraph(f'Del {context["desde"]} al {context["hasta"]}. {totals["ejemplares"]} ejemplares, '
+                  f'{totals["reportando"]} con lecturas en el período.', styles['Normal']),
+        Paragraph(', '.join(f'{label}: {count}' for label, count in zip(context['alert_types'], totals['alertas'])),
+                  styles['Normal']),
+        Spacer(1, 12),
+    ]
+    rows = [['Identificador', 'Nombre', 'Raza', 'Días con lecturas', 'Temp. media', 'Temp. máx.', 'Actividad media',
+             *context['alert_types']]]
+    rows.extend(
+        [animal['identificador'], animal['nombre'], animal['raza'], animal['dias_con_lecturas'],
+         _number(animal['temperatura_media']), _number(animal['temperatura_max']), _number(animal['actividad_media']),
+         *animal['alertas']]
+        for animal in context['ejemplares']
+    )
+    story.append(_pdf_table(rows))
+    _build_pdf(doc, story, progress)
+    return buffer.getvalue()
+
+
+def _workbook():
+    from openpyxl import Workbook
+    return Workbook(write_only=True)
+
+
+def _save_workbook(workbook):
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def classification_sheet_xlsx(context, progress=None):
+    """ Hoja "Scores" con el total por ejemplar y hoja "Calificaciones" con una fila por característica. """
+    progress = _Progress(progress)
+    workbook = _workbook()
+    scores = workbook.create_sheet('Scores')
+    scores.append(['Identificador', 'Nombre', 'Raza', 'Fecha', 'Score total'])
+    detail = workbook.create_sheet('Calificaciones')
+    detail.append(['Identificador', 'Fecha', 'Categoría', 'Ponderación', 'Aporte categoría', 'Característica',
+                   'Puntaje ideal', 'Rango mínimo', 'Rango máximo', 'Puntuación'])
+    animals = context['animals']
+    for index, animal in enumerate(animals, 1):
+        scores.append([animal['identificador'], animal['nombre'], animal['raza'], animal['fecha'], animal['score_total']])
+        for categoria in animal['categorias']:
+            for caracteristica in categoria['caracteristicas']:
+                detail.append([
+                    animal['identificador'], animal['fecha'], categoria['nombre'], categoria['ponderacion'],
+                    categoria['aporte'], caracteristica['nombre'], caracteristica['puntaje_ideal'],
+                    caracteristica['rango_min'], caracteristica['rango_max'], caracteristica['puntuacion'],
+                ])
+        progress(0.9 * index / len(animals))
+    return _save_workbook(workbook)
+
+
+def herd_health_xlsx(context, progress=None):
+    """ Hoja "Resumen" con los totales y hoja "Ejemplares" con una fila por ejemplar. """
+    progress = _Progress(progress)
+    workbook = _workbook()
+    summary = workbook.create_sheet('Resumen')
+    totals = context['totales']
+    summary.append(['Desde', context['desde']])
+    summary.append(['Hasta', context['hasta']])
+    summary.append(['Raza', context['raza'] or 'Todas'])
+    summary.append(['Ejemplares', totals['ejemplares']])
+    summary.append(['Con lecturas en el período', totals['reportando']])
+    for label, count in zip(context['alert_types'], totals['alertas']):
+        summary.append([f'Alertas: {label}', count])
+    animals = workbook.create_sheet('Ejemplares')
+    animals.append(['Identificador', 'Nombre', 'Raza', 'Días con lecturas', 'Temperatura media', 'Temperatura máxima',
+                    'Actividad media', *context['alert_types']])
+    rows = context['ejemplares']
+    for index, animal in enumerate(rows, 1):
+        animals.append([
+            animal['identificador'], animal['nombre'], animal['raza'], animal['dias_con_lecturas'],
+            animal['temperatura_media'], animal['temperatura_max'], animal['actividad_media'], *animal['alertas'],
+        ])
+        if index % 500 == 0:
+            progress(0.9 * index / len(rows))
+    return _save_workbook(workbook)
+
+
+RENDERERS = {
+    ('classification-sheet', 'pdf'): classification_sheet_pdf,
+    ('classification-sheet', 'xlsx'): classification_sheet_xlsx,
+    ('herd-health', 'pdf'): herd_health_pdf,
+    ('herd-health', 'xlsx'): herd_health_xlsx,
+}
+
+
+def render(kind, file_format, context, progress=None):
+    """ Bytes del reporte ``kind`` en ``file_format``. """
+    return RENDERERS[kind, file_format](context, progress=progress)
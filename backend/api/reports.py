@@ -0,0 +1,323 @@
+"""
+Reportes PDF y Excel generados en segundo plano.
+
+``submit`` valida los parámetros y reúne en la petición los datos del reporte
+(unas pocas consultas agregadas); dibujarlo, que puede llevar segundos, queda
+para ``run_job`` en la cola ``reports`` de ``api.tasks``, que a su vez lo
+delega al pool de procesos (``api.report_rendering``). El estado y el
+porcentaje de avance se guardan en ``ReportJob`` para consultarlos.
+
+Los archivos se direccionan por contenido: la clave es el sha256 del tipo, el
+formato y los datos reunidos, así que pedir el mismo reporte sobre datos que
+no cambiaron devuelve al instante el archivo ya generado, y cualquier cambio
+en los datos produce una clave (y un archivo) nuevos.
+"""
+import hashlib
+import importlib.util
+import json
+from collections import defaultdict, namedtuple
+from concurrent.futures import wait
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Alert, Calificacion, Ejemplar, Raza, ReportJob, ScoreHistory, SensorRollupDaily
+from .score_templates import current_version, get_template
+from . import report_rendering, tasks
+
+# Cambiarlo invalida los archivos cacheados cuando cambia el aspecto de los reportes
+RENDER_VERSION = 1
+PROGRESS_INTERVAL = 0.5
+
+FORMATS = {
+    'pdf': ('application/pdf', '.pdf', 'reportlab'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx', 'openpyxl'),
+}
+
+
+class ReportError(Exception):
+    """ Pedido de reporte inválido; ``status`` es el código HTTP sugerido. """
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    parsed = parse_date(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ReportError(f'{name} debe ser una fecha ISO 8601 (AAAA-MM-DD).')
+    return parsed
+
+
+def _clean_classification_sheet(params):
+    animals = params.get('animals')
+    if not isinstance(animals, list):
+        animals = [animals] if animals is not None else []
+    try:
+        animals = sorted({int(pk) for pk in animals})
+    except (TypeError, ValueError):
+        raise ReportError('animals debe ser una lista de ids de ejemplares.')
+    if not animals:
+        raise ReportError('Indique al menos un ejemplar en animals.')
+    max_animals = getattr(settings, 'REPORT_MAX_ANIMALS', 500)
+    if len(animals) > max_animals:
+        raise ReportError(f'Máximo {max_animals} ejemplares por reporte.', status=413)
+    fecha = _date_param(params, 'fecha')
+    return {'animals': animals, 'fecha': fecha.isoformat() if fecha else None}
+
+
+def _classification_sheet_context(params):
+    """ Puntuaciones de cada ejemplar en ``fecha`` (o en su última calificación) con la plantilla de su raza. """
+    ejemplares = list(Ejemplar.objects.filter(pk__in=params['animals']).select_related('raza').order_by('identificador'))
+    missing = set(params['animals']) - {ejemplar.pk for ejemplar in ejemplares}
+    if missing:
+        raise ReportError(f'Ejemplares no encontrados: {", ".join(map(str, sorted(missing)))}.', status=404)
+
+    fecha = parse_date(params['fecha']) if params['fecha'] else None
+    fechas = {ejemplar.pk: fecha or ejemplar.last_score_date for ejemplar in ejemplares}
+    scored_dates = {value for value in fechas.values() if value is not None}
+    scores = defaultdict(dict)
+    rows = Calificacion.objects.filter(ejemplar_id__in=fechas, fecha_calificacion__in=scored_dates) \
+        .values_list('ejemplar_id', 'fecha_calificacion', 'caracteristica_id', 'puntuacion_obtenida')
+    for ejemplar_id, fecha_calificacion, caracteristica_id, puntuacion in rows:
+        if fechas[ejemplar_id] == fecha_calificacion:
+            scores[ejemplar_id][caracteristica_id] = puntuacion
+    history = {
+        (ejemplar_id, day): (score_total, categorias)
+        for ejemplar_id, day, score_total, categorias in ScoreHistory.objects.filter(ejemplar_id__in=fechas, fecha__in=scored_dates)
+        .values_list('ejemplar_id', 'fecha', 'score_total', 'categorias')
+    }
+    version = current_version()
+    templates = {raza_id: get_template(raza_id, version) for raza_id in {ejemplar.raza_id for ejemplar in ejemplares}}
+
+    animals = []
+    for ejemplar in ejemplares:
+        day = fechas[ejemplar.pk]
+        score_total, aportes = history.get((ejemplar.pk, day), (None, {}))
+        animal_scores = scores[ejemplar.pk]
+        animals.append({
+            'identificador': ejemplar.identificador,
+            'nombre': ejemplar.nombre,
+            'raza': ejemplar.raza.nombre,
+            'fecha_nacimiento': ejemplar.fecha_nacimiento.isoformat(),
+            'peso_actual': ejemplar.peso_actual,
+            'talla_actual': ejemplar.talla_actual,
+            'fecha': day.isoformat() if day else None,
+            'score_total': score_total,
+            'categorias': [{
+                'nombre': categoria['nombre'],
+                'ponderacion': categoria['ponderacion'],
+                'aporte': aportes.get(str(categoria['id'])),
+                'caracteristicas': [{
+                    'nombre': caracteristica['nombre'],
+                    'puntaje_ideal': caracteristica['puntaje_ideal'],
+                    'rango_min': caracteristica['rango_aceptado_min'],
+                    'rango_max': caracteristica['rango_aceptado_max'],
+                    'puntuacion': animal_scores.get(caracteristica['id']),
+                } for caracteristica in categoria['caracteristicas']],
+            } for categoria in templates[ejemplar.raza_id].payload['categories']],
+        })
+    return {'animals': animals}
+
+
+def _clean_herd_health(params):
+    try:
+        days = int(params.get('days', 30))
+        raza = int(params['raza']) if params.get('raza') is not None else None
+    except (TypeError, ValueError):
+        raise ReportError('days y raza deben ser numéricos.')
+    max_days = getattr(settings, 'REPORT_MAX_DAYS', 366)
+    if not 1 <= days <= max_days:
+        raise ReportError(f'days debe estar entre 1 y {max_days}.')
+    # Por defecto hasta ayer: un período de días completos no cambia con cada lectura nueva y se puede cachear
+    hasta = _date_param(params, 'hasta') or timezone.localdate() - timedelta(days=1)
+    return {'days': days, 'hasta': hasta.isoformat(), 'raza': raza}
+
+
+def _herd_health_context(params):
+    """ Promedios de temperatura y actividad (de los rollups diarios) y alertas por ejemplar en el período. """
+    hasta = parse_date(params['hasta'])
+    desde = hasta - timedelta(days=params['days'] - 1)
+    start = timezone.make_aware(datetime.combine(desde, time.min))
+    end = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+    ejemplares = Ejemplar.objects.all()
+    raza = None
+    if params['raza'] is not None:
+        raza = Raza.objects.filter(pk=params['raza']).values_list('nombre', flat=True).first()
+        if raza is None:
+            raise ReportError('Raza no encontrada.', status=404)
+        ejemplares = ejemplares.filter(raza_id=params['raza'])
+
+    rollups = {
+        row['ejemplar_id']: row for row in SensorRollupDaily.objects
+        .filter(ejemplar__in=ejemplares, bucket__gte=start, bucket__lt=end).values('ejemplar_id')
+        .annotate(
+            dias=Count('id', filter=Q(temperatura_count__gt=0) | Q(actividad_count__gt=0)),
+            temperatura_sum=Sum('temperatura_sum'), temperatura_count=Sum('temperatura_count'),
+            temperatura_max=Max('temperatura_max'),
+            actividad_sum=Sum('actividad_sum'), actividad_count=Sum('actividad_count'),
+        ).order_by()
+    }
+    alert_types = [value for value, _ in Alert.AlertType.choices]
+    alerts = defaultdict(lambda: [0] * len(alert_types))
+    for ejemplar_id, alert_type, count in Alert.objects.filter(ejemplar__in=ejemplares, timestamp__gte=start, timestamp__lt=end) \
+            .values('ejemplar_id', 'alert_type').annotate(count=Count('id')).values_list('ejemplar_id', 'alert_type', 'count').order_by():
+        alerts[ejemplar_id][alert_types.index(alert_type)] = count
+
+    def mean(row, metric):
+        return row[f'{metric}_sum'] / row[f'{metric}_count'] if row and row[f'{metric}_count'] else None
+
+    animals = []
+    for pk, identificador, nombre, raza_nombre in ejemplares.order_by('identificador') \
+            .values_list('pk', 'identificador', 'nombre', 'raza__nombre'):
+        row = rollups.get(pk)
+        animals.append({
+            'identificador': identificador,
+            'nombre': nombre,
+            'raza': raza_nombre,
+            'dias_con_lecturas': row['dias'] if row else 0,
+            'temperatura_media': mean(row, 'temperatura'),
+            'temperatura_max': row['temperatura_max'] if row else None,
+            'actividad_media': mean(row, 'actividad'),
+            'alertas': alerts[pk] if pk in alerts else [0] * len(alert_types),
+        })
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'raza': raza,
+        'alert_types': [label for _, label in Alert.AlertType.choices],
+        'totales': {
+            'ejemplares': len(animals),
+            'reportando': sum(1 for animal in animals if animal['dias_con_lecturas']),
+            'alertas': [sum(counts[index] for counts in alerts.values()) for index in range(len(alert_types))],
+        },
+        'ejemplares': animals,
+    }
+
+
+Report = namedtuple('Report', ['clean', 'context'])
+
+REPORTS = {
+    'classification-sheet': Report(_clean_classification_sheet, _classification_sheet_context),
+    'herd-health': Report(_clean_herd_health, _herd_health_context),
+}
+
+
+def cache_key(kind, file_format, context):
+    """ sha256 del contenido del reporte: tipo, formato, versión del dibujo y datos reunidos. """
+    payload = json.dumps([RENDER_VERSION, kind, file_format, context], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def filename(job):
+    return f'{job.kind}-{job.pk}{FORMATS[job.file_format][1]}'
+
+
+def _storage():
+    return ReportJob._meta.get_field('file').storage
+
+
+def _store(key, file_format, content):
+    """ Guarda el archivo con el nombre de su clave; si ya existe se reutiliza. """
+    name = f'reports/{key[:2]}/{key}{FORMATS[file_format][1]}'
+    if not _storage().exists(name):
+        name = _storage().save(name, ContentFile(content))
+    return name
+
+
+def submit(kind, file_format, params, user=None):
+    """
+    Pide un reporte y devuelve su ReportJob.
+
+    Si ya se generó uno idéntico (misma clave) se devuelve un trabajo
+    terminado con ese archivo; si el mismo usuario tiene uno idéntico en
+    curso, ese mismo.
+    """
+    if kind not in REPORTS:
+        raise ReportError(f'kind debe ser uno de: {", ".join(REPORTS)}.')
+    if file_format not in FORMATS:
+        raise ReportError(f'output debe ser uno de: {", ".join(FORMATS)}.')
+    module = FORMATS[file_format][2]
+    if importlib.util.find_spec(module) is None:
+        raise ReportError(f'Los reportes {file_format} requieren {module} (pip install {module}).', status=501)
+    if not isinstance(params, dict):
+        raise ReportError('params debe ser un objeto.')
+
+    report = REPORTS[kind]
+    params = report.clean(params)
+    context = report.context(params)
+    key = cache_key(kind, file_format, context)
+    user = user if user is not None and user.is_authenticated else None
+    now = timezone.now()
+
+    done = ReportJob.objects.filter(cache_key=key, status=ReportJob.Status.DONE).exclude(file='').order_by('-id').first()
+    if done is not None and _storage().exists(done.file.name):
+        return ReportJob.objects.create(
+            kind=kind, file_format=file_format, params=params, cache_key=key, status=ReportJob.Status.DONE,
+            progress=100, cached=True, file=done.file.name, created_by=user, started_at=now, finished_at=now,
+        )
+
+    active = ReportJob.objects.filter(cache_key=key, status__in=[ReportJob.Status.PENDING, ReportJob.Status.RUNNING])
+    # Un trabajo que superó el tiempo máximo se perdió (p. ej. con un reinicio del proceso)
+    cutoff = now - timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 1800))
+    active.filter(created_at__lt=cutoff).update(
+        status=ReportJob.Status.FAILED, error='El trabajo no terminó a tiempo.', finished_at=now,
+    )
+    # Solo se reutiliza un trabajo del mismo usuario: el de otro no se vería en su lista
+    running = active.filter(created_by=user).order_by('-id').first()
+    if running is not None:
+        return running
+
+    job = ReportJob.objects.create(kind=kind, file_format=file_format, params=params, cache_key=key, created_by=user)
+    transaction.on_commit(lambda: tasks.submit(run_job, job.pk, context, queue='reports'))
+    return job
+
+
+def run_job(job_id, context):
+    """ Dibuja el reporte en el pool de procesos, informando el avance, y guarda el archivo. """
+    jobs = ReportJob.objects.filter(pk=job_id)
+    if not jobs.filter(status=ReportJob.Status.PENDING).update(status=ReportJob.Status.RUNNING, started_at=timezone.now()):
+        return None
+    job = jobs.get()
+    latest = [0.0]
+
+    def on_progress(fraction):
+        latest[0] = fraction
+
+    try:
+        future = tasks.submit_process(report_rendering.render, job.kind, job.file_format, context, progress=on_progress)
+        saved = 0
+        while not wait([future], timeout=PROGRESS_INTERVAL).done:
+            # El 10 % final queda para guardar el archivo
+            percent = int(latest[0] * 90)
+            if percent > saved:
+                jobs.update(progress=percent)
+                saved = percent
+        name = _store(job.cache_key, job.file_format, future.result())
+    except Exception as exc:
+        jobs.update(status=ReportJob.Status.FAILED, error=str(exc) or exc.__class__.__name__, finished_at=timezone.now())
+        raise
+    jobs.update(status=ReportJob.Status.DONE, progress=100, file=name, finished_at=timezone.now())
+    return name
+
+
+def purge(older_than):
+    """ Borra los trabajos terminados antes de ``older_than`` y los archivos que ya nadie referencia. """
+    finished = ReportJob.objects.filter(finished_at__lt=older_than)
+    names = set(finished.exclude(file='').values_list('file', flat=True))
+    deleted, _ = finished.delete()
+    still_used = set(ReportJob.objects.filter(file__in=names).values_list('file', flat=True))
+    for name in names - still_used:
+        _storage().delete(name)
+    return deleted, len(names - still_used)
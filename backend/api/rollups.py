@@ -0,0 +1,171 @@
+"""
+Tablas de rollup por hora y por día de SensorData.
+
+Después de cada escritura en la ingesta se encolan los intervalos (ejemplar,
+hora) tocados por las nuevas lecturas; solo esos intervalos se recalculan a
+partir de los datos crudos y, con ellos, los días que los contienen a partir
+de los rollups por hora. ``rebuild`` regenera todo desde los datos crudos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import SensorData, SensorRollupHourly, SensorRollupDaily
+from . import tasks
+
+METRICS = ('temperatura', 'actividad')
+ROLLUP_FIELDS = [f'{metric}_{stat}' for metric in METRICS for stat in ('min', 'max', 'sum', 'count')]
+ROLLUP_MODELS = {'1h': SensorRollupHourly, '1d': SensorRollupDaily}
+
+
+def _floor_hour(value):
+    return timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+
+
+def _floor_day(value):
+    return timezone.localtime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def touched_hours(readings):
+    """ Conjunto de (ejemplar_id, inicio de hora) afectados por ``readings``. """
+    return {(reading.ejemplar_id, _floor_hour(reading.timestamp)) for reading in readings}
+
+
+def _raw_aggregates():
+    aggregates = {}
+    for metric in METRICS:
+        aggregates[f'{metric}_min'] = Min(metric)
+        aggregates[f'{metric}_max'] = Max(metric)
+        aggregates[f'{metric}_sum'] = Sum(metric)
+        aggregates[f'{metric}_count'] = Count(metric)
+    return aggregates
+
+
+def _rollup_aggregates():
+    aggregates = {}
+    for metric in METRICS:
+        aggregates[f'{metric}_min'] = Min(f'{metric}_min')
+        aggregates[f'{metric}_max'] = Max(f'{metric}_max')
+        aggregates[f'{metric}_sum'] = Sum(f'{metric}_sum')
+        aggregates[f'{metric}_count'] = Sum(f'{metric}_count')
+    return aggregates
+
+
+def _rollup_values(row):
+    values = {field: row[field] for field in ROLLUP_FIELDS}
+    for metric in METRICS:
+        # SUM devuelve NULL si todas las lecturas del intervalo son nulas
+        values[f'{metric}_sum'] = values[f'{metric}_sum'] or 0
+    return values
+
+
+def _upsert(model, rows):
+    objs = [model(ejemplar_id=row['ejemplar_id'], bucket=row['bucket'], **_rollup_values(row)) for row in rows]
+    if objs:
+        model.objects.bulk_create(
+            objs, batch_size=1000, update_conflicts=True,
+            unique_fields=['ejemplar', 'bucket'], update_fields=ROLLUP_FIELDS + ['updated_at'],
+        )
+    return len(objs)
+
+
+def _aggregate(queryset, trunc, aggregates, keys):
+    rows = (
+        queryset.annotate(rollup_bucket=trunc)
+        .values('ejemplar_id', 'rollup_bucket')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    result = []
+    for row in rows:
+        row['bucket'] = row.pop('rollup_bucket')
+        if keys is None or (row['ejemplar_id'], row['bucket']) in keys:
+            result.append(row)
+    return result
+
+
+def refresh_hours(keys):
+    """ Recalcula los rollups por hora de ``keys`` y los días que los contienen. """
+    if not keys:
+        return 0
+    ejemplar_ids = {ejemplar_id for ejemplar_id, _ in keys}
+    start = min(hour for _, hour in keys)
+    end = max(hour for _, hour in keys) + timedelta(hours=1)
+    raw = SensorData.objects.filter(ejemplar_id__in=ejemplar_ids, timestamp__gte=start, timestamp__lt=end)
+
+    with transaction.atomic():
+        hourly = _upsert(SensorRollupHourly, _aggregate(raw, TruncHour('timestamp'), _raw_aggregates(), keys))
+        days = {(ejemplar_id, _floor_day(hour)) for ejemplar_id, hour in keys}
+        day_start = min(day for _, day in days)
+        day_end = max(day for _, day in days) + timedelta(days=1)
+        hours = SensorRollupHourly.objects.filter(ejemplar_id__in=ejemplar_ids, bucket__gte=day_start, bucket__lt=day_end)
+        _upsert(SensorRollupDaily, _aggregate(hours, TruncDay('bucket'), _rollup_aggregates(), days))
+    return hourly
+
+
+def enqueue_readings(readings):
+    """ Encola el recálculo de los intervalos tocados por un lote confirmado. """
+    if not readings or not getattr(settings, 'SENSOR_ROLLUPS_ON_INGEST', True):
+        return None
+    return tasks.submit(refresh_hours, touched_hours(readings), queue='rollups')
+
+
+def rebuild(start=None, end=None, ejemplar_ids=None):
+    """
+    Regenera los rollups desde los datos crudos, opcionalmente acotados.
+
+    ``start`` y ``end`` se amplían a días completos para no dejar rollups
+    diarios parciales.
+    """
+    bounds = {}
+    if start is not None:
+        bounds['gte'] = _floor_day(start)
+    if end is not None:
+        day = _floor_day(end)
+        bounds['lt'] = day if day == timezone.localtime(end) else day + timedelta(days=1)
+
+    def scoped(queryset, field):
+        for lookup, value in bounds.items():
+            queryset = queryset.filter(**{f'{field}__{lookup}': value})
+        if ejemplar_ids is not None:
+            queryset = queryset.filter(ejemplar_id__in=ejemplar_ids)
+        return queryset
+
+    with transaction.atomic():
+        scoped(SensorRollupHourly.objects.all(), 'bucket').delete()
+        scoped(SensorRollupDaily.objects.all(), 'bucket').delete()
+        raw = scoped(SensorData.objects.all(), 'timestamp')
+        hourly = _upsert(SensorRollupHourly, _aggregate(raw, TruncHour('timestamp'), _raw_aggregates(), None))
+        hours = scoped(SensorRollupHourly.objects.all(), 'bucket')
+        daily = _upsert(SensorRollupDaily, _aggregate(hours, TruncDay('bucket'), _rollup_aggregates(), None))
+    return hourly, daily
+
+
+def covers(bucket, start, end):
+    """ Indica si un rango alineado a ``bucket`` puede responderse desde los rollups. """
+    if bucket not in ROLLUP_MODELS:
+        return False
+    floor = _floor_hour if bucket == '1h' else _floor_day
+    return floor(start) == timezone.localtime(start) and floor(end) == timezone.localtime(end)
+
+
+def summarize(ejemplar_id, start, end, bucket):
+    """ Mismo formato que ``timeseries.summarize`` pero leído de las tablas de rollup. """
+    rows = ROLLUP_MODELS[bucket].objects.filter(ejemplar_id=ejemplar_id, bucket__gte=start, bucket__lt=end).order_by('bucket')
+    result = []
+    for rollup in rows.values('bucket', *ROLLUP_FIELDS):
+        data = {'start': rollup['bucket']}
+        for metric in METRICS:
+            count = rollup[f'{metric}_count']
+            data[metric] = {
+                'min': rollup[f'{metric}_min'],
+                'max': rollup[f'{metric}_max'],
+                'mean': rollup[f'{metric}_sum'] / count if count else None,
+                'count': count,
+            }
+        result.append(data)
+    return result
@@ -0,0 +1,149 @@
+"""
+Historial materializado de scores por ejemplar y fecha (ScoreHistory).
+
+Cada fila resume todas las calificaciones del ejemplar en esa fecha:
+``scoring.save_session`` la escribe al calificar con las del día (no solo las
+de la petición), ``scoring.recompute_scores`` refresca la de la última fecha
+y ``backfill`` las reconstruye todas desde Calificacion con las ponderaciones
+vigentes. Las trayectorias y los percentiles del rebaño leen
+solo filas precomputadas; en PostgreSQL los percentiles se calculan en la
+base con ``percentile_cont``.
+"""
+import math
+from itertools import chain, groupby
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Aggregate, Count, Field
+
+from .models import Calificacion, Ejemplar, ScoreHistory
+from .scoring import history_rows, load_traits
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class PercentileCont(Aggregate):
+    """ ``percentile_cont(fracciones) WITHIN GROUP (ORDER BY expresión)`` de PostgreSQL: una lista por grupo. """
+    function = 'percentile_cont'
+    output_field = Field()
+
+    def __init__(self, expression, fractions, **extra):
+        self.fractions = list(fractions)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        return f'{self.function}(%s::float8[]) WITHIN GROUP (ORDER BY {sql})', [self.fractions, *params]
+
+
+def parse_levels(value=None):
+    """
+    Percentiles pedidos como '10,50,90' (``DEFAULT_PERCENTILES`` si ``value`` es None).
+
+    Lanza ValueError si alguno no es un número finito entre 0 y 100. Los
+    enteros quedan como int para que las claves sean ``p50`` y no ``p50.0``.
+    """
+    levels = [float(level) for level in value.split(',')] if value is not None else [float(level) for level in DEFAULT_PERCENTILES]
+    if not levels or not all(math.isfinite(level) and 0 <= level <= 100 for level in levels):
+        raise ValueError('Los percentiles deben ser números entre 0 y 100.')
+    return [int(level) if level.is_integer() else level for level in levels]
+
+
+def _date_filter(queryset, field, start, end):
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lte': end})
+    return queryset
+
+
+def load_session_matrix(ejemplar_ids, start=None, end=None):
+    """
+    Matriz (ejemplar, fecha) × características de las calificaciones de ``ejemplar_ids``.
+
+    Devuelve (row_ejemplares, row_fechas, caracteristica_ids, matrix), con las
+    fechas como ordinales y NaN donde la característica no se calificó ese día.
+    """
+    calificaciones = _date_filter(Calificacion.objects.filter(ejemplar_id__in=ejemplar_ids), 'fecha_calificacion', start, end)
+    rows = calificaciones.values_list('ejemplar_id', 'fecha_calificacion', 'caracteristica_id', 'puntuacion_obtenida')
+    data = np.fromiter(
+        chain.from_iterable((e, f.toordinal(), c, v) for e, f, c, v in rows.iterator(chunk_size=20000)),
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    sessions, row_index = np.unique(data[:, :2].astype(np.int64), axis=0, return_inverse=True)
+    caracteristica_ids, column_index = np.unique(data[:, 2].astype(np.int64), return_inverse=True)
+    matrix = np.full((len(sessions), len(caracteristica_ids)), np.nan)
+    matrix[row_index.ravel(), column_index] = data[:, 3]
+    return sessions[:, 0], sessions[:, 1], caracteristica_ids, matrix
+
+
+def backfill(start=None, end=None, raza_id=None, chunk_animals=5000, dry_run=False):
+    """
+    Recalcula ScoreHistory desde Calificacion por bloques de ejemplares.
+
+    Devuelve la cantidad de filas (ejemplar, fecha) calculadas.
+    """
+    ejemplares = Ejemplar.objects.filter(calificaciones__isnull=False).order_by('id').distinct()
+    if raza_id is not None:
+        ejemplares = ejemplares.filter(raza_id=raza_id)
+    ejemplar_ids = list(ejemplares.values_list('id', flat=True))
+    raza_ids = {raza_id} if raza_id is not None else set(Ejemplar.objects.values_list('raza_id', flat=True).distinct())
+
+    total = 0
+    for offset in range(0, len(ejemplar_ids), chunk_animals):
+        row_ejemplares, row_fechas, caracteristica_ids, matrix = load_session_matrix(
+            ejemplar_ids[offset:offset + chunk_animals], start, end,
+        )
+        if not len(row_ejemplares):
+            continue
+        traits = load_traits(raza_ids, caracteristica_ids.tolist())
+        _, history = history_rows(row_ejemplares, row_fechas, caracteristica_ids, matrix, traits)
+        if not dry_run:
+            with transaction.atomic():
+                ScoreHistory.objects.bulk_create(
+                    history, batch_size=5000, update_conflicts=True,
+                    unique_fields=['ejemplar', 'fecha'], update_fields=['score_total', 'categorias'],
+                )
+        total += len(history)
+    return total
+
+
+def trajectory(ejemplar_id, start=None, end=None):
+    """ Scores y subtotales por categoría de un ejemplar, en orden cronológico. """
+    history = _date_filter(ScoreHistory.objects.filter(ejemplar_id=ejemplar_id), 'fecha', start, end)
+    return list(history.order_by('fecha').values('fecha', 'score_total', 'categorias'))
+
+
+def _percentiles_by_date(rows, levels):
+    """ (fecha, cantidad, valores) de filas (fecha, score) ordenadas por fecha. """
+    for fecha, group in groupby(rows, key=lambda row: row[0]):
+        scores = np.fromiter((score for _, score in group), dtype=np.float64)
+        yield fecha, len(scores), np.percentile(scores, levels).tolist()
+
+
+def percentiles(start=None, end=None, raza_id=None, levels=DEFAULT_PERCENTILES):
+    """
+    Percentiles del score del rebaño para cada fecha con calificaciones.
+
+    En PostgreSQL se agregan en la base (una fila por fecha); en otras bases
+    se leen las filas en orden de fecha y se calcula fecha por fecha, con
+    una sola fecha en memoria. Ambos interpolan igual (``np.percentile``
+    lineal equivale a ``percentile_cont``).
+    """
+    history = _date_filter(ScoreHistory.objects.all(), 'fecha', start, end)
+    if raza_id is not None:
+        history = history.filter(ejemplar__raza_id=raza_id)
+    levels = list(levels)
+
+    if connection.vendor == 'postgresql':
+        rows = (
+            history.values('fecha')
+            .annotate(total=Count('id'), scores=PercentileCont('score_total', [level / 100 for level in levels]))
+            .order_by('fecha').values_list('fecha', 'total', 'scores')
+        )
+    else:
+        rows = _percentiles_by_date(history.order_by('fecha').values_list('fecha', 'score_total').iterator(chunk_size=20000), levels)
+    return [
+        {'fecha': fecha, 'count': count, **{f'p{level}': value for level, value in zip(levels, values)}}
+        for fecha, count, values in rows
+    ]
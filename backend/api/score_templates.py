@@ -0,0 +1,132 @@
+"""
+Plantillas de calificación compiladas y cacheadas por raza.
+
+Una plantilla compilada guarda la respuesta ya serializada de
+``score-templates/breed/<id>/`` junto con su ETag y una tabla plana
+{caracteristica_id: Trait} que usa el cálculo de scores. Las entradas se
+indexan por (raza, versión): cualquier cambio en Raza, CategoriaPuntuacion o
+Caracteristica incrementa la versión (ver ``api.signals``) y las plantillas
+anteriores dejan de usarse.
+
+La versión vive en la base (``api.versions``) y se incrementa en la misma
+transacción que cambia la plantilla, de modo que todos los procesos la ven al
+confirmarse el cambio. Se lee una vez por llamada (un SELECT por clave
+única); las plantillas compiladas se guardan en un diccionario en memoria
+del proceso y en la caché de Django, ambos indexados por versión.
+"""
+import hashlib
+import json
+import threading
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch
+
+from .models import Raza, CategoriaPuntuacion, Caracteristica
+from .serializers import ScoreTemplateSerializer
+from . import versions
+
+VERSION_NAME = 'score_templates'
+
+Trait = namedtuple('Trait', ['puntaje_ideal', 'ponderacion', 'categoria_id'])
+
+
+class CompiledTemplate:
+    """ Plantilla de una raza lista para servir (``payload``/``etag``) y para calificar (``traits``). """
+    __slots__ = ('raza_id', 'version', 'payload', 'etag', 'traits')
+
+    def __init__(self, raza_id, version, payload, traits):
+        self.raza_id = raza_id
+        self.version = version
+        self.payload = payload
+        self.traits = traits
+        # El ETag depende del contenido: un cambio de versión que no altera la plantilla no invalida a los clientes
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        self.etag = f'"{digest[:32]}"'
+
+
+_local = {}
+_local_version = None
+_lock = threading.Lock()
+
+
+def current_version():
+    """ Versión de las plantillas, leída de la base. """
+    return versions.current(VERSION_NAME)
+
+
+def bump_version():
+    """ Invalida todas las plantillas compiladas en todos los procesos al confirmarse la transacción en curso. """
+    versions.bump(VERSION_NAME)
+
+
+def compile_template(raza_id):
+    """ Construye la plantilla de ``raza_id`` con tres consultas; None si la raza no existe. """
+    if not Raza.objects.filter(pk=raza_id).exists():
+        return None
+    # Orden explícito: el ETag se calcula sobre el contenido y debe ser estable
+    categories = list(
+        CategoriaPuntuacion.objects.filter(raza_id=raza_id).order_by('pk')
+        .prefetch_related(Prefetch('caracteristicas', queryset=Caracteristica.objects.order_by('pk')))
+    )
+    characteristics = sorted(
+        (caracteristica for categoria in categories for caracteristica in categoria.caracteristicas.all()),
+        key=lambda caracteristica: caracteristica.pk,
+    )
+    payload = ScoreTemplateSerializer({'categories': categories, 'characteristics': characteristics}).data
+    traits = {
+        caracteristica.pk: Trait(caracteristica.puntaje_ideal, categoria.ponderacion, categoria.pk)
+        for categoria in categories for caracteristica in categoria.caracteristicas.all()
+    }
+    # ReturnDict guarda una referencia al serializer; se cachea como JSON plano
+    return CompiledTemplate(raza_id, None, json.loads(json.dumps(payload)), traits)
+
+
+def get_template(raza_id, version=None):
+    """
+    Plantilla compilada de la raza (cacheada); None si la raza no existe.
+
+    Quien necesita varias razas lee ``current_version()`` una vez y la pasa
+    en ``version``.
+    """
+    global _local_version
+    # Dentro de una transacción se podrían leer datos no confirmados: se compila sin cachear
+    if connection.in_atomic_block:
+        return compile_template(raza_id)
+
+    if version is None:
+        version = current_version()
+    key = (raza_id, version)
+    with _lock:
+        if _local_version != version:
+            _local.clear()
+            _local_version = version
+        template = _local.get(key)
+    if template is not None:
+        return template
+
+    cache_key = f'score_template:{raza_id}:{version}'
+    template = cache.get(cache_key)
+    if template is None:
+        template = compile_template(raza_id)
+        if template is None:
+            return None
+        template.version = version
+        cache.set(cache_key, template, timeout=getattr(settings, 'SCORE_TEMPLATE_CACHE_TIMEOUT', 24 * 3600))
+    with _lock:
+        if _local_version == version:
+            _local[key] = template
+    return template
+
+
+async def aget_template(raza_id):
+    """ ``get_template`` para vistas asíncronas: sin hilo extra cuando la plantilla está en memoria. """
+    version = await versions.acurrent(VERSION_NAME)
+    with _lock:
+        template = _local.get((raza_id, version)) if _local_version == version else None
+    if template is not None:
+        return template
+    return await sync_to_async(get_template)(raza_id, version)
@@ -0,0 +1,316 @@
+"""
+Cálculo y guardado de calificaciones morfológicas.
+
+``save_session`` guarda las calificaciones de muchos ejemplares con un número
+fijo de consultas, independiente de la cantidad de ejemplares y
+características: una lectura de ejemplares, un upsert de Calificacion, una
+lectura de las calificaciones del día, una actualización masiva de Ejemplar,
+un upsert de ScoreHistory y el incremento de los indicadores del dashboard. Los puntajes ideales y ponderaciones salen
+de las plantillas compiladas de ``api.score_templates``.
+
+``recompute_scores`` recalcula ``score_total`` de toda una raza o de todo el
+rebaño con NumPy (una matriz ejemplares × características) y lo escribe en
+bloque, por ejemplo después de cambiar las ponderaciones de una plantilla.
+Como ``save_session``, usa solo las calificaciones de ``last_score_date`` y
+refresca también esa fila de ScoreHistory; las fechas anteriores del
+historial se recalculan con ``backfill_score_history``.
+"""
+from datetime import date
+from itertools import chain
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Calificacion, Caracteristica, Ejemplar, ScoreHistory
+from .score_templates import Trait, current_version, get_template
+from . import dashboard
+
+
+class ScoringError(Exception):
+    """ Datos de calificación inválidos; ``status`` es el código HTTP sugerido. """
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def compute_score(scores, traits):
+    """
+    Score total (0-100) de un ejemplar.
+
+    ``scores`` es {caracteristica_id: puntuacion_obtenida} y ``traits``
+    {caracteristica_id: Trait}. Cada característica aporta (obtenido / ideal)
+    ponderado por su categoría.
+    """
+    total_score = 0
+    total_possible_score = 0
+    for caracteristica_id, puntuacion_obtenida in scores.items():
+        trait = traits[caracteristica_id]
+        total_score += (puntuacion_obtenida / trait.puntaje_ideal) * trait.ponderacion
+        total_possible_score += trait.ponderacion
+    return (total_score / total_possible_score) * 100 if total_possible_score > 0 else 0
+
+
+def compute_breakdown(scores, traits):
+    """ Aporte de cada categoría al score total: {categoria_id: subtotal}; los subtotales suman el score. """
+    contributions = {}
+    total_possible_score = 0
+    for caracteristica_id, puntuacion_obtenida in scores.items():
+        trait = traits[caracteristica_id]
+        contributions[trait.categoria_id] = contributions.get(trait.categoria_id, 0) + (puntuacion_obtenida / trait.puntaje_ideal) * trait.ponderacion
+        total_possible_score += trait.ponderacion
+    return {
+        categoria_id: (contribution / total_possible_score) * 100 if total_possible_score > 0 else 0
+        for categoria_id, contribution in contributions.items()
+    }
+
+
+def load_traits(raza_ids, caracteristica_ids):
+    """ Trait de cada característica: desde las plantillas compiladas y, si falta alguna, desde la base. """
+    traits = {}
+    # Una sola lectura de la versión para todas las razas de la llamada
+    version = current_version()
+    for raza_id in raza_ids:
+        template = get_template(raza_id, version)
+        if template is not None:
+            traits.update(template.traits)
+    unknown = set(caracteristica_ids) - set(traits)
+    if unknown:
+        # Características de otra raza o sin raza: no están en ninguna plantilla cargada
+        for caracteristica in Caracteristica.objects.select_related('categoria').filter(pk__in=unknown):
+            traits[caracteristica.pk] = Trait(caracteristica.puntaje_ideal, caracteristica.categoria.ponderacion, caracteristica.categoria_id)
+    return traits
+
+
+def _merge(entries):
+    """ Agrupa {ejemplar_id: {caracteristica_id: puntuacion}}; ante repetidos gana el último. """
+    merged = {}
+    for entry in entries:
+        scores = merged.setdefault(entry['ejemplar_id'], {})
+        for score in entry['scores']:
+            scores[score['caracteristica_id']] = score['puntuacion_obtenida']
+    return merged
+
+
+def save_session(entries, evaluador=None):
+    """
+    Guarda las calificaciones de una sesión, actualiza el score de cada ejemplar
+    y su fila de ScoreHistory del día.
+
+    El score y la fila de historial se calculan con todas las calificaciones
+    del ejemplar de hoy, no solo con las de esta petición, igual que
+    ``score_history.backfill``: calificar una raza en dos tandas el mismo
+    día da el mismo resultado que en una sola.
+
+    ``entries`` es una lista de {'ejemplar_id', 'scores': [{'caracteristica_id',
+    'puntuacion_obtenida'}]}. Devuelve {ejemplar_id: score_total}. Lanza
+    ScoringError sin escribir nada si falta algún ejemplar o característica.
+    """
+    # fecha_calificacion es auto_now_add: bulk_create también la fija a hoy
+    today = date.today()
+    merged = _merge(entries)
+    if not merged:
+        return {}
+
+    previous = {pk: (raza_id, score) for pk, raza_id, score in
+                Ejemplar.objects.filter(pk__in=merged).values_list('pk', 'raza_id', 'score_total')}
+    razas = {pk: raza_id for pk, (raza_id, _) in previous.items()}
+    missing = sorted(set(merged) - set(razas))
+    if missing:
+        if len(merged) == 1:
+            raise ScoringError('Ejemplar no encontrado.', status=404)
+        raise ScoringError(f'Ejemplares no encontrados: {", ".join(map(str, missing))}.', status=404)
+
+    caracteristica_ids = {caracteristica_id for scores in merged.values() for caracteristica_id in scores}
+    traits = load_traits(set(razas.values()), caracteristica_ids)
+    missing = sorted(caracteristica_ids - set(traits))
+    if missing:
+        if len(missing) == 1:
+            raise ScoringError(f'Característica con ID {missing[0]} no encontrada.')
+        raise ScoringError(f'Características no encontradas: {", ".join(map(str, missing))}.')
+
+    evaluador = evaluador if evaluador is not None and evaluador.is_authenticated else None
+    calificaciones = [
+        Calificacion(
+            ejemplar_id=ejemplar_id, caracteristica_id=caracteristica_id,
+            puntuacion_obtenida=puntuacion_obtenida, fecha_calificacion=today, evaluador=evaluador,
+        )
+        for ejemplar_id, scores in merged.items() for caracteristica_id, puntuacion_obtenida in scores.items()
+    ]
+
+    with transaction.atomic():
+        Calificacion.objects.bulk_create(
+            calificaciones, update_conflicts=True,
+            unique_fields=['ejemplar', 'caracteristica', 'fecha_calificacion'],
+            update_fields=['puntuacion_obtenida', 'evaluador'],
+        )
+        # Las calificaciones de hoy ya incluyen las de esta petición
+        day_scores = {ejemplar_id: {} for ejemplar_id in merged}
+        for ejemplar_id, caracteristica_id, puntuacion_obtenida in Calificacion.objects.filter(
+                ejemplar_id__in=merged, fecha_calificacion=today,
+        ).values_list('ejemplar_id', 'caracteristica_id', 'puntuacion_obtenida'):
+            day_scores[ejemplar_id][caracteristica_id] = puntuacion_obtenida
+        unknown = {pk for scores in day_scores.values() for pk in scores} - set(traits)
+        if unknown:
+            traits.update(load_traits((), unknown))
+
+        ejemplares = []
+        history = []
+        results = {}
+        for ejemplar_id, scores in day_scores.items():
+            results[ejemplar_id] = compute_score(scores, traits)
+            ejemplares.append(Ejemplar(pk=ejemplar_id, score_total=results[ejemplar_id], last_score_date=today))
+            history.append(ScoreHistory(
+                ejemplar_id=ejemplar_id, fecha=today, score_total=results[ejemplar_id],
+                categorias={str(categoria_id): subtotal for categoria_id, subtotal in compute_breakdown(scores, traits).items()},
+            ))
+        Ejemplar.objects.bulk_update(ejemplares, ['score_total', 'last_score_date'])
+        ScoreHistory.objects.bulk_create(
+            history, update_conflicts=True, unique_fields=['ejemplar', 'fecha'], update_fields=['score_total', 'categorias'],
+        )
+        dashboard.apply_deltas(dashboard.score_deltas(
+            (raza_id, score, raza_id, results[pk]) for pk, (raza_id, score) in previous.items()
+        ))
+    return results
+
+
+def score_matrix(matrix, ideal, weight):
+    """
+    Scores (0-100) de una matriz ejemplares × características en una pasada.
+
+    ``matrix`` tiene NaN donde el ejemplar no fue calificado; ``ideal`` y
+    ``weight`` son el puntaje ideal y la ponderación de cada columna. Es la
+    versión vectorizada de ``compute_score``; una columna con ideal 0 no aporta.
+    """
+    present = ~np.isnan(matrix)
+    ratios = np.divide(np.where(present, matrix, 0.0), ideal, out=np.zeros_like(matrix), where=ideal != 0)
+    total = ratios @ weight
+    possible = present @ weight
+    return np.divide(total, possible, out=np.zeros_like(total), where=possible > 0) * 100
+
+
+def category_subtotals(matrix, ideal, weight, categories):
+    """
+    Aporte de cada categoría al score, vectorizado como ``score_matrix``.
+
+    ``categories`` es la categoría de cada columna. Devuelve (categoria_ids,
+    subtotales) con una columna de subtotales por categoría.
+    """
+    present = ~np.isnan(matrix)
+    ratios = np.divide(np.where(present, matrix, 0.0), ideal, out=np.zeros_like(matrix), where=ideal != 0)
+    categoria_ids, column_category = np.unique(categories, return_inverse=True)
+    # Matriz de pertenencia columna -> categoría, con la ponderación de la columna
+    membership = np.zeros((len(categories), len(categoria_ids)))
+    membership[np.arange(len(categories)), column_category] = weight
+    possible = present @ weight
+    subtotals = np.divide(ratios @ membership, possible[:, None], out=np.zeros((len(matrix), len(categoria_ids))),
+                          where=possible[:, None] > 0) * 100
+    return categoria_ids, subtotals
+
+
+def load_score_matrix(raza_ids=None, chunk_size=20000):
+    """
+    Calificaciones de la última sesión (``last_score_date``) de cada ejemplar como matriz densa.
+
+    Devuelve (ejemplar_ids, caracteristica_ids, matrix) con NaN en los pares
+    sin calificar ese día; las filas se leen en bloques con un cursor del
+    servidor. Los ejemplares sin ``last_score_date`` no aparecen.
+    """
+    calificaciones = Calificacion.objects.filter(fecha_calificacion=F('ejemplar__last_score_date'))
+    if raza_ids is not None:
+        calificaciones = calificaciones.filter(ejemplar__raza_id__in=raza_ids)
+    rows = (
+        calificaciones.order_by()
+        .values_list('ejemplar_id', 'caracteristica_id', 'puntuacion_obtenida')
+        .iterator(chunk_size=chunk_size)
+    )
+    data = np.fromiter(chain.from_iterable(rows), dtype=np.float64).reshape(-1, 3)
+    ejemplar_ids, animal_index = np.unique(data[:, 0].astype(np.int64), return_inverse=True)
+    caracteristica_ids, trait_index = np.unique(data[:, 1].astype(np.int64), return_inverse=True)
+
+    matrix = np.full((len(ejemplar_ids), len(caracteristica_ids)), np.nan)
+    matrix[animal_index, trait_index] = data[:, 2]
+    return ejemplar_ids, caracteristica_ids, matrix
+
+
+def history_rows(row_ejemplares, row_fechas, caracteristica_ids, matrix, traits):
+    """
+    Scores y filas de ScoreHistory de una matriz (ejemplar, fecha) × características.
+
+    ``row_fechas`` son ordinales de fecha y ``traits`` {caracteristica_id:
+    Trait}. Devuelve (scores, filas sin guardar).
+    """
+    columns = [traits[pk] for pk in caracteristica_ids.tolist()]
+    ideal = np.array([trait.puntaje_ideal for trait in columns], dtype=np.float64)
+    weight = np.array([trait.ponderacion for trait in columns], dtype=np.float64)
+    categories = np.array([trait.categoria_id for trait in columns], dtype=np.int64)
+
+    scores = score_matrix(matrix, ideal, weight)
+    categoria_ids, subtotals = category_subtotals(matrix, ideal, weight, categories)
+    keys = [str(categoria_id) for categoria_id in categoria_ids.tolist()]
+    present = (~np.isnan(matrix)) @ (categories[:, None] == categoria_ids[None, :])
+    history = [
+        ScoreHistory(
+            ejemplar_id=ejemplar_id, fecha=date.fromordinal(fecha), score_total=score,
+            # Solo las categorías calificadas ese día
+            categorias={key: subtotal for key, subtotal, scored in zip(keys, row_subtotals, row_present) if scored},
+        )
+        for ejemplar_id, fecha, score, row_subtotals, row_present in zip(
+            np.asarray(row_ejemplares).tolist(), np.asarray(row_fechas).tolist(), scores.tolist(),
+            subtotals.tolist(), present.tolist(),
+        )
+    ]
+    return scores, history
+
+
+def write_scores(ejemplar_ids, scores, batch_size=5000):
+    """ Escribe ``score_total`` en bloque (UPDATE ... FROM unnest en PostgreSQL). """
+    if connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(Ejemplar._meta.db_table)
+        with connection.cursor() as cursor:
+            for start in range(0, len(ejemplar_ids), batch_size):
+                cursor.execute(
+                    f'UPDATE {table} SET score_total = v.score FROM unnest(%s::bigint[], %s::float8[]) AS v(id, score) '
+                    f'WHERE {table}.id = v.id',
+                    [ejemplar_ids[start:start + batch_size].tolist(), scores[start:start + batch_size].tolist()],
+                )
+        return
+    Ejemplar.objects.bulk_update(
+        [Ejemplar(pk=pk, score_total=score) for pk, score in zip(ejemplar_ids.tolist(), scores.tolist())],
+        ['score_total'], batch_size=batch_size,
+    )
+
+
+def recompute_scores(raza_ids=None, dry_run=False):
+    """
+    Recalcula ``score_total`` de los ejemplares calificados de ``raza_ids`` (o de todo el rebaño).
+
+    Usa las calificaciones de ``last_score_date`` y las ponderaciones
+    vigentes, como ``save_session``, y reescribe la fila de ScoreHistory de
+    esa fecha. Devuelve (ejemplar_ids, scores) como arreglos de NumPy.
+    """
+    ejemplar_ids, caracteristica_ids, matrix = load_score_matrix(raza_ids)
+    if not len(ejemplar_ids):
+        return ejemplar_ids, np.zeros(0)
+
+    ejemplares = Ejemplar.objects.filter(last_score_date__isnull=False)
+    if raza_ids is None:
+        raza_ids = set(Ejemplar.objects.values_list('raza_id', flat=True).distinct())
+    else:
+        ejemplares = ejemplares.filter(raza_id__in=raza_ids)
+    traits = load_traits(raza_ids, caracteristica_ids.tolist())
+    fechas = dict(ejemplares.values_list('pk', 'last_score_date'))
+    scores, history = history_rows(
+        ejemplar_ids, [fechas[pk].toordinal() for pk in ejemplar_ids.tolist()], caracteristica_ids, matrix, traits,
+    )
+    if not dry_run:
+        with transaction.atomic():
+            write_scores(ejemplar_ids, scores)
+            ScoreHistory.objects.bulk_create(
+                history, batch_size=5000, update_conflicts=True,
+                unique_fields=['ejemplar', 'fecha'], update_fields=['score_total', 'categorias'],
+            )
+            dashboard.rebuild_scores(raza_ids)
+    return ejemplar_ids, scores
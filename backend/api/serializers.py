@@ -1,6 +1,27 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar, Calificacion, SensorData, Alert
+from django.urls import reverse
+from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar, Calificacion, SensorData, Alert, ReportJob
+from .fastpath import absolute_file_url
+
+class SparseFieldsMixin:
+    """ Permite pedir solo algunos campos con ?fields=a,b (solo en el serializer raíz de un GET). """
+    fields_query_param = 'fields'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+        # Los serializers anidados (p. ej. las características de una categoría) no se recortan
+        parent = self.parent
+        if parent is not None and (not isinstance(parent, serializers.ListSerializer) or parent.parent is not None):
+            return fields
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return fields
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        return {name: field for name, field in fields.items() if name in wanted} or fields
 
 class UserSerializer(serializers.ModelSerializer):
     password2 = serializers.CharField(write_only=True, required=True)
@@ -25,17 +46,17 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return user
 
-class RazaSerializer(serializers.ModelSerializer):
+class RazaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Raza
         fields = '__all__'
 
-class CaracteristicaSerializer(serializers.ModelSerializer):
+class CaracteristicaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Caracteristica
         fields = '__all__'
 
-class CategoriaPuntuacionSerializer(serializers.ModelSerializer):
+class CategoriaPuntuacionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     caracteristicas = CaracteristicaSerializer(many=True, read_only=True)
 
     class Meta:
@@ -46,23 +67,37 @@ class ScoreTemplateSerializer(serializers.Serializer):
     categories = CategoriaPuntuacionSerializer(many=True)
     characteristics = CaracteristicaSerializer(many=True)
 
-class EjemplarSerializer(serializers.ModelSerializer):
+class EjemplarSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     foto_url = serializers.SerializerMethodField()
+    # Versiones reducidas (None mientras se generan en segundo plano)
+    foto_thumb_url = serializers.SerializerMethodField()
+    foto_medium_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Ejemplar
-        fields = '__all__'
+        exclude = ('foto_thumb', 'foto_medium')
 
-    def get_foto_url(self, obj):
-        if obj.foto:
-            return self.context['request'].build_absolute_uri(obj.foto.url)
+    def _absolute_url(self, image):
+        if image:
+            return self.context['request'].build_absolute_uri(image.url)
         return None
 
-class CalificacionSerializer(serializers.ModelSerializer):
+    def get_foto_url(self, obj):
+        return self._absolute_url(obj.foto)
+
+    def get_foto_thumb_url(self, obj):
+        return self._absolute_url(obj.foto_thumb)
+
+    def get_foto_medium_url(self, obj):
+        return self._absolute_url(obj.foto_medium)
+
+class CalificacionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     score = serializers.FloatField(source='puntuacion_obtenida')
     animalName = serializers.CharField(source='ejemplar.nombre', read_only=True)
     animalIdentifier = serializers.CharField(source='ejemplar.identificador', read_only=True)
     animalPhotoUrl = serializers.SerializerMethodField()
+    # Equivalente de get_animalPhotoUrl para api.fastpath
+    fast_columns = {'animalPhotoUrl': absolute_file_url('ejemplar__foto')}
 
     class Meta:
         model = Calificacion
@@ -73,12 +108,23 @@ class CalificacionSerializer(serializers.ModelSerializer):
             return self.context['request'].build_absolute_uri(obj.ejemplar.foto.url)
         return None
 
-class SensorDataSerializer(serializers.ModelSerializer):
+class SensorDataSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SensorData
         fields = '__all__'
 
-class AlertSerializer(serializers.ModelSerializer):
+class HerdSnapshotSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """ Ejemplar con su última lectura (SensorLatest); null si nunca reportó. """
+    ejemplar = serializers.IntegerField(source='id', read_only=True)
+    timestamp = serializers.DateTimeField(source='sensor_latest.timestamp', read_only=True)
+    temperatura = serializers.FloatField(source='sensor_latest.temperatura', read_only=True)
+    actividad = serializers.FloatField(source='sensor_latest.actividad', read_only=True)
+
+    class Meta:
+        model = Ejemplar
+        fields = ('ejemplar', 'identificador', 'nombre', 'raza', 'timestamp', 'temperatura', 'actividad')
+
+class AlertSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Alert
         fields = '__all__'
@@ -90,20 +136,56 @@ class IndividualScoreSerializer(serializers.Serializer):
 class ScoreSubmissionSerializer(serializers.Serializer):
     scores = serializers.ListField(child=IndividualScoreSerializer())
 
+class AnimalScoresSerializer(ScoreSubmissionSerializer):
+    ejemplar_id = serializers.IntegerField()
+
+class SessionScoreSubmissionSerializer(serializers.Serializer):
+    animals = serializers.ListField(child=AnimalScoresSerializer(), allow_empty=False)
+
 class RecentScoreAnimalSerializer(serializers.ModelSerializer):
     animalName = serializers.CharField(source='nombre', read_only=True)
     animalIdentifier = serializers.CharField(source='identificador', read_only=True)
     score = serializers.FloatField(source='score_total', read_only=True)
     date = serializers.DateField(source='last_score_date', read_only=True)
     animalPhotoUrl = serializers.SerializerMethodField()
+    animalPhotoThumbUrl = serializers.SerializerMethodField()
+    fast_columns = {
+        'animalPhotoUrl': absolute_file_url('foto'),
+        'animalPhotoThumbUrl': absolute_file_url('foto_thumb'),
+    }
 
     class Meta:
         model = Ejemplar
-        fields = ('id', 'animalName', 'animalIdentifier', 'score', 'date', 'animalPhotoUrl')
+        fields = ('id', 'animalName', 'animalIdentifier', 'score', 'date', 'animalPhotoUrl', 'animalPhotoThumbUrl')
 
-    def get_animalPhotoUrl(self, obj):
-        if obj.foto:
+    def _absolute_url(self, image):
+        if image:
             request = self.context.get('request')
             if request is not None:
-                return request.build_absolute_uri(obj.foto.url)
-        return None
\ No newline at end of file
+                return request.build_absolute_uri(image.url)
+        return None
+
+    def get_animalPhotoUrl(self, obj):
+        return self._absolute_url(obj.foto)
+
+    def get_animalPhotoThumbUrl(self, obj):
+        return self._absolute_url(obj.foto_thumb)
+
+class ReportRequestSerializer(serializers.Serializer):
+    # kind, output y params se validan en api.reports.submit
+    kind = serializers.CharField()
+    output = serializers.CharField(default='pdf')
+    params = serializers.DictField(default=dict)
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    output = serializers.CharField(source='file_format', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ('id', 'kind', 'output', 'params', 'status', 'progress', 'cached', 'error', 'created_at', 'started_at', 'finished_at', 'download_url')
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.Status.DONE:
+            return None
+        return self.context['request'].build_absolute_uri(reverse('reportjob-download', args=[obj.pk]))
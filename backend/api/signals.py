@@ -0,0 +1,74 @@
+"""
+Señales de la app ``api``.
+
+Cualquier alta, cambio o baja en las plantillas de calificación invalida las
+plantillas compiladas de ``api.score_templates``. Los cambios individuales de
+ejemplares y alertas (API, admin) se reflejan en los indicadores de
+``api.dashboard``; las operaciones masivas aplican sus propios incrementos.
+Una foto nueva de un ejemplar encola sus versiones reducidas (``api.thumbnails``)
+y una alerta creada individualmente se publica en los eventos en vivo (``api.push``).
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar, Alert
+from .score_templates import bump_version
+from . import dashboard, push, thumbnails
+
+
+@receiver([post_save, post_delete], sender=Raza)
+@receiver([post_save, post_delete], sender=CategoriaPuntuacion)
+@receiver([post_save, post_delete], sender=Caracteristica)
+def invalidate_score_templates(sender, **kwargs):
+    bump_version()
+
+
+@receiver(pre_save, sender=Ejemplar)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    previous = None
+    if instance.pk is not None and not raw:
+        previous = Ejemplar.objects.filter(pk=instance.pk).values_list('raza_id', 'score_total', 'foto').first()
+    previous = previous or (None, None, None)
+    instance._dashboard_previous = previous[:2]
+    instance._previous_foto = previous[2] or None
+
+
+@receiver(post_save, sender=Ejemplar)
+def update_dashboard_scores(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_raza, old_score = getattr(instance, '_dashboard_previous', (None, None))
+    dashboard.apply_deltas(dashboard.score_deltas([(old_raza, old_score, instance.raza_id, instance.score_total)]))
+    # Nombre o foto pueden aparecer en los últimos calificados
+    dashboard.invalidate()
+
+
+@receiver(post_save, sender=Ejemplar)
+def enqueue_photo_derivatives(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    foto = instance.foto.name or None
+    if foto == getattr(instance, '_previous_foto', None):
+        return
+    # Las versiones de la foto anterior no deben mostrarse mientras se generan las nuevas
+    thumbnails.clear(instance)
+    if foto is not None:
+        thumbnails.enqueue(instance.pk)
+
+
+@receiver(post_delete, sender=Ejemplar)
+def remove_dashboard_scores(sender, instance, **kwargs):
+    dashboard.apply_deltas(dashboard.score_deltas([(instance.raza_id, instance.score_total, None, None)]))
+    dashboard.invalidate()
+
+
+@receiver(post_save, sender=Alert)
+def count_created_alert(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        dashboard.apply_deltas(dashboard.alert_deltas([instance]))
+        push.publish_alerts_on_commit([instance])
+
+
+@receiver(post_delete, sender=Alert)
+def uncount_deleted_alert(sender, instance, **kwargs):
+    dashboard.apply_deltas(dashboard.alert_deltas([instance], sign=-1))
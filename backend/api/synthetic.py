@@ -0,0 +1,238 @@
+"""
+Datos sintéticos a escala de producción para pruebas de rendimiento y de carga.
+
+Todo sale de un ``numpy.random.Generator`` con semilla: con la misma semilla
+y los mismos parámetros se obtienen el mismo hato, las mismas series y los
+mismos eventos. Las series de sensores se calculan por bloques de ejemplares
+como matrices (ejemplar × instante): temperatura con ritmo circadiano y
+actividad diurna, más episodios de fiebre (temperatura alta y actividad baja
+durante horas) y de celo (actividad dos a tres veces la habitual). Se
+escriben con ``COPY`` en PostgreSQL y con ``bulk_create`` en otras bases.
+
+La escritura masiva no emite señales: quien genera los datos debe regenerar
+después las tablas derivadas (última lectura, rollups, historial de scores,
+dashboard), como hace el comando ``generate_synthetic_data``.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from .analytics import load_readings, detect_anomalies, deduplicate, to_alerts
+from .alerts import save_alerts
+from .benchmarking import create_synthetic_template
+from .ingest import COPY_COLUMNS, copy_readings
+from .models import Calificacion, Ejemplar, Raza, SensorData
+
+Reading = namedtuple('Reading', COPY_COLUMNS)
+Event = namedtuple('Event', ('ejemplar_id', 'kind', 'start', 'end'))
+
+FIEBRE = 'fiebre'
+CELO = 'celo'
+# Duración en horas de cada tipo de episodio
+EVENT_HOURS = {FIEBRE: (6, 36), CELO: (8, 18)}
+# Fracción de lecturas que no llegan (ejemplar fuera del alcance de la antena)
+DROP_RATE = 0.005
+
+
+def identificador(prefix, breed, index):
+    return f'{prefix}-{breed:02d}-{index:06d}'
+
+
+def animals(prefix):
+    """ Ejemplares generados con ``prefix``. """
+    return Ejemplar.objects.filter(identificador__startswith=f'{prefix}-')
+
+
+def breeds(prefix):
+    """ Razas generadas con ``prefix``. """
+    return Raza.objects.filter(nombre__startswith=f'{prefix} RAZA ')
+
+
+def username(prefix):
+    """ Usuario evaluador de las sesiones sintéticas, que también usan las pruebas de carga. """
+    return f'{prefix.lower()}-evaluador'
+
+
+def exists(prefix):
+    return breeds(prefix).exists() or animals(prefix).exists() or User.objects.filter(username=username(prefix)).exists()
+
+
+def create_breeds(rng, count, prefix, categories=5, traits_per_category=5):
+    """ Crea ``count`` razas con su plantilla de calificación; devuelve [(raza, características)]. """
+    created = []
+    for index in range(count):
+        peso = round(float(rng.uniform(450, 650)))
+        raza = Raza.objects.create(
+            nombre=f'{prefix} RAZA {index + 1}', peso_ideal_min=peso - 50, peso_ideal_max=peso + 50,
+            talla_ideal=round(float(rng.uniform(130, 150))),
+        )
+        created.append((raza, create_synthetic_template(raza, categories, traits_per_category)))
+    return created
+
+
+def create_herd(rng, raza, breed, size, prefix, today=None):
+    """ Crea ``size`` ejemplares de ``raza`` con edad, peso y talla variados (bulk_create). """
+    today = today or date.today()
+    ages = rng.integers(365, 10 * 365, size).tolist()
+    pesos = rng.normal(((raza.peso_ideal_min or 500) + (raza.peso_ideal_max or 600)) / 2, 60, size).round(1).tolist()
+    tallas = rng.normal(raza.talla_ideal or 140, 6, size).round(1).tolist()
+    herd = [
+        Ejemplar(identificador=identificador(prefix, breed, index), nombre=f'{prefix} {breed}-{index}', raza=raza,
+                 fecha_nacimiento=today - timedelta(days=age), peso_actual=peso, talla_actual=talla)
+        for index, (age, peso, talla) in enumerate(zip(ages, pesos, tallas))
+    ]
+    return Ejemplar.objects.bulk_create(herd, batch_size=5000)
+
+
+def timeline(start, end, interval):
+    """ Instantes de ``start`` a ``end`` (excluido) cada ``interval``. """
+    steps = max(0, int((end - start) / interval))
+    return [start + interval * step for step in range(steps)]
+
+
+def _pulse(length):
+    """ Forma del episodio: sube, se mantiene y baja (valores entre 0 y 1). """
+    return np.minimum(1.0, 2.0 * np.sin(np.linspace(0, np.pi, length)))
+
+
+def sensor_series(rng, ejemplar_ids, timestamps, fever_rate=0.01, heat_rate=0.03):
+    """
+    Series de ``ejemplar_ids`` en ``timestamps`` como matrices ejemplar × instante.
+
+    ``fever_rate`` y ``heat_rate`` son episodios esperados por ejemplar y día.
+    Devuelve (temperatura, actividad, presentes, eventos); ``presentes``
+    marca las lecturas que sí llegaron.
+    """
+    count, steps = len(ejemplar_ids), len(timestamps)
+    seconds = np.array([timestamp.timestamp() for timestamp in timestamps], dtype=np.float64)
+    interval = seconds[1] - seconds[0] if steps > 1 else 3600.0
+    hours = (seconds % 86400) / 3600
+    # Máxima temperatura a media tarde y algo más de actividad en las horas de luz. El ruido de la
+    # actividad se acota a ±2σ para que las alertas por z-score salgan de los episodios inyectados
+    temperatura = (rng.normal(38.6, 0.1, (count, 1)) + 0.3 * np.sin(2 * np.pi * (hours - 10) / 24)
+                   + rng.normal(0, 0.08, (count, steps)))
+    actividad = (rng.lognormal(np.log(60), 0.25, (count, 1)) * (0.97 + 0.06 * np.exp(-((hours - 13) / 4) ** 2))
+                 * np.clip(rng.normal(1, 0.1, (count, steps)), 0.8, 1.2))
+
+    events = []
+    days = steps * interval / 86400
+    for kind, rate in ((FIEBRE, fever_rate), (CELO, heat_rate)):
+        low, high = EVENT_HOURS[kind]
+        for row in np.repeat(np.arange(count), rng.poisson(rate * days, count)):
+            start = int(rng.integers(0, steps))
+            end = min(steps, start + max(1, int(rng.uniform(low, high) * 3600 / interval)))
+            pulse = _pulse(end - start)
+            if kind == FIEBRE:
+                temperatura[row, start:end] += rng.uniform(1.2, 2.0) * pulse
+                actividad[row, start:end] *= 1 - 0.4 * pulse
+            else:
+                actividad[row, start:end] *= 1 + rng.uniform(1.0, 2.0) * pulse
+                temperatura[row, start:end] += 0.3 * pulse
+            events.append(Event(ejemplar_ids[row], kind, timestamps[start], timestamps[end - 1]))
+    present = rng.random((count, steps)) >= DROP_RATE
+    return temperatura.round(2), actividad.round(1), present, events
+
+
+def iter_readings(ejemplar_ids, timestamps, temperatura, actividad, present):
+    """ Genera ``Reading`` de las matrices de ``sensor_series``, ejemplar por ejemplar. """
+    for ejemplar_id, temperaturas, actividades, presentes in zip(ejemplar_ids, temperatura.tolist(), actividad.tolist(), present):
+        for column in np.flatnonzero(presentes).tolist():
+            yield Reading(ejemplar_id, timestamps[column], temperaturas[column], actividades[column])
+
+
+def write_readings(readings, batch_size=5000):
+    """ Escribe lecturas sin disparar el procesamiento de la ingesta (COPY en PostgreSQL). """
+    if connection.vendor == 'postgresql':
+        copy_readings(readings)
+    else:
+        SensorData.objects.bulk_create([SensorData(**reading._asdict()) for reading in readings], batch_size=batch_size)
+
+
+def generate_sensor_data(rng, ejemplar_ids, timestamps, fever_rate=0.01, heat_rate=0.03, chunk_animals=200):
+    """
+    Genera y guarda las series de ``ejemplar_ids``, un bloque de ejemplares por transacción.
+
+    Devuelve (lecturas escritas, eventos inyectados).
+    """
+    total = 0
+    events = []
+    for offset in range(0, len(ejemplar_ids), chunk_animals):
+        ids = ejemplar_ids[offset:offset + chunk_animals]
+        temperatura, actividad, present, chunk_events = sensor_series(rng, ids, timestamps, fever_rate, heat_rate)
+        readings = list(iter_readings(ids, timestamps, temperatura, actividad, present))
+        with transaction.atomic():
+            write_readings(readings)
+        total += len(readings)
+        events.extend(chunk_events)
+    return total, events
+
+
+def session_dates(start, end, sessions):
+    """ ``sessions`` fechas repartidas entre ``start`` y ``end``; la última es ``end``. """
+    if sessions <= 1:
+        return [end]
+    span = (end - start).days
+    return sorted({end - timedelta(days=round(span * (sessions - 1 - index) / (sessions - 1))) for index in range(sessions)})
+
+
+def score_sessions(rng, ejemplar_ids, traits, dates, evaluador=None, chunk_animals=1000):
+    """
+    Guarda una sesión de calificación por fecha de ``dates`` para ``ejemplar_ids``.
+
+    Cada ejemplar tiene una calidad propia y mejora levemente entre sesiones.
+    Devuelve la cantidad de calificaciones escritas.
+    """
+    today = date.today()
+    ideal = np.array([trait.puntaje_ideal for trait in traits], dtype=np.float64)
+    low = np.array([trait.rango_aceptado_min for trait in traits], dtype=np.float64)
+    high = np.array([trait.rango_aceptado_max for trait in traits], dtype=np.float64)
+    quality = rng.normal(0, 1, (len(ejemplar_ids), 1))
+    bias = rng.normal(0, 0.5, (1, len(traits)))
+    total = 0
+    for index, fecha in enumerate(sorted(dates)):
+        progress = index / max(1, len(dates) - 1)
+        noise = rng.normal(0, 0.06, (len(ejemplar_ids), len(traits)))
+        values = np.clip(ideal * (0.72 + 0.08 * quality + 0.04 * bias + 0.06 * progress + noise), low, high).round(1)
+        for offset in range(0, len(ejemplar_ids), chunk_animals):
+            ids = ejemplar_ids[offset:offset + chunk_animals]
+            with transaction.atomic():
+                Calificacion.objects.bulk_create([
+                    Calificacion(ejemplar_id=ejemplar_id, caracteristica=trait, puntuacion_obtenida=value, evaluador=evaluador)
+                    for ejemplar_id, row in zip(ids, values[offset:offset + chunk_animals].tolist())
+                    for trait, value in zip(traits, row)
+                ], batch_size=5000)
+                if fecha != today:
+                    # fecha_calificacion es auto_now_add: bulk_create la fija a hoy y se corrige después
+                    Calificacion.objects.filter(ejemplar_id__in=ids, fecha_calificacion=today).update(fecha_calificacion=fecha)
+            total += len(ids) * len(traits)
+    return total
+
+
+def detect_alerts(ejemplar_ids, start, end, warmup=timedelta(days=1), window=None, chunk_animals=5000):
+    """
+    Crea las alertas de las series guardadas con la detección por lotes y devuelve cuántas.
+
+    Solo se guardan las de ``start + warmup`` en adelante: antes, la línea
+    base de cada ejemplar tiene pocas lecturas y el z-score se dispara.
+    """
+    since = start + warmup
+    total = 0
+    for offset in range(0, len(ejemplar_ids), chunk_animals):
+        readings = load_readings(start, end, ejemplar_ids[offset:offset + chunk_animals])
+        candidates = deduplicate([c for c in detect_anomalies(readings, window=window) if c.timestamp >= since])
+        if candidates:
+            total += len(save_alerts(to_alerts(candidates)))
+    return total
+
+
+def delete(prefix):
+    """ Elimina los ejemplares, las razas y el evaluador generados con ``prefix``; devuelve cuántos ejemplares. """
+    with transaction.atomic():
+        # Las lecturas, calificaciones, alertas y rollups se borran en cascada
+        deleted = animals(prefix).delete()[1].get(Ejemplar._meta.label, 0)
+        breeds(prefix).delete()
+        User.objects.filter(username=username(prefix)).delete()
+    return deleted
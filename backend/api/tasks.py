@@ -0,0 +1,140 @@
+"""
+Cola de tareas en segundo plano local, sin broker externo.
+
+Cada cola con nombre es un ``ThreadPoolExecutor`` propio cuyo número de hilos
+se configura en ``TASK_QUEUES``. Una cola con un único hilo procesa sus tareas
+en orden de llegada. Con ``TASKS_ALWAYS_EAGER`` las tareas se ejecutan en el
+hilo que las encola (útil en pruebas y scripts).
+
+El trabajo de CPU (p. ej. dibujar reportes) se envía con ``submit_process`` a
+un ``ProcessPoolExecutor`` de ``TASK_PROCESS_WORKERS`` procesos, lanzados con
+``spawn``: no heredan conexiones a la base ni hilos del proceso principal, así
+que las funciones que reciben deben trabajar solo con sus argumentos.
+"""
+import itertools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_lock = threading.Lock()
+_process_pool = None
+_progress_queue = None
+_progress_callbacks = {}
+_tokens = itertools.count(1)
+
+
+def _get_executor(queue):
+    with _lock:
+        executor = _executors.get(queue)
+        if executor is None:
+            workers = getattr(settings, 'TASK_QUEUES', {}).get(queue, 1)
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'tasks-{queue}')
+            _executors[queue] = executor
+        return executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('La tarea %s falló', getattr(func, '__name__', func))
+        raise
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args, queue='default', **kwargs):
+    """ Encola ``func(*args, **kwargs)`` en ``queue`` y devuelve un Future. """
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    return _get_executor(queue).submit(_run, func, args, kwargs)
+
+
+def _init_process(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _run_in_process(token, func, args, kwargs):
+    if token is not None:
+        kwargs['progress'] = lambda fraction: _progress_queue.put((token, fraction))
+    return func(*args, **kwargs)
+
+
+def _dispatch_progress(queue):
+    """ Hilo del proceso principal que entrega el progreso informado por los procesos. """
+    while True:
+        token, fraction = queue.get()
+        callback = _progress_callbacks.get(token)
+        if callback is not None:
+            try:
+                callback(fraction)
+            except Exception:
+                logger.exception('Falló el aviso de progreso de una tarea')
+
+
+def _get_process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            context = multiprocessing.get_context('spawn')
+            queue = context.SimpleQueue()
+            threading.Thread(target=_dispatch_progress, args=(queue,), name='tasks-progress', daemon=True).start()
+            _process_pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'TASK_PROCESS_WORKERS', 2), mp_context=context,
+                initializer=_init_process, initargs=(queue,),
+            )
+        return _process_pool
+
+
+def submit_process(func, *args, progress=None, **kwargs):
+    """
+    Ejecuta ``func(*args, **kwargs)`` en el pool de procesos y devuelve un Future.
+
+    ``func`` y sus argumentos deben poder serializarse con pickle. Con
+    ``progress``, ``func`` recibe un argumento ``progress(fraction)`` cuyas
+    llamadas se reenvían a ``progress`` en un hilo del proceso principal.
+    """
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs, **({'progress': progress} if progress else {})))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    pool = _get_process_pool()
+    token = None
+    if progress is not None:
+        token = next(_tokens)
+        _progress_callbacks[token] = progress
+    future = pool.submit(_run_in_process, token, func, args, kwargs)
+    if token is not None:
+        # Los avisos que lleguen después de terminar se descartan
+        future.add_done_callback(lambda _: _progress_callbacks.pop(token, None))
+    return future
+
+
+def shutdown(wait=True):
+    """ Detiene todas las colas y el pool de procesos, esperando opcionalmente las tareas pendientes. """
+    global _process_pool
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+        if _process_pool is not None:
+            executors.append(_process_pool)
+            _process_pool = None
+    for executor in executors:
+        executor.shutdown(wait=wait)
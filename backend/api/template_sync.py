@@ -0,0 +1,287 @@
+"""
+Sincronización de las plantillas de calificación desde archivos JSON o YAML.
+
+En lugar de borrar y recrear las plantillas, lo que arrastraría en cascada
+todas las Calificacion históricas, se compara la plantilla deseada con la
+base y solo se escriben las diferencias: las filas nuevas con
+``bulk_create`` y las modificadas con ``bulk_update``, padres antes que
+hijos. Las filas se emparejan por nombre: la raza por ``nombre``, la
+categoría por (raza, nombre) y la característica por (categoría, nombre).
+Sincronizar de nuevo un archivo ya aplicado son tres SELECT y ninguna
+escritura.
+
+Lo que ya no figura en el archivo se conserva salvo con ``prune``, y aun así
+solo se borran las características sin calificaciones y las categorías que
+quedan vacías: el historial de scores nunca se pierde. Las razas que el
+archivo no menciona no se tocan.
+
+Formato (``data/score_templates.json`` es el archivo incluido)::
+
+    {"version": 1, "razas": {"HOLSTEIN": {"Grupa": {"ponderacion": 5, "caracteristicas": [
+        {"nombre": "Ancho de la grupa", "puntaje_ideal": 9, "rango_aceptado_min": 7, "rango_aceptado_max": 9}]}}}}
+"""
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.db import transaction
+
+from .models import Raza, CategoriaPuntuacion, Caracteristica, Calificacion
+from .score_templates import bump_version
+
+DEFAULT_FILE = Path(__file__).resolve().parent / 'data' / 'score_templates.json'
+TRAIT_FIELDS = ('puntaje_ideal', 'rango_aceptado_min', 'rango_aceptado_max')
+
+
+class TemplateSyncError(Exception):
+    """ El archivo de plantillas no se puede leer o no es válido; ``status`` es el código HTTP sugerido. """
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def _number(value, integer=False):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError
+    if integer:
+        if value != int(value):
+            raise ValueError
+        return int(value)
+    return float(value)
+
+
+def normalize(data, source='plantillas'):
+    """
+    Valida el contenido de un archivo y devuelve (versión, plantillas).
+
+    Las plantillas quedan como {raza: {categoría: {'ponderacion': int,
+    'caracteristicas': {nombre: {campo: valor}}}}}. Todos los errores se
+    informan juntos en un TemplateSyncError.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('razas'), dict):
+        raise TemplateSyncError(f'{source}: se esperaba un objeto con la clave "razas".')
+    max_length = Raza._meta.get_field('nombre').max_length
+    errors = []
+    templates = {}
+    for raza, categorias in data['razas'].items():
+        raza = str(raza).strip()
+        if not raza or len(raza) > max_length:
+            errors.append(f'Raza "{raza}": el nombre debe tener entre 1 y {max_length} caracteres.')
+            continue
+        if not isinstance(categorias, dict) or not categorias:
+            errors.append(f'{raza}: se esperaba un objeto con al menos una categoría.')
+            continue
+        template = templates[raza] = {}
+        for categoria, spec in categorias.items():
+            categoria = str(categoria).strip()
+            where = f'{raza} / {categoria}'
+            if not categoria or len(categoria) > max_length:
+                errors.append(f'{where}: el nombre debe tener entre 1 y {max_length} caracteres.')
+                continue
+            if not isinstance(spec, dict) or not isinstance(spec.get('caracteristicas'), list):
+                errors.append(f'{where}: se esperaba un objeto con "ponderacion" y la lista "caracteristicas".')
+                continue
+            try:
+                ponderacion = _number(spec.get('ponderacion'), integer=True)
+                if not 0 <= ponderacion <= 100:
+                    raise ValueError
+            except ValueError:
+                errors.append(f'{where}: "ponderacion" debe ser un entero entre 0 y 100.')
+                continue
+            traits = {}
+            for trait in spec['caracteristicas']:
+                nombre = str(trait.get('nombre', '')).strip() if isinstance(trait, dict) else ''
+                if not nombre or len(nombre) > max_length:
+                    errors.append(f'{where}: cada característica necesita un "nombre" de hasta {max_length} caracteres.')
+                    continue
+                if nombre in traits:
+                    errors.append(f'{where} / {nombre}: característica repetida.')
+                    continue
+                try:
+                    values = {field: _number(trait.get(field), integer=field == 'puntaje_ideal') for field in TRAIT_FIELDS}
+                except ValueError:
+                    errors.append(f'{where} / {nombre}: puntaje_ideal debe ser entero y los rangos numéricos.')
+                    continue
+                if values['rango_aceptado_min'] > values['rango_aceptado_max']:
+                    errors.append(f'{where} / {nombre}: rango_aceptado_min es mayor que rango_aceptado_max.')
+                    continue
+                traits[nombre] = values
+            template[categoria] = {'ponderacion': ponderacion, 'caracteristicas': traits}
+        total = sum(categoria['ponderacion'] for categoria in template.values())
+        if template and total != 100:
+            errors.append(f'{raza}: las ponderaciones suman {total} en lugar de 100.')
+    if errors:
+        raise TemplateSyncError(f'{source}:\n' + '\n'.join(errors))
+    return data.get('version'), templates
+
+
+def load(path):
+    """ Lee un archivo de plantillas (.json, .yaml o .yml) y devuelve (versión, plantillas). """
+    path = Path(path)
+    try:
+        with open(path, 'rb') as fileobj:
+            if path.suffix.lower() in ('.yaml', '.yml'):
+                try:
+                    import yaml
+                except ImportError:
+                    raise TemplateSyncError('Leer plantillas YAML requiere PyYAML (pip install pyyaml).', status=501)
+                try:
+                    data = yaml.safe_load(fileobj)
+                except yaml.YAMLError as exc:
+                    raise TemplateSyncError(f'{path}: YAML inválido: {exc}')
+            else:
+                try:
+                    data = json.load(fileobj)
+                except ValueError as exc:
+                    raise TemplateSyncError(f'{path}: JSON inválido: {exc}')
+    except OSError as exc:
+        raise TemplateSyncError(f'{path}: {exc.strerror}.')
+    return normalize(data, source=str(path))
+
+
+class SyncResult:
+    """ Filas creadas, actualizadas y borradas por tipo ('razas', 'categorias', 'caracteristicas'). """
+
+    def __init__(self, dry_run=False):
+        self.created = Counter()
+        self.updated = Counter()
+        self.deleted = Counter()
+        # Filas de las razas sincronizadas que no figuran en el archivo
+        self.stale = Counter()
+        # Características fuera del archivo que se conservan porque tienen calificaciones
+        self.kept = []
+        # Razas cuyos scores dependen de ponderaciones o puntajes ideales modificados
+        self.raza_ids = set()
+        self.dry_run = dry_run
+
+    @property
+    def changed(self):
+        return any((+self.created, +self.updated, +self.deleted))
+
+    def as_dict(self):
+        return {
+            'created': dict(self.created), 'updated': dict(self.updated), 'deleted': dict(self.deleted),
+            'stale': dict(self.stale), 'kept': self.kept, 'raza_ids': sorted(self.raza_ids), 'dry_run': self.dry_run,
+        }
+
+
+def _index(rows, parent):
+    """ {padre: {nombre: fila}} con la fila de menor pk por nombre, y las filas repetidas aparte. """
+    index = defaultdict(dict)
+    duplicates = []
+    for row in rows:
+        names = index[getattr(row, parent)]
+        if row.nombre in names:
+            duplicates.append(row)
+        else:
+            names[row.nombre] = row
+    return index, duplicates
+
+
+def sync(templates, prune=False, dry_run=False):
+    """
+    Lleva a la base las plantillas de ``templates`` (ver ``normalize``) y devuelve un SyncResult.
+
+    Todo ocurre en una transacción. Las razas existentes se bloquean en orden
+    de nombre, de modo que dos sincronizaciones simultáneas se serializan sin
+    interbloquearse; si ambas crean la misma raza, la restricción única de
+    ``Raza.nombre`` hace fallar a la segunda sin escribir nada.
+    """
+    result = SyncResult(dry_run)
+    with transaction.atomic():
+        razas = {raza.nombre: raza for raza in Raza.objects.select_for_update().filter(nombre__in=templates).order_by('nombre')}
+        rows = list(CategoriaPuntuacion.objects.filter(raza_id__in=[raza.pk for raza in razas.values()]).order_by('pk'))
+        names = {raza.pk: nombre for nombre, raza in razas.items()}
+        labels = {categoria.pk: f'{names[categoria.raza_id]} / {categoria.nombre}' for categoria in rows}
+        categorias, stale_categorias = _index(rows, 'raza_id')
+        caracteristicas, stale_traits = _index(
+            Caracteristica.objects.filter(categoria_id__in=labels).order_by('pk'), 'categoria_id')
+
+        new_razas = [Raza(nombre=nombre) for nombre in templates if nombre not in razas]
+        result.created['razas'] = len(new_razas)
+        if new_razas and not dry_run:
+            Raza.objects.bulk_create(new_razas)
+        razas.update((raza.nombre, raza) for raza in new_razas)
+
+        # Categorías: nuevas y con ponderación distinta
+        wanted = []
+        new_categorias, changed_categorias = [], []
+        for nombre_raza, template in templates.items():
+            raza = razas[nombre_raza]
+            current = categorias.pop(raza.pk, {})
+            for nombre, spec in template.items():
+                categoria = current.pop(nombre, None)
+                if categoria is None:
+                    categoria = CategoriaPuntuacion(raza=raza, nombre=nombre, ponderacion=spec['ponderacion'])
+                    new_categorias.append(categoria)
+                elif categoria.ponderacion != spec['ponderacion']:
+                    categoria.ponderacion = spec['ponderacion']
+                    changed_categorias.append(categoria)
+                    result.raza_ids.add(raza.pk)
+                wanted.append((categoria, spec['caracteristicas']))
+            stale_categorias.extend(current.values())
+        result.created['categorias'] = len(new_categorias)
+        result.updated['categorias'] = len(changed_categorias)
+        if not dry_run:
+            CategoriaPuntuacion.objects.bulk_create(new_categorias)
+            CategoriaPuntuacion.objects.bulk_update(changed_categorias, ['ponderacion'])
+
+        # Características: nuevas y con algún campo distinto
+        new_traits, changed_traits = [], []
+        for categoria, traits in wanted:
+            current = caracteristicas.pop(categoria.pk, {})
+            for nombre, values in traits.items():
+                trait = current.pop(nombre, None)
+                if trait is None:
+                    new_traits.append(Caracteristica(categoria=categoria, nombre=nombre, **values))
+                elif any(getattr(trait, field) != value for field, value in values.items()):
+                    if trait.puntaje_ideal != values['puntaje_ideal']:
+                        result.raza_ids.add(categoria.raza_id)
+                    for field, value in values.items():
+                        setattr(trait, field, value)
+                    changed_traits.append(trait)
+            stale_traits.extend(current.values())
+        # Las características de categorías que ya no figuran en el archivo
+        stale_traits.extend(trait for traits in caracteristicas.values() for trait in traits.values())
+        result.created['caracteristicas'] = len(new_traits)
+        result.updated['caracteristicas'] = len(changed_traits)
+        if not dry_run:
+            Caracteristica.objects.bulk_create(new_traits)
+            Caracteristica.objects.bulk_update(changed_traits, list(TRAIT_FIELDS))
+
+        result.stale.update(categorias=len(stale_categorias), caracteristicas=len(stale_traits))
+        if prune and (stale_traits or stale_categorias):
+            _prune(stale_traits, stale_categorias, labels, result)
+
+        if result.changed and not dry_run:
+            # bulk_create y bulk_update no emiten señales: se invalida la caché de plantillas una vez
+            bump_version()
+    return result
+
+
+def _prune(stale_traits, stale_categorias, labels, result):
+    """ Borra las características sobrantes sin calificaciones y las categorías sobrantes que quedan vacías. """
+    scored = set(Calificacion.objects.filter(caracteristica__in=stale_traits)
+                 .values_list('caracteristica_id', flat=True).distinct())
+    deleted = [trait.pk for trait in stale_traits if trait.pk not in scored]
+    result.kept = sorted(f'{labels[trait.categoria_id]} / {trait.nombre}' for trait in stale_traits if trait.pk in scored)
+    # Todas las características de una categoría sobrante son sobrantes: queda vacía si no conserva ninguna
+    kept_categorias = {trait.categoria_id for trait in stale_traits if trait.pk in scored}
+    empty = [categoria.pk for categoria in stale_categorias if categoria.pk not in kept_categorias]
+    result.deleted['caracteristicas'] = len(deleted)
+    result.deleted['categorias'] = len(empty)
+    if result.dry_run:
+        return
+    # Hijos antes que padres: ninguna calificación se borra en cascada
+    Caracteristica.objects.filter(pk__in=deleted).delete()
+    CategoriaPuntuacion.objects.filter(pk__in=empty).delete()
+
+
+def merge(loaded):
+    """ Une varias plantillas cargadas; cada raza se toma del último archivo que la define. """
+    templates = {}
+    for _, template in loaded:
+        templates.update(template)
+    return templates
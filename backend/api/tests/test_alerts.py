@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.alerts import AlertEngine, FiebreRule, Reading, save_alerts
+from api.benchmarking import create_synthetic_herd
+from api.models import Alert, Raza
+
+
+class AlertDeduplicationTests(TestCase):
+    """ Las alertas repetidas se descartan al guardar, no solo en el estado de cada motor. """
+
+    def setUp(self):
+        self.ejemplar = create_synthetic_herd(1, prefix='ALERTS', raza=Raza.objects.create(nombre='ALERTS RAZA'))[0]
+        self.now = timezone.now()
+
+    def fever(self, minutes):
+        return Reading(self.ejemplar.pk, self.now + timedelta(minutes=minutes), 40.5, None)
+
+    def test_two_engines_do_not_duplicate_an_alert(self):
+        # Dos workers con su propio motor ven fiebre en el mismo ejemplar antes de que el otro guarde
+        first, second = AlertEngine([FiebreRule()]), AlertEngine([FiebreRule()])
+        first_alerts, second_alerts = first.evaluate([self.fever(0)]), second.evaluate([self.fever(5)])
+        self.assertEqual((len(first_alerts), len(second_alerts)), (1, 1))
+        self.assertEqual(len(save_alerts(first_alerts)), 1)
+        self.assertEqual(save_alerts(second_alerts), [])
+        self.assertEqual(Alert.objects.filter(ejemplar=self.ejemplar).count(), 1)
+
+    def test_alerts_outside_the_window_are_kept(self):
+        save_alerts(AlertEngine([FiebreRule()]).evaluate([self.fever(0)]))
+        later = AlertEngine([FiebreRule()]).evaluate([self.fever(13 * 60)])
+        self.assertEqual(len(save_alerts(later)), 1)
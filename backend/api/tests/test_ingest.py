@@ -0,0 +1,33 @@
+import json
+
+from django.test import TestCase
+
+from api.benchmarking import create_synthetic_herd
+from api.ingest import IngestResult, build_readings
+from api.models import Raza
+
+
+class BuildReadingsTests(TestCase):
+    """ Validación por fila de las lecturas de la ingesta. """
+
+    def setUp(self):
+        self.ejemplar = create_synthetic_herd(1, prefix='INGEST', raza=Raza.objects.create(nombre='INGEST RAZA'))[0]
+
+    def test_rejects_non_finite_values(self):
+        # json.loads acepta NaN e Infinity y convierte 1e999 en inf
+        records = json.loads(
+            '[{"identificador": "%(id)s", "temperatura": 38.5, "actividad": 60},'
+            ' {"identificador": "%(id)s", "temperatura": NaN},'
+            ' {"identificador": "%(id)s", "actividad": Infinity},'
+            ' {"identificador": "%(id)s", "temperatura": 1e999},'
+            ' {"identificador": "%(id)s", "temperatura": "nan"},'
+            ' {"identificador": "%(id)s", "actividad": "-inf"},'
+            ' {"identificador": "%(id)s", "temperatura": 1%(zeros)s}]'
+            % {'id': self.ejemplar.identificador, 'zeros': '0' * 400}
+        )
+        result = IngestResult()
+        readings = build_readings(records, result)
+        self.assertEqual(len(readings), 1)
+        self.assertEqual([reject['row'] for reject in result.rejected], [1, 2, 3, 4, 5, 6])
+        for reject in result.rejected:
+            self.assertEqual(list(reject['errors'].values()), [['Se esperaba un número.']])
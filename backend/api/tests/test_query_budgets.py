@@ -0,0 +1,44 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from api.benchmarking import rolled_back
+from api.management.commands.check_query_budgets import CHECKS, SKIPPED, Command, World, route_names
+from api.models import Calificacion
+from api.querybudget import QueryBudgetMixin, count_queries
+
+
+# Cada escenario crea su usuario: con el hasher por defecto la prueba tarda casi un minuto. Los
+# escenarios piden a "localhost", que el runner de pruebas no admite sin DEBUG
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], ALLOWED_HOSTS=['localhost'])
+class RouteQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """ Ninguna ruta de api.urls hace más consultas cuando devuelve más filas (ver check_query_budgets). """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # El reporte de World se escribe en MEDIA_ROOT: un directorio temporal no deja archivos en el proyecto
+        media_root = tempfile.mkdtemp(prefix='query-budget-')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_every_route_has_a_check(self):
+        self.assertEqual(route_names() - CHECKS.keys() - SKIPPED.keys(), set())
+
+    def test_routes_do_not_grow_with_result_size(self):
+        command = Command()
+        for name, checks in sorted(CHECKS.items()):
+            for index, check in enumerate(checks):
+                with self.subTest(route=name, scenario=index):
+                    self.assertConstantQueries(command._run(check), sizes=(3, 15))
+
+    def test_constant_queries_detects_n_plus_one(self):
+        def run(size):
+            with rolled_back():
+                World(size)
+                # Calificacion.__str__ lee la característica: sin select_related es una consulta por fila
+                return count_queries(lambda: [str(calificacion) for calificacion in Calificacion.objects.all()])[0]
+
+        with self.assertRaises(self.failureException):
+            self.assertConstantQueries(run)
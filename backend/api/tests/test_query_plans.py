@@ -0,0 +1,20 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from api.management.commands.check_query_plans import hot_queries, used_indexes
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Los planes de consulta se comprueban en PostgreSQL.')
+class HotQueryPlanTests(TestCase):
+    """ Las consultas críticas de la API usan su índice (ver check_query_plans). """
+
+    def test_hot_queries_use_their_index(self):
+        with connection.cursor() as cursor:
+            # Con tablas vacías el planner prefiere un seq scan: se comprueba que el índice es utilizable
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for description, queryset, expected in hot_queries(ejemplar_id=1):
+                with self.subTest(description):
+                    _, used, ok = used_indexes(cursor, queryset, expected)
+                    self.assertTrue(ok, f'se esperaba {expected}, se usó {sorted(used) or "ningún índice"}')
@@ -0,0 +1,49 @@
+import random
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.benchmarking import create_synthetic_herd, create_synthetic_template
+from api.models import Calificacion, CategoriaPuntuacion, Ejemplar, Raza, ScoreHistory
+from api.score_templates import bump_version
+from api.scoring import recompute_scores, save_session
+
+
+class RecomputeScoresTests(TestCase):
+    """ ``recompute_scores`` califica con la última sesión, como ``save_session`` y ScoreHistory. """
+
+    def setUp(self):
+        cache.clear()
+        rng = random.Random(42)
+        self.raza = Raza.objects.create(nombre='RECOMPUTE RAZA')
+        self.traits = create_synthetic_template(self.raza, categories=2, traits_per_category=2)
+        self.herd = create_synthetic_herd(3, prefix='RECOMPUTE', raza=self.raza)
+        # Una sesión completa ayer y hoy una característica por categoría
+        yesterday = date.today() - timedelta(days=1)
+        save_session([self.entry(ejemplar, self.traits, rng) for ejemplar in self.herd])
+        Calificacion.objects.filter(ejemplar__in=self.herd).update(fecha_calificacion=yesterday)
+        ScoreHistory.objects.filter(ejemplar__in=self.herd).update(fecha=yesterday)
+        self.scores = save_session([self.entry(ejemplar, self.traits[::2], rng) for ejemplar in self.herd])
+
+    def entry(self, ejemplar, traits, rng):
+        return {'ejemplar_id': ejemplar.pk,
+                'scores': [{'caracteristica_id': trait.pk, 'puntuacion_obtenida': rng.uniform(5, 10)} for trait in traits]}
+
+    def assertMatchesHistory(self):
+        for ejemplar in Ejemplar.objects.filter(pk__in=[e.pk for e in self.herd]):
+            history = ScoreHistory.objects.get(ejemplar=ejemplar, fecha=ejemplar.last_score_date)
+            self.assertAlmostEqual(ejemplar.score_total, history.score_total)
+
+    def test_recompute_keeps_the_session_scores(self):
+        ejemplar_ids, scores = recompute_scores([self.raza.pk])
+        for pk, score in zip(ejemplar_ids.tolist(), scores.tolist()):
+            self.assertAlmostEqual(score, self.scores[pk])
+        self.assertMatchesHistory()
+
+    def test_recompute_refreshes_the_last_history_row(self):
+        CategoriaPuntuacion.objects.filter(pk=self.traits[0].categoria_id).update(ponderacion=90)
+        bump_version()
+        _, scores = recompute_scores([self.raza.pk])
+        self.assertNotAlmostEqual(scores[0], self.scores[self.herd[0].pk])
+        self.assertMatchesHistory()
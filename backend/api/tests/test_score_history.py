@@ -0,0 +1,43 @@
+import random
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.benchmarking import create_synthetic_herd, create_synthetic_template
+from api.models import Raza
+from api.score_history import DEFAULT_PERCENTILES, parse_levels
+from api.scoring import save_session
+
+
+class ScorePercentilesTests(TestCase):
+    """ Percentiles del rebaño con los niveles por defecto y con niveles pedidos. """
+
+    def setUp(self):
+        cache.clear()
+        rng = random.Random(42)
+        raza = Raza.objects.create(nombre='PERCENTILES RAZA')
+        traits = create_synthetic_template(raza, categories=2, traits_per_category=2)
+        save_session([
+            {'ejemplar_id': ejemplar.pk,
+             'scores': [{'caracteristica_id': trait.pk, 'puntuacion_obtenida': rng.uniform(5, 10)} for trait in traits]}
+            for ejemplar in create_synthetic_herd(5, prefix='PERCENTILES', raza=raza)
+        ])
+
+    def test_default_levels(self):
+        self.assertEqual(parse_levels(), list(DEFAULT_PERCENTILES))
+        response = APIClient().get('/api/score-history/percentiles/')
+        self.assertEqual(response.status_code, 200)
+        [day] = response.json()['dates']
+        self.assertEqual(day['count'], 5)
+        self.assertEqual([key for key in day if key.startswith('p')], [f'p{level}' for level in DEFAULT_PERCENTILES])
+
+    def test_requested_levels(self):
+        [day] = APIClient().get('/api/score-history/percentiles/', {'percentiles': '5,50.5'}).json()['dates']
+        self.assertLessEqual(day['p5'], day['p50.5'])
+
+    def test_invalid_levels(self):
+        for value in ('', 'nan', 'inf', '-1', '101', 'a'):
+            with self.subTest(percentiles=value):
+                response = APIClient().get('/api/score-history/percentiles/', {'percentiles': value})
+                self.assertEqual(response.status_code, 400)
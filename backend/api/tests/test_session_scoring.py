@@ -0,0 +1,48 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.benchmarking import create_synthetic_herd, create_synthetic_template
+from api.models import Calificacion, Ejemplar, Raza, ScoreHistory
+from api.querybudget import QueryBudgetMixin, count_queries
+from api.scoring import save_session
+
+
+class SessionScoringTests(QueryBudgetMixin, TestCase):
+    """ Una sesión de calificación hace las mismas consultas con 2 o 10 ejemplares. """
+
+    def setUp(self):
+        # Las plantillas cacheadas por otra prueba cambiarían la cantidad de consultas
+        cache.clear()
+        self.rng = random.Random(42)
+        self.evaluador = User.objects.create_user('session-scoring')
+        self.raza = Raza.objects.create(nombre='SESSION-SCORING RAZA')
+        self.traits = create_synthetic_template(self.raza, categories=2, traits_per_category=2)
+        self.herd = create_synthetic_herd(10, prefix='SESSION-SCORING', raza=self.raza)
+
+    def entries(self, size):
+        return [
+            {'ejemplar_id': ejemplar.pk,
+             'scores': [{'caracteristica_id': trait.pk, 'puntuacion_obtenida': self.rng.uniform(5, 10)} for trait in self.traits]}
+            for ejemplar in self.herd[:size]
+        ]
+
+    def test_query_count_does_not_grow_with_session_size(self):
+        # La primera sesión carga la plantilla en la caché; las medidas son con la caché llena
+        save_session(self.entries(1), self.evaluador)
+        self.assertConstantQueries(lambda size: count_queries(save_session, self.entries(size), self.evaluador)[0])
+
+    def test_session_stays_within_budget(self):
+        # Plantilla sin caché (4), ejemplares, upsert, relectura del día, score_total, historial,
+        # dashboard y los savepoints de la transacción
+        with self.assertQueryBudget(12):
+            save_session(self.entries(10), self.evaluador)
+
+    def test_rescoring_the_same_day_updates_scores(self):
+        save_session(self.entries(10), self.evaluador)
+        save_session(self.entries(10), self.evaluador)
+        self.assertEqual(Calificacion.objects.filter(ejemplar__in=self.herd).count(), 10 * len(self.traits))
+        self.assertFalse(Ejemplar.objects.filter(pk__in=[e.pk for e in self.herd], score_total__isnull=True).exists())
+        self.assertEqual(ScoreHistory.objects.filter(ejemplar__in=self.herd).count(), 10)
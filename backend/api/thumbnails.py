@@ -0,0 +1,87 @@
+"""
+Versiones reducidas de las fotos de los ejemplares.
+
+Al subir o cambiar ``Ejemplar.foto`` se encola (cola ``images`` de
+``api.tasks``) la generación de una miniatura y un tamaño medio. La foto se
+decodifica una sola vez: en JPEG ``Image.draft`` hace que libjpeg la lea ya
+reducida, y la miniatura se obtiene del tamaño medio. Los archivos se nombran
+con el hash de su contenido, de modo que una URL nunca cambia de contenido y
+se puede servir con caché de larga duración (ver ``DERIVED_CACHE_CONTROL``).
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import Ejemplar
+from . import dashboard, tasks
+
+DERIVED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def sizes():
+    """ {campo: lado mayor en píxeles} de las versiones reducidas. """
+    return {
+        'foto_medium': getattr(settings, 'PHOTO_MEDIUM_SIZE', 640),
+        'foto_thumb': getattr(settings, 'PHOTO_THUMB_SIZE', 160),
+    }
+
+
+def render_sizes(source, targets):
+    """ JPEG de ``source`` (archivo o ruta) para cada {nombre: lado mayor} de ``targets``. """
+    quality = getattr(settings, 'PHOTO_JPEG_QUALITY', 85)
+    rendered = {}
+    with Image.open(source) as original:
+        largest = max(targets.values())
+        # JPEG: decodifica directamente a la menor escala (1/2, 1/4, 1/8) que cubre el tamaño mayor
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    # De mayor a menor, cada tamaño se reduce a partir del anterior
+    for name, edge in sorted(targets.items(), key=lambda item: -item[1]):
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+        rendered[name] = buffer.getvalue()
+    return rendered
+
+
+def _store(field, content, suffix):
+    """ Guarda ``content`` con nombre derivado de su hash; si ya existe se reutiliza. """
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    name = field.generate_filename(None, f'{digest}-{suffix}.jpg')
+    if not field.storage.exists(name):
+        name = field.storage.save(name, ContentFile(content))
+    return name
+
+
+def generate_derivatives(ejemplar_id):
+    """ Genera y asigna las versiones reducidas de la foto actual del ejemplar. """
+    foto = Ejemplar.objects.filter(pk=ejemplar_id).values_list('foto', flat=True).first()
+    if not foto:
+        return None
+    storage = Ejemplar._meta.get_field('foto').storage
+    with storage.open(foto, 'rb') as source:
+        rendered = render_sizes(source, sizes())
+    names = {
+        name: _store(Ejemplar._meta.get_field(name), content, name.removeprefix('foto_'))
+        for name, content in rendered.items()
+    }
+    # Si la foto cambió mientras se procesaba, la tarea de la foto nueva asigna las suyas
+    if Ejemplar.objects.filter(pk=ejemplar_id, foto=foto).update(**names):
+        dashboard.invalidate()
+    return names
+
+
+def enqueue(ejemplar_id):
+    """ Programa la generación de las versiones reducidas cuando confirme la transacción en curso. """
+    transaction.on_commit(lambda: tasks.submit(generate_derivatives, ejemplar_id, queue='images'))
+
+
+def clear(ejemplar):
+    """ Quita las versiones reducidas de una foto que se reemplazó o se borró. """
+    if ejemplar.foto_thumb or ejemplar.foto_medium:
+        ejemplar.foto_thumb = ejemplar.foto_medium = None
+        Ejemplar.objects.filter(pk=ejemplar.pk).update(foto_thumb=None, foto_medium=None)
@@ -0,0 +1,78 @@
+"""
+Agregación de SensorData por intervalos de tiempo para los gráficos.
+
+La agregación se hace en la base de datos (GROUP BY sobre el inicio del
+intervalo), de modo que el tamaño de la respuesta depende del número de
+intervalos y no del número de lecturas crudas. Cuando el rango está alineado
+a horas o días completos se lee directamente de las tablas de rollup.
+"""
+from datetime import timedelta
+
+from django.db.models import Avg, Count, DateTimeField, Func, Max, Min
+from django.db.models.functions import TruncDay, TruncHour
+
+from .models import SensorData
+from . import rollups
+
+BUCKETS = {
+    '5m': timedelta(minutes=5),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+METRICS = ('temperatura', 'actividad')
+
+
+class TimeBucket(Func):
+    """ Inicio del intervalo de ``seconds`` segundos (alineado a epoch) que contiene la expresión. """
+    output_field = DateTimeField()
+
+    def __init__(self, expression, seconds, **extra):
+        super().__init__(expression, seconds=int(seconds), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        template = 'to_timestamp(floor(extract(epoch from %(expressions)s) / %(seconds)s) * %(seconds)s)'
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        template = "datetime((CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / %(seconds)s) * %(seconds)s, 'unixepoch')"
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+
+def bucket_expression(bucket, field='timestamp'):
+    if bucket == '1h':
+        return TruncHour(field)
+    if bucket == '1d':
+        return TruncDay(field)
+    return TimeBucket(field, BUCKETS[bucket].total_seconds())
+
+
+def summarize(ejemplar_id, start, end, bucket, use_rollups=True):
+    """ Devuelve min, max, media y cantidad por intervalo para cada métrica. """
+    if use_rollups and rollups.covers(bucket, start, end):
+        return rollups.summarize(ejemplar_id, start, end, bucket)
+    aggregates = {}
+    for metric in METRICS:
+        aggregates[f'{metric}_min'] = Min(metric)
+        aggregates[f'{metric}_max'] = Max(metric)
+        aggregates[f'{metric}_mean'] = Avg(metric)
+        aggregates[f'{metric}_count'] = Count(metric)
+    rows = (
+        SensorData.objects.filter(ejemplar_id=ejemplar_id, timestamp__gte=start, timestamp__lt=end)
+        .annotate(bucket=bucket_expression(bucket))
+        .values('bucket')
+        .annotate(**aggregates)
+        .order_by('bucket')
+    )
+    return [_format_row(row) for row in rows]
+
+
+def _format_row(row):
+    data = {'start': row['bucket']}
+    for metric in METRICS:
+        data[metric] = {
+            'min': row[f'{metric}_min'],
+            'max': row[f'{metric}_max'],
+            'mean': row[f'{metric}_mean'],
+            'count': row[f'{metric}_count'],
+        }
+    return data
@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import RazaViewSet, CategoriaPuntuacionViewSet, CaracteristicaViewSet, EjemplarViewSet, CalificacionViewSet, SensorDataViewSet, AlertViewSet, RegisterView, ScoreTemplateView, DashboardScoresView, AnimalSensorDataView
+from .views import RazaViewSet, CategoriaPuntuacionViewSet, CaracteristicaViewSet, EjemplarViewSet, CalificacionViewSet, SensorDataViewSet, AlertViewSet, RegisterView, ScoreTemplateView, DashboardScoresView, AnimalSensorDataView, SensorDataBulkIngestView, SensorDataStreamIngestView, SensorDataSummaryView, HerdSnapshotView, ExportView, ReportJobViewSet, ScoreHistoryView, ScorePercentilesView, LiveEventsTicketView
+from .async_views import live_events
 
 router = DefaultRouter()
 router.register(r'breeds', RazaViewSet)
@@ -9,16 +10,26 @@ router.register(r'categorias_puntuacion', CategoriaPuntuacionViewSet)
 router.register(r'caracteristicas', CaracteristicaViewSet)
 router.register(r'animals', EjemplarViewSet) # Changed from ejemplares to animals
 router.register(r'calificaciones', CalificacionViewSet)
+router.register(r'reports', ReportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', RegisterView.as_view(), name='register'),
+    path('sensor-data/bulk/', SensorDataBulkIngestView.as_view(), name='sensor-data-bulk'),
+    path('sensor-data/stream/<str:upload_id>/', SensorDataStreamIngestView.as_view(), name='sensor-data-stream'),
+    path('sensor-data/latest/', HerdSnapshotView.as_view(), name='herd-snapshot'),
     path('animals/<int:animal_pk>/sensor-data/', SensorDataViewSet.as_view({'get': 'list', 'post': 'create'}), name='animal-sensor-data-list'),
+    path('animals/<int:animal_pk>/sensor-data/summary/', SensorDataSummaryView.as_view(), name='animal-sensor-data-summary'),
     path('animals/<int:animal_pk>/alerts/', AlertViewSet.as_view({'get': 'list', 'post': 'create'}), name='animal-alerts-list'),
     path('animals/<int:animal_pk>/sensor-data/', AnimalSensorDataView.as_view(), name='animal-sensor-data'),
     path('animals/<int:animal_pk>/scores/', CalificacionViewSet.as_view({'post': 'submit_animal_scores'}), name='animal-submit-scores'),
+    path('animals/<int:animal_pk>/score-history/', ScoreHistoryView.as_view(), name='animal-score-history'),
+    path('score-history/percentiles/', ScorePercentilesView.as_view(), name='score-history-percentiles'),
     path('score-templates/breed/<int:breed_id>/', ScoreTemplateView.as_view(), name='score-template-by-breed'),
     path('dashboard/scores/', DashboardScoresView.as_view(), name='dashboard-scores'),
+    path('exports/<str:dataset>/', ExportView.as_view(), name='export'),
+    path('events/', live_events, name='live-events'),
+    path('events/ticket/', LiveEventsTicketView.as_view(), name='live-events-ticket'),
 ]
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Versiones de datos cacheados guardadas en la base.
+
+La caché por defecto de Django es un LocMemCache por proceso: una versión
+guardada allí no llega a los demás workers, que seguirían sirviendo datos
+viejos. Por eso la versión de cada conjunto (plantillas de calificación,
+dashboard) es una fila de CacheVersion. ``bump`` la incrementa dentro de la
+transacción que modifica los datos, así que la nueva versión se ve
+exactamente cuando se confirma el cambio. Quien lee hace un SELECT por clave
+única y usa la versión en la clave de su caché: las entradas anteriores
+dejan de usarse en todos los procesos.
+"""
+import time
+
+from django.db.models import F
+
+from .models import CacheVersion
+
+
+def current(name):
+    """ Versión actual de ``name`` (0 si nunca se incrementó). """
+    return CacheVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+
+async def acurrent(name):
+    return await CacheVersion.objects.filter(name=name).values_list('version', flat=True).afirst() or 0
+
+
+def bump(name):
+    """ Incrementa la versión de ``name`` en la transacción en curso. """
+    if CacheVersion.objects.filter(name=name).update(version=F('version') + 1):
+        return
+    # Primera vez: se parte de time_ns para no repetir versiones de una base recreada con una caché compartida
+    _, created = CacheVersion.objects.get_or_create(name=name, defaults={'version': time.time_ns()})
+    if not created:
+        CacheVersion.objects.filter(name=name).update(version=F('version') + 1)
@@ -1,15 +1,32 @@
+import math
+import os
 from django.contrib.auth.models import User
 from rest_framework import viewsets, generics
-from django.http import Http404
-from rest_framework.permissions import AllowAny
-from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar, Calificacion, SensorData, Alert
-from .serializers import RazaSerializer, CategoriaPuntuacionSerializer, CaracteristicaSerializer, EjemplarSerializer, CalificacionSerializer, SensorDataSerializer, AlertSerializer, UserSerializer, ScoreSubmissionSerializer, ScoreTemplateSerializer, RecentScoreAnimalSerializer
+from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser, MultiPartParser
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.views.static import serve
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from .models import Raza, CategoriaPuntuacion, Caracteristica, Ejemplar, Calificacion, SensorData, Alert, IngestSession, ReportJob
+from .serializers import RazaSerializer, CategoriaPuntuacionSerializer, CaracteristicaSerializer, EjemplarSerializer, CalificacionSerializer, SensorDataSerializer, AlertSerializer, UserSerializer, ScoreSubmissionSerializer, SessionScoreSubmissionSerializer, ScoreTemplateSerializer, RecentScoreAnimalSerializer, HerdSnapshotSerializer, ReportRequestSerializer, ReportJobSerializer
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import transaction
-from datetime import date, datetime, timedelta
-from django.db.models import Avg
+from datetime import datetime, time, timedelta
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .parsers import NDJSONParser, CSVParser
+from .ingest import ingest_records, stream_ingest, IngestConflict, dispatch_readings
+from .timeseries import BUCKETS, summarize
+from .pagination import IdPagination, TimeSeriesPagination
+from .fastpath import FastListMixin, RowSerializer
+from .scoring import save_session, recompute_scores, ScoringError
+from .score_templates import get_template
+from . import animal_import, dashboard, exports, push, reports, score_history, thumbnails
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -19,97 +36,316 @@ class RegisterView(generics.CreateAPIView):
 class RazaViewSet(viewsets.ModelViewSet):
     queryset = Raza.objects.all()
     serializer_class = RazaSerializer
+    pagination_class = IdPagination
 
 class CategoriaPuntuacionViewSet(viewsets.ModelViewSet):
-    queryset = CategoriaPuntuacion.objects.all()
+    queryset = CategoriaPuntuacion.objects.prefetch_related('caracteristicas')
     serializer_class = CategoriaPuntuacionSerializer
+    pagination_class = IdPagination
 
 class CaracteristicaViewSet(viewsets.ModelViewSet):
     queryset = Caracteristica.objects.all()
     serializer_class = CaracteristicaSerializer
+    pagination_class = IdPagination
 
 class EjemplarViewSet(viewsets.ModelViewSet):
     queryset = Ejemplar.objects.all()
     serializer_class = EjemplarSerializer
+    pagination_class = IdPagination
+
+    @action(detail=False, methods=['post'], url_path='recompute-scores', permission_classes=[IsAuthenticated])
+    def recompute_scores(self, request):
+        """ Recalcula score_total de una o varias razas (``raza``) o de todo el rebaño. """
+        raza_ids = request.data.get('raza')
+        if raza_ids is not None:
+            if not isinstance(raza_ids, list):
+                raza_ids = [raza_ids]
+            try:
+                raza_ids = [int(raza_id) for raza_id in raza_ids]
+            except (TypeError, ValueError):
+                return Response({'detail': 'raza debe ser un id o una lista de ids.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ejemplar_ids, _ = recompute_scores(raza_ids)
+        return Response({'message': 'Scores recalculados con éxito.', 'updated': len(ejemplar_ids)})
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser],
+            permission_classes=[IsAuthenticated])
+    def import_animals(self, request):
+        """
+        Alta o actualización masiva de ejemplares desde un CSV o XLSX (ver api.animal_import).
+
+        El archivo llega como cuerpo de la petición (text/csv o el tipo de XLSX)
+        o en el campo ``file`` de un formulario multipart. ``dry_run=1`` solo
+        valida; ``update=0`` rechaza los identificadores que ya existen.
+        """
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+        update_existing = request.query_params.get('update') not in ('0', 'false')
+        if request.content_type.startswith('multipart/form-data'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'detail': 'Falta el archivo en el campo file.'}, status=status.HTTP_400_BAD_REQUEST)
+            fileobj, filename, content_type = upload, upload.name, upload.content_type
+        else:
+            # El cuerpo se lee por líneas sin pasar por los parsers de DRF
+            fileobj, filename, content_type = request._request, '', request.content_type.split(';')[0].strip()
 
-class CalificacionViewSet(viewsets.ModelViewSet):
-    queryset = Calificacion.objects.all()
+        try:
+            result = animal_import.import_animals(
+                animal_import.iter_upload(fileobj, filename, content_type), update_existing=update_existing, dry_run=dry_run,
+            )
+        except animal_import.AnimalImportError as exc:
+            return Response({'detail': exc.detail}, status=exc.status)
+        if dry_run:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_201_CREATED if result.accepted else status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(), status=response_status)
+
+class CalificacionViewSet(FastListMixin, viewsets.ModelViewSet):
+    # animalName/animalIdentifier/animalPhotoUrl y __str__ leen el ejemplar y la característica
+    queryset = Calificacion.objects.select_related('ejemplar', 'caracteristica')
     serializer_class = CalificacionSerializer
+    pagination_class = IdPagination
 
     @action(detail=False, methods=['post'], url_path='animal/(?P<animal_pk>[^/.]+)/scores')
     def submit_animal_scores(self, request, animal_pk=None):
         serializer = ScoreSubmissionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        scores_data = serializer.validated_data['scores']
-        ejemplar_id = animal_pk
-
         try:
-            ejemplar = Ejemplar.objects.get(pk=ejemplar_id)
-        except Ejemplar.DoesNotExist:
+            ejemplar_id = int(animal_pk)
+        except ValueError:
             return Response({'detail': 'Ejemplar no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
 
-        total_score = 0
-        total_possible_score = 0
-        today = date.today()
-
-        with transaction.atomic():
-            for score_data in scores_data:
-                caracteristica_id = score_data['caracteristica_id']
-                puntuacion_obtenida = score_data['puntuacion_obtenida']
-
-                try:
-                    caracteristica = Caracteristica.objects.get(pk=caracteristica_id)
-                except Caracteristica.DoesNotExist:
-                    return Response({'detail': f'Característica con ID {caracteristica_id} no encontrada.'}, status=status.HTTP_400_BAD_REQUEST)
-
-                # Guardar la calificación individual
-                Calificacion.objects.update_or_create(
-                    ejemplar=ejemplar,
-                    caracteristica=caracteristica,
-                    fecha_calificacion=today,
-                    defaults={
-                        'puntuacion_obtenida': puntuacion_obtenida,
-                        'evaluador': request.user if request.user.is_authenticated else None,
-                    }
-                )
-
-                # Calcular la contribución al score total
-                # Asumiendo que la ponderación de la categoría se aplica al puntaje ideal de la característica
-                # y luego se escala por el puntaje obtenido.
-                categoria = caracteristica.categoria
-                
-                # Para calcular el score total, necesitamos la suma de los puntajes ideales de las características
-                # dentro de cada categoría, y luego aplicar la ponderación de la categoría.
-                # Esto requiere que CategoriaPuntuacion tenga un campo para el puntaje ideal total de sus características.
-                # Por ahora, haremos una simplificación: sumaremos los puntajes obtenidos y los compararemos con los ideales.
-                
-                # Una forma más precisa sería:
-                # (puntuacion_obtenida / caracteristica.puntaje_ideal) * (categoria.ponderacion / 100) * (puntaje_ideal_total_de_la_categoria)
-                # Pero para simplificar y dado que el frontend envía solo la puntuación obtenida, 
-                # calcularemos un score ponderado simple basado en la proporción del puntaje ideal.
-
-                # Suma de los puntajes obtenidos ponderados
-                total_score += (puntuacion_obtenida / caracteristica.puntaje_ideal) * categoria.ponderacion
-                total_possible_score += categoria.ponderacion
-
-            # Normalizar el score total a una escala de 0-100 si total_possible_score es > 0
-            final_score = (total_score / total_possible_score) * 100 if total_possible_score > 0 else 0
-
-            # Actualizar el ejemplar
-            ejemplar.score_total = final_score
-            ejemplar.last_score_date = today
-            ejemplar.save()
-
-        return Response({'message': 'Calificaciones guardadas y score actualizado con éxito.', 'score_total': final_score}, status=status.HTTP_201_CREATED)
-
-
-class SensorDataViewSet(viewsets.ModelViewSet):
+        try:
+            results = save_session([{'ejemplar_id': ejemplar_id, 'scores': serializer.validated_data['scores']}], request.user)
+        except ScoringError as exc:
+            return Response({'detail': exc.detail}, status=exc.status)
+
+        return Response({'message': 'Calificaciones guardadas y score actualizado con éxito.', 'score_total': results.get(ejemplar_id, 0)}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='session')
+    def submit_session_scores(self, request):
+        """ Guarda las calificaciones de toda una sesión (muchos ejemplares) con un número fijo de consultas. """
+        serializer = SessionScoreSubmissionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        animals = serializer.validated_data['animals']
+        max_animals = getattr(settings, 'SCORING_SESSION_MAX_ANIMALS', 1000)
+        if len(animals) > max_animals:
+            return Response({'detail': f'Máximo {max_animals} ejemplares por sesión.'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            results = save_session(animals, request.user)
+        except ScoringError as exc:
+            return Response({'detail': exc.detail}, status=exc.status)
+
+        return Response({
+            'message': 'Calificaciones de la sesión guardadas con éxito.',
+            'results': [{'ejemplar_id': ejemplar_id, 'score_total': score} for ejemplar_id, score in results.items()],
+        }, status=status.HTTP_201_CREATED)
+
+
+class SensorDataViewSet(FastListMixin, viewsets.ModelViewSet):
     serializer_class = SensorDataSerializer
+    pagination_class = TimeSeriesPagination
 
     def get_queryset(self):
         animal_pk = self.kwargs['animal_pk']
-        return SensorData.objects.filter(ejemplar=animal_pk).order_by('-timestamp')
+        return SensorData.objects.filter(ejemplar=animal_pk).order_by('-timestamp', '-id')
+
+    def perform_create(self, serializer):
+        dispatch_readings([serializer.save()])
+
+class SensorDataBulkIngestView(APIView):
+    """ Ingesta de lecturas de todo el hato en un solo payload (JSON, NDJSON o CSV). """
+    parser_classes = [JSONParser, NDJSONParser, CSVParser]
+
+    def post(self, request, *args, **kwargs):
+        records = request.data
+        if isinstance(records, dict):
+            records = records.get('readings')
+        if not isinstance(records, list) or not records:
+            return Response({'detail': 'Se esperaba una lista no vacía de lecturas.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_rows = getattr(settings, 'SENSOR_INGEST_MAX_ROWS', 50000)
+        if len(records) > max_rows:
+            return Response({'detail': f'El lote excede el máximo de {max_rows} lecturas.'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        result = ingest_records(records)
+        response_status = status.HTTP_201_CREATED if result.accepted else status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(), status=response_status)
+
+class SensorDataStreamIngestView(APIView):
+    """
+    Ingesta en streaming (NDJSON) para gateways que suben lecturas acumuladas.
+
+    El cuerpo se lee línea a línea sin cargarlo entero en memoria y se confirma
+    por lotes. La cabecera ``X-Ingest-Offset`` indica el offset del primer
+    registro enviado; ``GET`` devuelve el último offset confirmado para reanudar.
+    """
+
+    def get(self, request, upload_id, *args, **kwargs):
+        acknowledged = IngestSession.objects.filter(upload_id=upload_id).values_list('acknowledged', flat=True).first()
+        return Response({'upload_id': upload_id, 'acknowledged': acknowledged or 0})
+
+    def post(self, request, upload_id, *args, **kwargs):
+        try:
+            start_offset = int(request.headers.get('X-Ingest-Offset', 0))
+        except ValueError:
+            return Response({'detail': 'X-Ingest-Offset debe ser un entero.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        session, _ = IngestSession.objects.get_or_create(upload_id=upload_id)
+        if start_offset < 0 or start_offset > session.acknowledged:
+            return Response({'detail': 'El offset enviado deja registros sin confirmar; reanude desde el offset confirmado.',
+                             'upload_id': upload_id, 'acknowledged': session.acknowledged}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            result = stream_ingest(self._body_stream(request), session, start_offset=start_offset)
+        except IngestConflict:
+            session.refresh_from_db()
+            return Response({'detail': 'La subida se está procesando en otra petición.',
+                             'upload_id': upload_id, 'acknowledged': session.acknowledged}, status=status.HTTP_409_CONFLICT)
+
+        return Response(dict(result.as_dict(), upload_id=upload_id, acknowledged=session.acknowledged))
+
+    def _body_stream(self, request):
+        django_request = request._request
+        environ = getattr(django_request, 'environ', {})
+        if environ.get('wsgi.input_terminated') and not django_request.META.get('CONTENT_LENGTH'):
+            # Transfer-Encoding: chunked ya decodificado por el servidor WSGI
+            return environ['wsgi.input']
+        return django_request
+
+class HerdSnapshotView(FastListMixin, generics.ListAPIView):
+    """
+    Última lectura de cada ejemplar del hato (vista del establo).
+
+    Se lee de SensorLatest, así que el costo depende del tamaño del hato y no
+    del historial. Filtros: ``raza``, ``stale_hours`` (sin lecturas en las
+    últimas N horas, incluidos los que nunca reportaron) y
+    ``temperatura_above`` (última temperatura mayor que X).
+    """
+    serializer_class = HerdSnapshotSerializer
+    pagination_class = IdPagination
+    # Diez años: más atrás el filtro no distingue nada y timedelta se acerca a su límite
+    max_stale_hours = 10 * 366 * 24
+
+    def get_queryset(self):
+        params = self.request.query_params
+        try:
+            raza = int(params['raza']) if 'raza' in params else None
+            stale_hours = float(params['stale_hours']) if 'stale_hours' in params else None
+            temperatura_above = float(params['temperatura_above']) if 'temperatura_above' in params else None
+            if not all(math.isfinite(value) for value in (stale_hours, temperatura_above) if value is not None):
+                raise ValueError
+            since = None
+            if stale_hours is not None:
+                if not 0 <= stale_hours <= self.max_stale_hours:
+                    raise ValueError
+                since = timezone.now() - timedelta(hours=stale_hours)
+        except (ValueError, OverflowError):
+            raise ParseError(f'raza debe ser un id, stale_hours un número entre 0 y {self.max_stale_hours} '
+                             'y temperatura_above un número finito.')
+
+        queryset = Ejemplar.objects.select_related('sensor_latest')
+        if raza is not None:
+            queryset = queryset.filter(raza_id=raza)
+        if since is not None:
+            queryset = queryset.filter(Q(sensor_latest__isnull=True) | Q(sensor_latest__timestamp__lt=since))
+        if temperatura_above is not None:
+            queryset = queryset.filter(sensor_latest__temperatura__gt=temperatura_above)
+        return queryset
+
+class ExportView(APIView):
+    """
+    Exportación masiva en streaming de ``sensor-data`` o ``calificaciones``
+    (ver api.exports). ``output``: parquet (por defecto), arrow o csv (gzip);
+    filtros ``animal`` (ids separados por comas), ``raza``, ``from`` y ``to``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # El Accept del cliente describe el archivo (p. ej. application/vnd.apache.parquet), no un renderer
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, dataset, *args, **kwargs):
+        if dataset not in exports.DATASETS:
+            raise Http404
+        file_format = request.query_params.get('output', 'parquet')
+        if file_format not in exports.FORMATS:
+            return Response({'detail': f'output debe ser uno de: {", ".join(exports.FORMATS)}.'}, status=status.HTTP_400_BAD_REQUEST)
+        params = request.query_params
+        try:
+            filters = {
+                'ejemplar_ids': [int(pk) for pk in params['animal'].split(',') if pk.strip()] if params.get('animal') else None,
+                'raza_id': int(params['raza']) if 'raza' in params else None,
+                'start': _parse_datetime_param(params['from']) if 'from' in params else None,
+                'end': _parse_datetime_param(params['to']) if 'to' in params else None,
+            }
+        except ValueError:
+            return Response({'detail': 'animal y raza deben ser ids numéricos; from y to, fechas ISO 8601.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            content = exports.export_stream(dataset, file_format, **filters)
+        except exports.ExportError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        if isinstance(request._request, ASGIRequest):
+            # Con ASGI un iterador síncrono se leería entero en memoria antes de enviarse
+            content = exports.aiter_stream(content)
+        content_type, _ = exports.FORMATS[file_format]
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(dataset, file_format)}"'
+        return response
+
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Reportes PDF/Excel generados en segundo plano (ver api.reports).
+
+    POST ``{"kind", "output", "params"}`` encola el reporte (202); si ya se
+    generó uno idéntico sobre los mismos datos responde 200 con el archivo
+    listo. El estado y el progreso se consultan en ``<id>/`` y el archivo se
+    descarga de ``<id>/download/``. Cada usuario ve solo sus propios reportes.
+    """
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+    pagination_class = IdPagination
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(created_by=self.request.user)
+
+    def perform_content_negotiation(self, request, force=False):
+        # La descarga responde con el archivo aunque el cliente pida application/pdf
+        return super().perform_content_negotiation(request, force=force or self.action == 'download')
+
+    def create(self, request, *args, **kwargs):
+        serializer = ReportRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            job = reports.submit(data['kind'], data['output'], data['params'], request.user)
+        except reports.ReportError as exc:
+            return Response({'detail': exc.detail}, status=exc.status)
+        response_status = status.HTTP_200_OK if job.status == ReportJob.Status.DONE else status.HTTP_202_ACCEPTED
+        return Response(self.get_serializer(job).data, status=response_status)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ReportJob.Status.DONE:
+            return Response({'detail': 'El reporte todavía no está listo.', 'status': job.status, 'progress': job.progress},
+                            status=status.HTTP_409_CONFLICT)
+        # El archivo de un trabajo no cambia nunca: su clave de contenido sirve de ETag
+        etag = f'"{job.cache_key}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, max-age=31536000, immutable'}
+        if _etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response = FileResponse(job.file.open('rb'), as_attachment=True, filename=reports.filename(job),
+                                content_type=reports.FORMATS[job.file_format][0])
+        for name, value in headers.items():
+            response[name] = value
+        return response
 
 class AnimalSensorDataView(generics.ListAPIView):
     serializer_class = SensorDataSerializer
@@ -120,8 +356,107 @@ class AnimalSensorDataView(generics.ListAPIView):
         time_threshold = datetime.now() - timedelta(days=1)
         return SensorData.objects.filter(ejemplar_id=animal_id, timestamp__gte=time_threshold).order_by('timestamp')
 
-class AlertViewSet(viewsets.ModelViewSet):
+def _parse_datetime_param(value):
+    """ Acepta una fecha-hora ISO 8601 o una fecha (medianoche). """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+class SensorDataSummaryView(APIView):
+    """ Resumen por intervalos (5m, 1h o 1d) de las lecturas de un ejemplar. """
+
+    def get(self, request, animal_pk, *args, **kwargs):
+        bucket = request.query_params.get('bucket', '1h')
+        if bucket not in BUCKETS:
+            return Response({'detail': f'bucket debe ser uno de: {", ".join(BUCKETS)}.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            end = _parse_datetime_param(request.query_params['to']) if 'to' in request.query_params else timezone.now()
+            start = _parse_datetime_param(request.query_params['from']) if 'from' in request.query_params else end - timedelta(days=1)
+        except ValueError:
+            return Response({'detail': 'from y to deben ser fechas ISO 8601.'}, status=status.HTTP_400_BAD_REQUEST)
+        if start >= end:
+            return Response({'detail': 'from debe ser anterior a to.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_buckets = getattr(settings, 'SENSOR_SUMMARY_MAX_BUCKETS', 5000)
+        if (end - start) / BUCKETS[bucket] > max_buckets:
+            return Response({'detail': f'El rango pedido supera {max_buckets} intervalos; use un bucket mayor.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not Ejemplar.objects.filter(pk=animal_pk).exists():
+            raise Http404
+
+        return Response({
+            'animal': animal_pk,
+            'from': start,
+            'to': end,
+            'bucket': bucket,
+            'buckets': summarize(animal_pk, start, end, bucket),
+        })
+
+def _parse_date_range(request):
+    """ Lee ``from``/``to`` (fechas ISO, opcionales) de la query; ValueError si son inválidas. """
+    dates = []
+    for name in ('from', 'to'):
+        value = request.query_params.get(name)
+        parsed = parse_date(value) if value else None
+        if value and parsed is None:
+            raise ValueError(value)
+        dates.append(parsed)
+    return dates
+
+class ScoreHistoryView(APIView):
+    """ Trayectoria del score de un ejemplar, con el aporte de cada categoría por fecha. """
+
+    def get(self, request, animal_pk, *args, **kwargs):
+        try:
+            start, end = _parse_date_range(request)
+        except ValueError:
+            return Response({'detail': 'from y to deben ser fechas ISO 8601 (AAAA-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+        if not Ejemplar.objects.filter(pk=animal_pk).exists():
+            raise Http404
+
+        history = score_history.trajectory(animal_pk, start, end)
+        categoria_ids = {int(categoria_id) for row in history for categoria_id in row['categorias']}
+        categories = dict(CategoriaPuntuacion.objects.filter(pk__in=categoria_ids).values_list('pk', 'nombre'))
+        return Response({
+            'animal': animal_pk,
+            'from': start,
+            'to': end,
+            'categories': {str(pk): nombre for pk, nombre in categories.items()},
+            'history': history,
+        })
+
+class ScorePercentilesView(APIView):
+    """ Percentiles del score del rebaño (o de una raza) por fecha de calificación. """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            start, end = _parse_date_range(request)
+        except ValueError:
+            return Response({'detail': 'from y to deben ser fechas ISO 8601 (AAAA-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            raza_id = int(request.query_params['raza']) if 'raza' in request.query_params else None
+        except ValueError:
+            return Response({'detail': 'raza debe ser un id.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            levels = score_history.parse_levels(request.query_params.get('percentiles'))
+        except ValueError:
+            return Response({'detail': 'percentiles debe ser una lista de números entre 0 y 100.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'raza': raza_id,
+            'from': start,
+            'to': end,
+            'dates': score_history.percentiles(start, end, raza_id, levels),
+        })
+
+class AlertViewSet(FastListMixin, viewsets.ModelViewSet):
     serializer_class = AlertSerializer
+    pagination_class = TimeSeriesPagination
 
     def get_queryset(self):
         animal_pk = self.kwargs['animal_pk']
@@ -130,38 +465,48 @@ class AlertViewSet(viewsets.ModelViewSet):
 class ScoreTemplateView(generics.RetrieveAPIView):
     serializer_class = ScoreTemplateSerializer
 
-    def get_object(self):
-        breed_id = self.kwargs['breed_id']
-        try:
-            raza = Raza.objects.get(pk=breed_id)
-        except Raza.DoesNotExist:
+    def retrieve(self, request, *args, **kwargs):
+        template = get_template(self.kwargs['breed_id'])
+        if template is None:
             raise Http404
 
-        # Fetch categories related to the breed
-        categories = CategoriaPuntuacion.objects.filter(raza=raza)
-        # Fetch all characteristics related to these categories
-        characteristics = Caracteristica.objects.filter(categoria__in=categories)
-
-        # Return a dictionary that matches the ScoreTemplateSerializer structure
-        return {
-            'categories': categories,
-            'characteristics': characteristics
-        }
+        headers = {'ETag': template.etag, 'Cache-Control': 'private, no-cache'}
+        if _etag_matches(request, template.etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(template.payload, headers=headers)
+
+def _etag_matches(request, etag):
+    """ Compara If-None-Match con ``etag`` (comparación débil, admite listas y '*'). """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in [value[2:] if value.startswith('W/') else value for value in candidates]
+
+def recent_scores_rows(request):
+    """ (RowSerializer, queryset) de los 10 ejemplares con calificaciones más recientes. """
+    row_serializer = RowSerializer(RecentScoreAnimalSerializer(context={'request': request}))
+    ejemplares = Ejemplar.objects.filter(last_score_date__isnull=False).order_by('-last_score_date')[:10]
+    return row_serializer, row_serializer.rows(ejemplares)
 
 class DashboardScoresView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
-        # Calcular puntuaciones promedio por raza
-        average_scores_by_breed_raw = Ejemplar.objects.filter(score_total__isnull=False).values('raza__nombre').annotate(
-            average_score=Avg('score_total')
-        ).order_by('raza__nombre')
+        def recent_scores():
+            row_serializer, rows = recent_scores_rows(request)
+            return row_serializer.to_dicts(rows)
 
-        average_scores_by_breed = [{'breedName': item['raza__nombre'], 'averageScore': item['average_score']} for item in average_scores_by_breed_raw]
+        # Promedios, histogramas, alertas y cobertura salen de DashboardStat; la respuesta queda en caché
+        return Response(dashboard.get_payload(recent_scores))
 
-        # Obtener los 10 ejemplares con calificaciones más recientes
-        recent_scores = Ejemplar.objects.filter(last_score_date__isnull=False).order_by('-last_score_date')[:10]
-        recent_scores_data = RecentScoreAnimalSerializer(recent_scores, many=True, context={'request': request}).data
+class LiveEventsTicketView(APIView):
+    """ Ticket de corta duración para abrir events/ con EventSource, que no permite enviar cabeceras. """
+    permission_classes = [IsAuthenticated]
 
-        return Response({
-            'averageScoresByBreed': average_scores_by_breed,
-            'recentScores': recent_scores_data
-        })
\ No newline at end of file
+    def post(self, request, *args, **kwargs):
+        return Response({'ticket': push.issue_ticket(request.user), 'expires_in': getattr(settings, 'PUSH_TICKET_MAX_AGE', 30)})
+
+def serve_derived_photo(request, path):
+    """ Sirve en desarrollo las versiones reducidas de las fotos con caché de larga duración. """
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, 'ejemplares_fotos', 'derivadas'))
+    response['Cache-Control'] = thumbnails.DERIVED_CACHE_CONTROL
+    return response
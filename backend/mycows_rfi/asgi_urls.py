@@ -0,0 +1,11 @@
+"""
+URLs del proyecto servido con ASGI (``ASGI_URLCONF``): las de ``mycows_rfi.urls``
+con las vistas asíncronas de lectura de ``api.async_urls`` por delante.
+"""
+from django.urls import path, include
+
+from . import urls
+
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+] + urls.urlpatterns
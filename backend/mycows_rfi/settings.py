@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,9 +53,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.AsyncRoutesMiddleware',
 ]
 
 ROOT_URLCONF = 'mycows_rfi.urls'
+# Con ASGI los endpoints de lectura más consultados se sirven con vistas asíncronas
+# (api.async_views); None sirve las mismas vistas de DRF que con WSGI.
+ASGI_URLCONF = 'mycows_rfi.asgi_urls'
 
 TEMPLATES = [
     {
@@ -140,6 +145,93 @@ REST_FRAMEWORK = {
     )
 }
 
+# Paginación por keyset de los listados (api.pagination)
+API_PAGE_SIZE = 100  # Tamaño de página por defecto
+API_MAX_PAGE_SIZE = 1000  # Máximo aceptado en ?page_size=
+API_FAST_SERIALIZATION = True  # Listados JSON de lecturas, alertas y calificaciones sin pasar por los serializers (api.fastpath)
+
+# Calificación por sesión (calificaciones/session/)
+SCORING_SESSION_MAX_ANIMALS = 1000  # Ejemplares máximos por petición
+SCORE_TEMPLATE_CACHE_TIMEOUT = 24 * 3600  # Segundos que una plantilla compilada vive en la caché de Django
+
+# Indicadores del dashboard (api.dashboard)
+DASHBOARD_CACHE_TIMEOUT = 300  # Segundos máximos que se sirve la respuesta cacheada
+DASHBOARD_COVERAGE_WINDOW = timedelta(hours=24)  # Un ejemplar "reporta" si tiene lecturas en esta ventana
+DASHBOARD_COVERAGE_REFRESH_INTERVAL = 300  # Segundos mínimos entre recálculos de cobertura tras una ingesta (por proceso con LocMemCache)
+
+# Alta masiva de ejemplares desde CSV/XLSX (api.animal_import, POST /api/animals/import/, comando import_animals)
+ANIMAL_IMPORT_BATCH_SIZE = 1000  # Filas validadas y escritas por transacción
+ANIMAL_IMPORT_MAX_REJECTS = 1000  # Rechazos detallados en la respuesta (el resto solo se cuenta)
+
+# Ingesta por lotes de lecturas de sensores
+SENSOR_INGEST_MAX_ROWS = 50000  # Máximo de lecturas por petición
+SENSOR_INGEST_BATCH_SIZE = 1000  # batch_size de bulk_create
+SENSOR_INGEST_COPY_THRESHOLD = 1000  # A partir de este tamaño se usa COPY en PostgreSQL (None para desactivar)
+SENSOR_INGEST_STREAM_BATCH_SIZE = 1000  # Registros confirmados por lote en la ingesta en streaming
+SENSOR_INGEST_MAX_REJECTS = 1000  # Rechazos detallados en la respuesta (el resto solo se cuenta)
+SENSOR_SUMMARY_MAX_BUCKETS = 5000  # Intervalos máximos por respuesta de sensor-data/summary
+SENSOR_ROLLUPS_ON_INGEST = True  # Recalcular los rollups por hora/día tocados por cada lote ingerido
+
+# Particionado mensual de SensorData (PostgreSQL, comando manage_sensor_partitions)
+SENSOR_DATA_PARTITIONS_AHEAD = 3  # Meses de particiones creadas por adelantado
+SENSOR_DATA_RETENTION_MONTHS = 13  # Meses completos de lecturas crudas que se conservan
+SENSOR_DATA_ARCHIVE_DIR = BASE_DIR / 'archive' / 'sensor_data'  # Parquet de las particiones archivadas
+
+# Exportación masiva de lecturas y calificaciones (api.exports, GET /api/exports/<dataset>/, comando export_data)
+EXPORT_CHUNK_SIZE = 50000  # Filas leídas del cursor y escritas por bloque (un row group en Parquet)
+
+# Versiones reducidas de las fotos (api.thumbnails). Se nombran por el hash de su
+# contenido: en producción el servidor web debe servir MEDIA_ROOT/ejemplares_fotos/derivadas/
+# con Cache-Control: public, max-age=31536000, immutable
+PHOTO_THUMB_SIZE = 160  # Lado mayor en píxeles (listados y dashboard)
+PHOTO_MEDIUM_SIZE = 640  # Lado mayor en píxeles (ficha del ejemplar)
+PHOTO_JPEG_QUALITY = 85
+
+# Eventos en vivo de alertas y lecturas (api.push, GET /api/events/, requiere ASGI)
+# El broker en memoria (PUSH_BROKER_URL = None) solo reparte los eventos del propio proceso: sirve
+# con un único proceso ASGI que recibe también la ingesta. Con workers WSGI o varios procesos ASGI
+# hace falta Redis (redis://..., requiere el paquete redis, que no está en las dependencias).
+PUSH_BROKER_URL = None
+PUSH_TICKET_MAX_AGE = 30  # Segundos de validez del ticket de events/ticket/ para abrir el stream
+PUSH_REPLAY_EVENTS = 1000  # Eventos recientes reenviados a quien reconecta con Last-Event-ID
+PUSH_MAX_PENDING_EVENTS = 1000  # Eventos sin enviar a un cliente antes de cortar su conexión
+PUSH_HEARTBEAT_SECONDS = 15
+PUSH_RETRY_MILLISECONDS = 3000  # Espera sugerida al navegador antes de reconectar
+
+# Cola de tareas local (api.tasks): hilos por cola. 'alerts' debe tener uno solo
+# para que el estado por ejemplar del motor de alertas se actualice en orden.
+TASK_QUEUES = {
+    'default': 2,
+    'alerts': 1,
+    'rollups': 1,
+    'images': 2,
+    'reports': 2,
+}
+TASK_PROCESS_WORKERS = 2  # Procesos para trabajo de CPU (dibujo de reportes)
+TASKS_ALWAYS_EAGER = False
+
+# Reportes PDF/Excel en segundo plano (api.reports, POST /api/reports/)
+REPORT_MAX_ANIMALS = 500  # Hojas de calificación máximas por reporte
+REPORT_MAX_DAYS = 366  # Días máximos del resumen sanitario del hato
+REPORT_JOB_TIMEOUT = 1800  # Segundos tras los que un trabajo sin terminar se da por perdido
+REPORT_RETENTION_DAYS = 30  # Antigüedad de los trabajos que borra purge_reports
+
+# Motor de alertas (api.alerts)
+ALERT_FEVER_TEMPERATURE = 39.5  # °C
+# La media móvil vive en memoria de cada proceso (ver api.alerts): un reinicio la vuelve a construir
+ALERT_BASELINE_SPAN = 288  # Lecturas que pesan en la media móvil de actividad (~24 h cada 5 min)
+ALERT_BASELINE_MIN_SAMPLES = 12  # Lecturas necesarias antes de evaluar reglas de actividad
+ALERT_HEAT_ACTIVITY_RATIO = 1.8  # Actividad / media para sospechar celo
+ALERT_INACTIVITY_RATIO = 0.5  # Actividad / media considerada inactividad
+ALERT_INACTIVITY_DURATION = timedelta(hours=4)
+ALERT_DEDUP_WINDOW = timedelta(hours=12)  # No repetir el mismo tipo de alerta para un ejemplar
+
+# Detección de anomalías por lotes (api.analytics)
+ANALYTICS_WINDOW = timedelta(days=3)  # Ventana de la línea base móvil
+ANALYTICS_HEAT_ZSCORE = 3.0
+ANALYTICS_INACTIVITY_ZSCORE = -2.5
+ANALYTICS_MIN_STD = 1.0  # Piso de la desviación para series casi constantes
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -19,7 +19,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from api.views import serve_derived_photo
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+if settings.DEBUG:
+    # Las versiones reducidas llevan el hash del contenido en el nombre y no cambian nunca
+    urlpatterns.append(path(f'{settings.MEDIA_URL.strip("/")}/ejemplares_fotos/derivadas/<path:path>', serve_derived_photo))
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
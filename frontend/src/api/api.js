@@ -22,4 +22,28 @@ api.interceptors.request.use(
     }
 );
 
-export default api;
\ No newline at end of file
+export default api;
+
+// Tamaño de página pedido a los listados; el servidor lo acota a API_MAX_PAGE_SIZE (1000 por defecto)
+export const PAGE_SIZE = 1000;
+
+// Recorre los enlaces `next` de un listado paginado por cursor y devuelve todas las filas.
+// Para catálogos (ejemplares, razas, alertas de un ejemplar), no para series de lecturas.
+export const fetchAllPages = async (client, url, config = {}) => {
+    const results = [];
+    let next = url;
+    let params = { page_size: PAGE_SIZE, ...config.params };
+    while (next) {
+        const { data } = await client.get(next, { ...config, params });
+        results.push(...data.results);
+        next = data.next;
+        params = undefined; // El enlace `next` ya trae page_size y el cursor
+    }
+    return results;
+};
+
+// Solo la primera página (las lecturas más recientes); `partial` indica que el servidor tiene más filas.
+export const fetchFirstPage = async (client, url, config = {}) => {
+    const { data } = await client.get(url, { ...config, params: { page_size: PAGE_SIZE, ...config.params } });
+    return { results: data.results, partial: Boolean(data.next) };
+};
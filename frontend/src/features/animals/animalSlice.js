@@ -1,12 +1,11 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../../api/api';
+import api, { fetchAllPages } from '../../api/api';
 import { showNotification } from '../notification/notificationSlice';
 
 // Thunks para operaciones CRUD de Animales
 export const fetchAnimals = createAsyncThunk('animals/fetchAnimals', async (_, { rejectWithValue }) => {
     try {
-        const { data } = await api.get('/animals/');
-        return data;
+        return await fetchAllPages(api, '/animals/');
     } catch (error) {
         return rejectWithValue(error.response?.data?.detail || 'Error al cargar ejemplares.');
     }
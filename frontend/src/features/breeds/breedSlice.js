@@ -1,10 +1,9 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../../api/api';
+import api, { fetchAllPages } from '../../api/api';
 
 export const fetchBreeds = createAsyncThunk('breeds/fetchBreeds', async (_, { rejectWithValue }) => {
     try {
-        const { data } = await api.get('/breeds/');
-        return data;
+        return await fetchAllPages(api, '/breeds/');
     } catch (error) {
         return rejectWithValue(error.response?.data?.detail || 'Error al cargar las razas.');
     }
@@ -1,5 +1,5 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../../api/api';
+import api, { fetchFirstPage } from '../../api/api';
 import { showNotification } from '../notification/notificationSlice';
 
 export const fetchDashboardData = createAsyncThunk(
@@ -20,8 +20,7 @@ export const fetchSensorData = createAsyncThunk(
     'dashboard/fetchSensorData',
     async (animalId, { rejectWithValue, dispatch }) => {
         try {
-            const { data } = await api.get(`/animals/${animalId}/sensor-data/`);
-            return data;
+            return await fetchFirstPage(api, `/animals/${animalId}/sensor-data/`);
         } catch (error) {
             const message = error.response?.data?.message || error.message;
             dispatch(showNotification({ message: `Error al cargar datos del sensor: ${message}`, severity: 'error' }));
@@ -34,6 +33,7 @@ const initialState = {
     averageScoresByBreed: [],
     recentScores: [],
     sensorData: [],
+    sensorDataPartial: false,
     isLoading: false,
     error: null,
 };
@@ -63,7 +63,8 @@ const dashboardSlice = createSlice({
             })
             .addCase(fetchSensorData.fulfilled, (state, action) => {
                 state.isLoading = false;
-                state.sensorData = action.payload;
+                state.sensorData = action.payload.results;
+                state.sensorDataPartial = action.payload.partial;
             })
             .addCase(fetchSensorData.rejected, (state, action) => {
                 state.isLoading = false;
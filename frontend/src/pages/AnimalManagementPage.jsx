@@ -102,8 +102,8 @@ export const AnimalManagementPage = () => {
             headerName: 'Foto',
             flex: 0.5,
             minWidth: 80,
-            renderCell: ({ value }) => (
-                value ? <img src={value} alt="Animal" style={{ width: 40, height: 40, borderRadius: '50%', objectFit: 'cover' }} /> : null
+            renderCell: ({ value, row }) => (
+                value ? <img src={row.foto_thumb_url || value} alt="Animal" style={{ width: 40, height: 40, borderRadius: '50%', objectFit: 'cover' }} /> : null
             ),
             sortable: false,
             filterable: false,
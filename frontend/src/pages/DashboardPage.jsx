@@ -12,7 +12,7 @@ import { fetchDashboardData, fetchSensorData } from '../features/dashboard/dashb
 // Datos simulados para el gráfico de sensores
 export const DashboardPage = () => {
     const dispatch = useDispatch();
-    const { averageScoresByBreed, recentScores, sensorData, isLoading, error } = useSelector((state) => state.dashboard);
+    const { averageScoresByBreed, recentScores, sensorData, sensorDataPartial, isLoading, error } = useSelector((state) => state.dashboard);
 
     useEffect(() => {
         dispatch(fetchDashboardData());
@@ -67,7 +67,7 @@ export const DashboardPage = () => {
                                         <TableRow key={row.id}>
                                             <TableCell sx={{ display: 'flex', alignItems: 'center' }}>
                                                 {row.animalPhotoUrl && (
-                                                    <img src={row.animalPhotoUrl} alt={row.animalName} style={{ width: 40, height: 40, borderRadius: '50%', marginRight: 8, objectFit: 'cover' }} />
+                                                    <img src={row.animalPhotoThumbUrl || row.animalPhotoUrl} alt={row.animalName} style={{ width: 40, height: 40, borderRadius: '50%', marginRight: 8, objectFit: 'cover' }} />
                                                 )}
                                                 {`${row.animalName} (${row.animalIdentifier})`}
                                             </TableCell>
@@ -84,7 +84,9 @@ export const DashboardPage = () => {
                 {/* Gráfico de Datos de Sensor */}
                 <Grid item xs={12}>
                     <Paper sx={{ p: 3, height: '400px' }}>
-                        <Typography variant="h6" gutterBottom>Monitor de Sensores (Ejemplar: 1)</Typography>
+                        <Typography variant="h6" gutterBottom>
+                            Monitor de Sensores (Ejemplar: 1){sensorDataPartial && ` · últimas ${sensorData.length} lecturas`}
+                        </Typography>
                         <ResponsiveContainer width="100%" height="90%">
                             <LineChart data={sensorData} margin={{ top: 5, right: 20, left: -10, bottom: 5 }}>
                                 <CartesianGrid strokeDasharray="3 3" />
@@ -19,12 +19,12 @@ import { Navbar } from '../components/Navbar';
 import { Footer } from '../components/Footer';
 import { useDispatch, useSelector } from 'react-redux';
 import { fetchAnimals } from '../redux/animals/animalSlice';
-import { fetchSensorData, fetchAlerts } from '../redux/iot/iotSlice';
+import { fetchSensorData, fetchAlerts, openLiveEvents } from '../redux/iot/iotSlice';
 
 export const IoTPage = () => {
     const dispatch = useDispatch();
     const { animals, isLoading: animalsLoading, error: animalsError } = useSelector((state) => state.animals);
-    const { sensorData, alerts, isLoading: iotLoading, error: iotError } = useSelector((state) => state.iot);
+    const { sensorData, sensorDataPartial, alerts, isLoading: iotLoading, error: iotError } = useSelector((state) => state.iot);
 
     const [selectedAnimalId, setSelectedAnimalId] = useState('');
     const [selectedAnimal, setSelectedAnimal] = useState(null);
@@ -44,6 +44,15 @@ export const IoTPage = () => {
         }
     }, [selectedAnimalId, animals, dispatch]);
 
+    // Las alertas y lecturas nuevas llegan por el stream de eventos, sin volver a consultar
+    useEffect(() => {
+        if (!selectedAnimalId) {
+            return undefined;
+        }
+        const source = openLiveEvents(selectedAnimalId, dispatch);
+        return () => source && source.close();
+    }, [selectedAnimalId, dispatch]);
+
     const handleAnimalChange = (event) => {
         setSelectedAnimalId(event.target.value);
     };
@@ -87,6 +96,11 @@ export const IoTPage = () => {
                         </Typography>
                         {sensorData.length > 0 ? (
                             <Paper elevation={3} sx={{ p: 2, mb: 3 }}>
+                                {sensorDataPartial && (
+                                    <Typography variant="body2" color="text.secondary">
+                                        Se muestran las {sensorData.length} lecturas más recientes; hay lecturas anteriores.
+                                    </Typography>
+                                )}
                                 <List>
                                     {sensorData.map((data, index) => (
                                         <ListItem key={index} divider>
@@ -89,7 +89,7 @@ export const ScorePage = () => {
                 <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 3 }}>
                     <Box sx={{ display: 'flex', alignItems: 'center' }}>
                         {animal.foto_url && (
-                            <img src={animal.foto_url} alt={animal.nombre} style={{ width: 80, height: 80, borderRadius: '50%', marginRight: 16, objectFit: 'cover' }} />
+                            <img src={animal.foto_thumb_url || animal.foto_url} alt={animal.nombre} style={{ width: 80, height: 80, borderRadius: '50%', marginRight: 16, objectFit: 'cover' }} />
                         )}
                         <div>
                             <Typography variant="h4">Calificación de Ejemplar</Typography>
@@ -1,13 +1,12 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../../api/api';
+import api, { fetchAllPages } from '../../api/api';
 
 // Thunk para obtener todos los animales
 export const fetchAnimals = createAsyncThunk(
     'animals/fetchAnimals',
     async (_, { rejectWithValue }) => {
         try {
-            const response = await api.get('/animals/');
-            return response.data;
+            return await fetchAllPages(api, '/animals/');
         } catch (error) {
             return rejectWithValue(error.response.data);
         }
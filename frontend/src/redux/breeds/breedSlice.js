@@ -1,11 +1,10 @@
 
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
-import api from '../../api/api';
+import api, { fetchAllPages } from '../../api/api';
 
 export const fetchBreeds = createAsyncThunk('breeds/fetchBreeds', async (_, { rejectWithValue }) => {
     try {
-        const response = await api.get('/breeds/');
-        return response.data;
+        return await fetchAllPages(api, '/breeds/');
     } catch (error) {
         return rejectWithValue(error.response.data);
     }
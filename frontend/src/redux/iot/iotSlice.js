@@ -1,6 +1,7 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import axios from 'axios';
 import { showNotification } from '../notification/notificationSlice';
+import { fetchAllPages, fetchFirstPage } from '../../api/api';
 
 const API_URL = process.env.REACT_APP_API_URL;
 
@@ -10,18 +11,112 @@ const getAuthToken = () => {
     return user ? `Bearer ${user.access}` : null;
 };
 
+// Renueva el token de acceso con el de refresco guardado; false si no hay o ya no es válido
+const refreshAccessToken = async () => {
+    const user = JSON.parse(localStorage.getItem('user'));
+    if (!user || !user.refresh) {
+        return false;
+    }
+    try {
+        const response = await axios.post(API_URL + 'token/refresh/', { refresh: user.refresh });
+        localStorage.setItem('user', JSON.stringify({ ...user, ...response.data }));
+        return true;
+    } catch (error) {
+        return false;
+    }
+};
+
+// Ticket firmado de corta duración para abrir el stream: EventSource no permite cabeceras y así
+// el token de acceso no viaja en la URL ni queda en los logs de acceso.
+const fetchEventsTicket = async () => {
+    const request = () => axios.post(API_URL + 'events/ticket/', null, { headers: { Authorization: getAuthToken() } });
+    try {
+        return (await request()).data.ticket;
+    } catch (error) {
+        if (!error.response || error.response.status !== 401 || !(await refreshAccessToken())) {
+            throw error;
+        }
+        return (await request()).data.ticket;
+    }
+};
+
+// Abre el stream de eventos en vivo (alertas y últimas lecturas) filtrado por ejemplar.
+// EventSource reintenta solo los cortes de red; si el servidor rechaza el ticket vencido (401) el
+// stream queda cerrado, así que se pide un ticket nuevo y se reabre desde el último evento recibido.
+// Devuelve un objeto con close() para cerrarlo.
+export const openLiveEvents = (animalId, dispatch) => {
+    if (!localStorage.getItem('user') || typeof EventSource === 'undefined') {
+        return null;
+    }
+    let source = null;
+    let timer = null;
+    let closed = false;
+    let retries = 0;
+    let lastEventId = null;
+
+    const reconnect = () => {
+        if (closed) {
+            return;
+        }
+        timer = setTimeout(connect, Math.min(30000, 1000 * 2 ** retries));
+        retries += 1;
+    };
+
+    const connect = async () => {
+        let ticket;
+        try {
+            ticket = await fetchEventsTicket();
+        } catch (error) {
+            reconnect();
+            return;
+        }
+        if (closed) {
+            return;
+        }
+        const params = new URLSearchParams({ ticket, animal: animalId });
+        if (lastEventId) {
+            params.set('lastEventId', lastEventId);
+        }
+        source = new EventSource(API_URL + `events/?${params}`);
+        const receive = (action) => (event) => {
+            lastEventId = event.lastEventId || lastEventId;
+            dispatch(action(JSON.parse(event.data)));
+        };
+        source.addEventListener('reading', receive(liveReadingReceived));
+        source.addEventListener('alert', receive(liveAlertReceived));
+        source.onopen = () => {
+            retries = 0;
+        };
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                reconnect();
+            }
+        };
+    };
+
+    connect();
+    return {
+        close: () => {
+            closed = true;
+            clearTimeout(timer);
+            if (source) {
+                source.close();
+            }
+        },
+    };
+};
+
 // Async thunk for fetching sensor data for a specific animal
 export const fetchSensorData = createAsyncThunk(
     'iot/fetchSensorData',
     async (animalId, { rejectWithValue, dispatch }) => {
         try {
             const token = getAuthToken();
-            const response = await axios.get(API_URL + `animals/${animalId}/sensor-data/`, {
+            return await fetchFirstPage(axios, API_URL + `animals/${animalId}/sensor-data/`, {
                 headers: {
                     Authorization: token,
                 },
             });
-            return response.data;
         } catch (error) {
             const message = error.response && error.response.data && error.response.data.detail
                 ? error.response.data.detail
@@ -38,12 +133,11 @@ export const fetchAlerts = createAsyncThunk(
     async (animalId, { rejectWithValue, dispatch }) => {
         try {
             const token = getAuthToken();
-            const response = await axios.get(API_URL + `animals/${animalId}/alerts/`, {
+            return await fetchAllPages(axios, API_URL + `animals/${animalId}/alerts/`, {
                 headers: {
                     Authorization: token,
                 },
             });
-            return response.data;
         } catch (error) {
             const message = error.response && error.response.data && error.response.data.detail
                 ? error.response.data.detail
@@ -58,11 +152,22 @@ const iotSlice = createSlice({
     name: 'iot',
     initialState: {
         sensorData: [],
+        // Hay lecturas más antiguas que las cargadas (solo se trae la primera página)
+        sensorDataPartial: false,
         alerts: [],
         isLoading: false,
         error: null,
     },
-    reducers: {},
+    reducers: {
+        liveReadingReceived(state, action) {
+            state.sensorData.unshift(action.payload);
+        },
+        liveAlertReceived(state, action) {
+            if (!state.alerts.some((alert) => alert.id === action.payload.id)) {
+                state.alerts.unshift(action.payload);
+            }
+        },
+    },
     extraReducers: (builder) => {
         builder
             .addCase(fetchSensorData.pending, (state) => {
@@ -71,7 +176,8 @@ const iotSlice = createSlice({
             })
             .addCase(fetchSensorData.fulfilled, (state, action) => {
                 state.isLoading = false;
-                state.sensorData = action.payload;
+                state.sensorData = action.payload.results;
+                state.sensorDataPartial = action.payload.partial;
             })
             .addCase(fetchSensorData.rejected, (state, action) => {
                 state.isLoading = false;
@@ -92,4 +198,5 @@ const iotSlice = createSlice({
     },
 });
 
+export const { liveReadingReceived, liveAlertReceived } = iotSlice.actions;
 export default iotSlice.reducer;
\ No newline at end of file